@@ -50,13 +50,13 @@ const Assignments: React.FC = () => {
             const [basesRes, assetsRes, transactionsRes] = await Promise.all([
                 axios.get(`${API_BASE_URL}/bases/`),
                 axios.get(`${API_BASE_URL}/assets/`),
-                axios.get(`${API_BASE_URL}/transactions/`)
+                axios.get(`${API_BASE_URL}/transactions/`, { params: { type: 'ASSIGNMENT' } })
             ]);
 
             setBases(basesRes.data);
             setAssetTypes(assetsRes.data);
 
-            const assignments = transactionsRes.data.filter((t: any) => t.type === 'ASSIGNMENT');
+            const assignments = transactionsRes.data.results;
             setRecentAssignments(assignments);
         } catch (error) {
             console.error("Error fetching data:", error);
@@ -49,14 +49,14 @@ const Purchases: React.FC = () => {
             const [basesRes, assetsRes, transactionsRes] = await Promise.all([
                 axios.get(`${API_BASE_URL}/bases/`),
                 axios.get(`${API_BASE_URL}/assets/`),
-                axios.get(`${API_BASE_URL}/transactions/`)
+                axios.get(`${API_BASE_URL}/transactions/`, { params: { type: 'PURCHASE' } })
             ]);
 
             setBases(basesRes.data);
             setAssetTypes(assetsRes.data);
 
-            // Filter only purchases for the list
-            const purchases = transactionsRes.data.filter((t: any) => t.type === 'PURCHASE');
+            // Newest page of purchases, filtered by the API
+            const purchases = transactionsRes.data.results;
             setRecentPurchases(purchases);
         } catch (error) {
             console.error("Error fetching data:", error);
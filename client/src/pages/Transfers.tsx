@@ -50,13 +50,13 @@ const Transfers: React.FC = () => {
             const [basesRes, assetsRes, transactionsRes] = await Promise.all([
                 axios.get(`${API_BASE_URL}/bases/`),
                 axios.get(`${API_BASE_URL}/assets/`),
-                axios.get(`${API_BASE_URL}/transactions/`)
+                axios.get(`${API_BASE_URL}/transactions/`, { params: { type: 'TRANSFER' } })
             ]);
 
             setBases(basesRes.data);
             setAssetTypes(assetsRes.data);
 
-            const transfers = transactionsRes.data.filter((t: any) => t.type === 'TRANSFER');
+            const transfers = transactionsRes.data.results;
             setRecentTransfers(transfers);
         } catch (error) {
             console.error("Error fetching data:", error);
@@ -0,0 +1,75 @@
+import os
+import time
+import weakref
+
+import dj_database_url
+
+
+def _env_int(name, default):
+    return int(os.getenv(name, default))
+
+
+def _env_float(name, default):
+    return float(os.getenv(name, default))
+
+
+# Last successful health check per pooled connection.
+_last_checked = weakref.WeakKeyDictionary()
+
+
+def check_connection(conn):
+    # Called by psycopg_pool on every checkout. Only ping the server when the
+    # connection has not been verified for DB_POOL_CHECK_INTERVAL seconds, so a
+    # busy worker does not pay an extra round trip per request.
+    interval = _env_float('DB_POOL_CHECK_INTERVAL', 30)
+    now = time.monotonic()
+    if now - _last_checked.get(conn, 0) < interval:
+        return
+    conn.execute('SELECT 1')
+    _last_checked[conn] = now
+
+
+def database_config(url=None):
+    """
+    Build a DATABASES entry from `url` (DATABASE_URL by default).
+
+    On PostgreSQL, DB_POOL=True (the default) uses Django's native psycopg
+    pool so gunicorn sync workers and ASGI threads share a bounded set of
+    connections instead of opening one per worker/thread. Tuning:
+
+        DB_POOL_SIZE            connections kept open (min_size)
+        DB_POOL_MAX_OVERFLOW    extra connections allowed under burst
+        DB_POOL_TIMEOUT         seconds to wait for a free connection
+        DB_POOL_MAX_IDLE        seconds before an idle overflow conn closes
+        DB_POOL_MAX_LIFETIME    seconds before a connection is recycled
+        DB_POOL_CHECK_INTERVAL  seconds between liveness pings per conn
+        DB_STATEMENT_TIMEOUT    per-statement timeout in ms (0 = none)
+    """
+    pooled = os.getenv('DB_POOL', 'True') == 'True'
+    config = dj_database_url.config(
+        default=url or os.getenv('DATABASE_URL'),
+        # Pooling and persistent connections are mutually exclusive in Django
+        conn_max_age=0 if pooled else _env_int('DB_CONN_MAX_AGE', 600),
+        conn_health_checks=not pooled,
+        # DB_SSL_REQUIRE=False for local servers without TLS
+        ssl_require=os.getenv('DB_SSL_REQUIRE', 'True') == 'True'
+    )
+    if 'postgresql' not in config.get('ENGINE', ''):
+        return config
+
+    options = config.setdefault('OPTIONS', {})
+    statement_timeout = _env_int('DB_STATEMENT_TIMEOUT', 0)
+    if statement_timeout:
+        options['options'] = f'-c statement_timeout={statement_timeout}'
+
+    if pooled:
+        size = _env_int('DB_POOL_SIZE', 4)
+        options['pool'] = {
+            'min_size': size,
+            'max_size': size + _env_int('DB_POOL_MAX_OVERFLOW', 6),
+            'timeout': _env_float('DB_POOL_TIMEOUT', 10),
+            'max_idle': _env_float('DB_POOL_MAX_IDLE', 300),
+            'max_lifetime': _env_float('DB_POOL_MAX_LIFETIME', 1800),
+            'check': check_connection,
+        }
+    return config
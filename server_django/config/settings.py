@@ -1,7 +1,7 @@
 import os
 from pathlib import Path
 from dotenv import load_dotenv
-import dj_database_url
+from config.db import database_config
 
 load_dotenv()
 
@@ -61,16 +61,37 @@ TEMPLATES = [
 WSGI_APPLICATION = 'config.wsgi.application'
 
 # Database
-# Use dj_database_url to parse the connection string
+# Parsed from DATABASE_URL; pooling and timeouts are configured via env vars,
+# see config/db.py.
 DATABASES = {
-    'default': dj_database_url.config(
-        default=os.getenv('DATABASE_URL'),
-        conn_max_age=600,
-        ssl_require=True
-    )
+    'default': database_config()
 }
+
+# Base sharding (core/sharding.py): with SHARD_DATABASE_URLS set, each base's
+# ledger and Inventory live on shard<base_id % n>; default keeps the rest.
+SHARD_DATABASE_URLS = [u.strip() for u in os.getenv('SHARD_DATABASE_URLS', '').split(',') if u.strip()]
+for _i, _url in enumerate(SHARD_DATABASE_URLS):
+    DATABASES[f'shard{_i}'] = database_config(_url)
+SHARDS = [f'shard{i}' for i in range(len(SHARD_DATABASE_URLS))] or ['default']
+if SHARD_DATABASE_URLS:
+    DATABASE_ROUTERS = ['core.sharding.BaseShardRouter']
 # Fallback for Windows/PostgreSQL particularities if needed, but dj_database_url usually works.
-# Make sure psycopg2-binary is installed.
+
+# PBKDF2 runs on a bounded thread pool (core/hashers.py) so login bursts
+# can't starve request threads: at most PASSWORD_HASH_WORKERS hashes run per
+# process and PASSWORD_HASH_QUEUE more wait up to PASSWORD_HASH_WAIT seconds,
+# beyond that logins get 503. The pooled hasher keeps the pbkdf2_sha256
+# algorithm name, so it replaces Django's default rather than sitting beside it.
+PASSWORD_HASHERS = [
+    'core.hashers.PooledPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+PASSWORD_HASH_QUEUE = int(os.getenv('PASSWORD_HASH_QUEUE', 16))
+PASSWORD_HASH_WAIT = float(os.getenv('PASSWORD_HASH_WAIT', 5))
 
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -101,4 +122,42 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # Token buckets shared across workers via LOCAL_STORE_PATH (core/throttling.py)
+    'DEFAULT_THROTTLE_CLASSES': (
+        # Anon/user budget and the view's throttle_scope in one transaction
+        'core.throttling.RequestBucketThrottle',
+    ),
+    'DEFAULT_THROTTLE_RATES': {
+        'anon': os.getenv('THROTTLE_ANON', '60/m'),
+        'user': os.getenv('THROTTLE_USER', '600/m'),
+        # Views opt in with throttle_scope
+        'auth': os.getenv('THROTTLE_AUTH', '10/m'),
+        'expensive': os.getenv('THROTTLE_EXPENSIVE', '30/m'),
+    },
 }
+
+# Idempotency-Key support on transaction POSTs (core/idempotency.py)
+IDEMPOTENCY_KEY_TTL = int(os.getenv('IDEMPOTENCY_KEY_TTL', 24 * 3600))
+# A PENDING key older than this is assumed abandoned by a crashed worker
+IDEMPOTENCY_LOCK_TIMEOUT = int(os.getenv('IDEMPOTENCY_LOCK_TIMEOUT', 60))
+
+# Background jobs (core/jobs.py, run by `manage.py run_jobs`)
+JOB_ARTIFACT_DIR = os.getenv('JOB_ARTIFACT_DIR', str(BASE_DIR / 'var' / 'artifacts'))
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 3))
+JOB_RETRY_BACKOFF = int(os.getenv('JOB_RETRY_BACKOFF', 30))  # seconds, doubled per attempt
+JOB_TIMEOUT = int(os.getenv('JOB_TIMEOUT', 3600))  # RUNNING longer than this is re-queued
+
+# Host-local SQLite file for state shared between gunicorn workers
+# (throttle buckets, locks). Must be on local disk, not a network share.
+LOCAL_STORE_PATH = os.getenv('LOCAL_STORE_PATH', str(BASE_DIR / 'var' / 'localstore.sqlite3'))
+
+# Bulk EXPENDITURE ingest (core/ingest.py): the flush_expenditures worker
+# applies staged events every EXPENDITURE_FLUSH_INTERVAL seconds
+EXPENDITURE_FLUSH_INTERVAL = float(os.getenv('EXPENDITURE_FLUSH_INTERVAL', 1.0))
+EXPENDITURE_FLUSH_BATCH = int(os.getenv('EXPENDITURE_FLUSH_BATCH', 5000))
+EXPENDITURE_EVENT_RETENTION = int(os.getenv('EXPENDITURE_EVENT_RETENTION', 24 * 3600))
+
+# Identical concurrent dashboard/matrix/analytics requests share one
+# computation (core.cache.single_flight); results are reused this long
+COALESCE_TTL = float(os.getenv('COALESCE_TTL', 2.0))
+COALESCE_WAIT = float(os.getenv('COALESCE_WAIT', 10.0))
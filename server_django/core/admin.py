@@ -1,6 +1,83 @@
+import json
+from datetime import datetime
+
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import User, Base, AssetType, Inventory, Transaction
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Min, Max, QuerySet
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from .models import User, Base, AssetType, AssetCategory, Inventory, Transaction, Movement, SerialItem, Job, ReconciliationRun
+
+# Below this many rows (by the planner's estimate) the exact count is cheap
+ESTIMATE_FROM = 100000
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    COUNT(*) on PostgreSQL reads every matching row, which takes seconds on a
+    ledger of millions. Large changelists use the planner's row estimate
+    (from the table statistics ANALYZE keeps) instead; small ones stay exact.
+    """
+    @cached_property
+    def count(self):
+        qs = self.object_list
+        connection = connections[qs.db]
+        if connection.vendor == 'postgresql':
+            sql, params = qs.order_by().query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+                plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            estimate = int(plan[0]['Plan']['Plan Rows'])
+            if estimate >= ESTIMATE_FROM:
+                return estimate
+        return super().count
+
+
+class IndexedDatesQuerySet(QuerySet):
+    """
+    date_hierarchy lists its years and months with SELECT DISTINCT over the
+    whole ledger. Here they come from MIN/MAX plus one EXISTS per candidate
+    period, each a short range probe on the date index.
+    """
+    def datetimes(self, field_name, kind, order='ASC', tzinfo=None):
+        if kind not in ('year', 'month'):
+            return super().datetimes(field_name, kind, order, tzinfo)
+        bounds = self.aggregate(first=Min(field_name), last=Max(field_name))
+        if bounds['first'] is None:
+            return []
+        tz = tzinfo or timezone.get_current_timezone()
+        first, last = (timezone.localtime(bounds[k], tz) for k in ('first', 'last'))
+        periods = []
+        year, month = first.year, first.month if kind == 'month' else 1
+        while (year, month) <= (last.year, last.month):
+            start = timezone.make_aware(datetime(year, month, 1), tz)
+            if kind == 'year':
+                year += 1
+            else:
+                year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+            end = timezone.make_aware(datetime(year, month, 1), tz)
+            if self.filter(**{f'{field_name}__gte': start, f'{field_name}__lt': end}).exists():
+                periods.append(start)
+        return periods if order == 'ASC' else periods[::-1]
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    # Changelists over tables that grow without bound
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        if self.date_hierarchy:
+            qs = IndexedDatesQuerySet(model=qs.model, query=qs.query, using=qs._db)
+        return qs
+
 
 # Define a custom UserAdmin to handle the extra fields (role, base)
 class CustomUserAdmin(UserAdmin):
@@ -12,10 +89,89 @@ class CustomUserAdmin(UserAdmin):
     )
     list_display = UserAdmin.list_display + ('role', 'base')
     list_filter = UserAdmin.list_filter + ('role', 'base')
+    list_select_related = ('base',)
+    autocomplete_fields = ('base',)
+
+
+class BaseAdmin(admin.ModelAdmin):
+    list_display = ('name', 'location', 'created_at')
+    search_fields = ('name', 'location')
+
+
+class AssetCategoryAdmin(admin.ModelAdmin):
+    list_display = ('name', 'parent')
+    list_select_related = ('parent',)
+    search_fields = ('name',)
+    autocomplete_fields = ('parent',)
+
+
+class AssetTypeAdmin(admin.ModelAdmin):
+    list_display = ('name', 'category', 'serialized')
+    list_select_related = ('category',)
+    list_filter = ('serialized', 'category')
+    search_fields = ('name',)
+    autocomplete_fields = ('category',)
+
+
+class InventoryAdmin(admin.ModelAdmin):
+    list_display = ('base', 'asset_type', 'quantity')
+    list_select_related = ('base', 'asset_type')
+    list_filter = ('base',)
+    search_fields = ('asset_type__name',)
+    autocomplete_fields = ('base', 'asset_type')
+
+
+class TransactionAdmin(LargeTableAdmin):
+    list_display = ('id', 'date', 'type', 'asset_type', 'quantity', 'from_base', 'to_base', 'recipient', 'performed_by')
+    list_select_related = ('asset_type', 'from_base', 'to_base', 'performed_by')
+    list_filter = ('type',)
+    date_hierarchy = 'date'
+    ordering = ('-date', '-id')
+    # Served by the pg_trgm index on recipient (migration 0009)
+    search_fields = ('recipient',)
+    autocomplete_fields = ('asset_type', 'from_base', 'to_base', 'performed_by', 'movement')
+
+
+class TransactionLineInline(admin.TabularInline):
+    model = Transaction
+    fields = ('asset_type', 'quantity')
+    autocomplete_fields = ('asset_type',)
+    extra = 0
+
+
+class MovementAdmin(LargeTableAdmin):
+    list_display = ('id', 'date', 'type', 'from_base', 'to_base', 'recipient', 'performed_by')
+    list_select_related = ('from_base', 'to_base', 'performed_by')
+    list_filter = ('type',)
+    date_hierarchy = 'date'
+    ordering = ('-date', '-id')
+    search_fields = ('=id', 'recipient')
+    autocomplete_fields = ('from_base', 'to_base', 'performed_by')
+    inlines = [TransactionLineInline]
+
+
+class SerialItemAdmin(LargeTableAdmin):
+    list_display = ('serial', 'asset_type', 'base', 'status', 'assigned_to', 'updated_at')
+    list_select_related = ('asset_type', 'base')
+    list_filter = ('status',)
+    search_fields = ('serial',)
+    autocomplete_fields = ('asset_type', 'base')
+
+    def get_search_results(self, request, queryset, search_term):
+        # Exact serial only: a case-insensitive match could not use the unique index
+        if not search_term.strip():
+            return queryset, False
+        return queryset.filter(serial=search_term.strip()), False
+
 
 # Register the models
 admin.site.register(User, CustomUserAdmin)
-admin.site.register(Base)
-admin.site.register(AssetType)
-admin.site.register(Inventory)
-admin.site.register(Transaction)
+admin.site.register(Base, BaseAdmin)
+admin.site.register(AssetCategory, AssetCategoryAdmin)
+admin.site.register(AssetType, AssetTypeAdmin)
+admin.site.register(Inventory, InventoryAdmin)
+admin.site.register(Transaction, TransactionAdmin)
+admin.site.register(Movement, MovementAdmin)
+admin.site.register(SerialItem, SerialItemAdmin)
+admin.site.register(Job)
+admin.site.register(ReconciliationRun)
@@ -0,0 +1,73 @@
+from django.db import IntegrityError, transaction as db_transaction
+from django.utils import timezone
+
+from .models import StockThreshold, StockAlert
+
+
+def check_thresholds(base_id, asset_type_id, old_qty, new_qty):
+    """
+    Raise or resolve alerts for one (base, asset_type) after its stock moved
+    from old_qty to new_qty. Only the touched pair is looked at, so the cost
+    follows write volume rather than the size of Inventory.
+    """
+    threshold = StockThreshold.objects.filter(base_id=base_id, asset_type_id=asset_type_id).first()
+    if threshold is None:
+        return
+    levels = [
+        (StockAlert.Level.REORDER, threshold.reorder_level),
+        (StockAlert.Level.CRITICAL, threshold.minimum),
+    ]
+    for level, limit in levels:
+        if new_qty < limit <= old_qty:
+            try:
+                with db_transaction.atomic():
+                    StockAlert.objects.create(
+                        base_id=base_id, asset_type_id=asset_type_id,
+                        level=level, threshold=limit, quantity=new_qty
+                    )
+            except IntegrityError:
+                pass  # Already open
+        elif old_qty < limit <= new_qty:
+            StockAlert.objects.filter(
+                base_id=base_id, asset_type_id=asset_type_id, level=level, resolved_at__isnull=True
+            ).update(resolved_at=timezone.now())
+
+
+def check_changes(changes):
+    """
+    check_thresholds for many pairs at once, {(base, asset_type): (old_qty,
+    new_qty)}; one query finds the pairs that have a threshold at all.
+    """
+    if not changes:
+        return
+    watched = set(
+        StockThreshold.objects.filter(
+            base_id__in={b for b, _ in changes}, asset_type_id__in={a for _, a in changes}
+        ).values_list('base_id', 'asset_type_id')
+    )
+    for (base_id, asset_type_id), (old_qty, new_qty) in changes.items():
+        if (base_id, asset_type_id) in watched:
+            check_thresholds(base_id, asset_type_id, old_qty, new_qty)
+
+
+def evaluate_threshold(threshold):
+    # Bring alerts in line with current stock after a threshold is set or changed
+    from .models import Inventory
+
+    inv = Inventory.objects.filter(base_id=threshold.base_id, asset_type_id=threshold.asset_type_id).first()
+    qty = inv.quantity if inv else 0
+    for level, limit in [
+        (StockAlert.Level.REORDER, threshold.reorder_level),
+        (StockAlert.Level.CRITICAL, threshold.minimum),
+    ]:
+        open_alerts = StockAlert.objects.filter(
+            base_id=threshold.base_id, asset_type_id=threshold.asset_type_id, level=level, resolved_at__isnull=True
+        )
+        if qty < limit:
+            if not open_alerts.exists():
+                StockAlert.objects.create(
+                    base_id=threshold.base_id, asset_type_id=threshold.asset_type_id,
+                    level=level, threshold=limit, quantity=qty
+                )
+        else:
+            open_alerts.update(resolved_at=timezone.now())
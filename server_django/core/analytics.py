@@ -0,0 +1,113 @@
+from datetime import timedelta
+
+import numpy as np
+from django.db.models import F
+from django.utils import timezone
+
+from .models import DailyMovement, Inventory
+from .sharding import gather
+
+
+def _shard_rows(queryset_fn):
+    # The rows of every shard (each holds its own bases) as one list
+    return [row for part in gather(lambda: list(queryset_fn())) for row in part]
+
+
+def consumption_matrix(days):
+    """
+    Daily ASSIGNMENT + EXPENDITURE totals for the last `days` days as a
+    (pairs x days) array, loaded from DailyMovement in one query per shard.
+    Returns (base_ids, asset_ids, matrix); the last column is today.
+    """
+    today = timezone.localdate()
+    start = today - timedelta(days=days - 1)
+    rows = np.array(
+        _shard_rows(lambda: DailyMovement.objects.filter(day__gte=start, day__lte=today)
+                    .annotate(used=F('assigned') + F('expended'))
+                    .exclude(used=0)
+                    .values_list('base_id', 'asset_type_id', 'day', 'used')),
+        dtype=object,
+    ).reshape(-1, 4)
+    if not len(rows):
+        return np.empty(0, np.int64), np.empty(0, np.int64), np.zeros((0, days))
+
+    base = rows[:, 0].astype(np.int64)
+    asset = rows[:, 1].astype(np.int64)
+    col = np.fromiter(((d - start).days for d in rows[:, 2]), np.int64, len(rows))
+    pairs, row_idx = np.unique(np.stack([base, asset], axis=1), axis=0, return_inverse=True)
+    matrix = np.zeros((len(pairs), days), dtype=np.float32)
+    np.add.at(matrix, (row_idx.ravel(), col), rows[:, 3].astype(np.float64))
+    return pairs[:, 0], pairs[:, 1], matrix
+
+
+def smoothed_rate(matrix, alpha):
+    # Simple exponential smoothing over each row at once, written as one
+    # matrix-vector product: level = sum(alpha * (1-alpha)^k * x[T-k]).
+    n = matrix.shape[1]
+    if n == 0:
+        return np.zeros(matrix.shape[0])
+    weights = alpha * (1 - alpha) ** np.arange(n - 1, -1, -1)
+    weights[0] = (1 - alpha) ** (n - 1)  # Oldest value seeds the level
+    return matrix @ weights
+
+
+def forecast(days=90, alpha=0.3):
+    """
+    Burn rates, smoothed daily forecast and projected days of supply for
+    every (base, asset_type) pair with stock or recent consumption, most
+    urgent first. Returns a dict of parallel numpy arrays, so callers can
+    select rows with a mask before anything is converted (see columns()).
+    """
+    base_ids, asset_ids, matrix = consumption_matrix(days)
+
+    inv = np.array(
+        _shard_rows(lambda: Inventory.objects.values_list('base_id', 'asset_type_id', 'quantity')), dtype=np.int64
+    ).reshape(-1, 3)
+
+    # Union of pairs from consumption and inventory, aligned by sorted key
+    cons_keys = np.stack([base_ids, asset_ids], axis=1)
+    keys = np.unique(np.concatenate([cons_keys, inv[:, :2]]), axis=0)
+    n = len(keys)
+
+    def align(src_keys):
+        return np.searchsorted(keys[:, 0] * (1 << 32) + keys[:, 1], src_keys[:, 0] * (1 << 32) + src_keys[:, 1])
+
+    full = np.zeros((n, days), dtype=np.float32)
+    if len(cons_keys):
+        full[align(cons_keys)] = matrix
+    quantity = np.zeros(n)
+    if len(inv):
+        quantity[align(inv[:, :2])] = inv[:, 2]
+
+    burn_7 = full[:, -7:].mean(axis=1) if days >= 7 else full.mean(axis=1)
+    burn_28 = full[:, -28:].mean(axis=1) if days >= 28 else full.mean(axis=1)
+    rate = smoothed_rate(full, alpha)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        supply = np.where(rate > 0, np.maximum(quantity, 0) / rate, np.inf)
+
+    order = np.argsort(supply, kind='stable')
+    return {
+        'base': keys[order, 0],
+        'asset_type': keys[order, 1],
+        'quantity': quantity[order].astype(np.int64),
+        'burn_7d': np.round(burn_7[order], 2),
+        'burn_28d': np.round(burn_28[order], 2),
+        'forecast': np.round(rate[order], 2),
+        # inf: no consumption, so stock never runs out
+        'days_of_supply': np.round(supply[order], 1),
+    }
+
+
+def columns(data, rows):
+    # JSON-ready lists for the selected rows (an index array or slice)
+    supply = data['days_of_supply'][rows]
+    return {
+        'base': data['base'][rows].tolist(),
+        'asset_type': data['asset_type'][rows].tolist(),
+        'quantity': data['quantity'][rows].tolist(),
+        'burn_7d': data['burn_7d'][rows].astype(float).tolist(),
+        'burn_28d': data['burn_28d'][rows].astype(float).tolist(),
+        'forecast': data['forecast'][rows].astype(float).tolist(),
+        'days_of_supply': [None if np.isinf(x) else float(x) for x in supply],
+    }
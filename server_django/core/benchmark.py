@@ -0,0 +1,78 @@
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from django.db import connection
+
+
+@contextmanager
+def scratch_database(keepdb=False):
+    """
+    Run a benchmark against a throwaway test database (test_<NAME>) so
+    seeding millions of rows never touches real data.
+    """
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=keepdb)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+
+
+def measure(func, *args, trace_memory=True, **kwargs):
+    """
+    Wall time, query count and peak Python memory of one call. Memory
+    tracing slows Python-heavy code noticeably; pass trace_memory=False
+    for timing-only runs.
+    """
+    queries = 0
+
+    def count(execute, sql, params, many, context):
+        # Counted here rather than from connection.queries, which keeps
+        # only the last 9000 entries
+        nonlocal queries
+        queries += 1
+        return execute(sql, params, many, context)
+
+    if trace_memory:
+        tracemalloc.start()
+    with connection.execute_wrapper(count):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+    peak = 0
+    if trace_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result, {'seconds': elapsed, 'queries': queries, 'peak_kb': peak // 1024}
+
+
+def load_baseline(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def compare(results, baseline, tolerance=0.25, query_tolerance=0):
+    """
+    Check each case against its baseline entry. Query counts may grow by
+    at most `query_tolerance`; seconds and peak_kb by at most `tolerance`
+    (a fraction). Returns (regressions, new_cases). Tiny values get a
+    small absolute allowance so timer noise cannot fail a run.
+    """
+    regressions, new = [], []
+    for case, got in results.items():
+        base = baseline.get(case)
+        if base is None:
+            new.append(case)
+            continue
+        if got['queries'] > base['queries'] + query_tolerance:
+            regressions.append(f"{case}: {got['queries']} queries (baseline {base['queries']})")
+        if got['seconds'] > base['seconds'] * (1 + tolerance) + 0.002:
+            regressions.append(f"{case}: {got['seconds'] * 1000:.1f} ms (baseline {base['seconds'] * 1000:.1f} ms)")
+        if got['peak_kb'] > base['peak_kb'] * (1 + tolerance) + 64:
+            regressions.append(f"{case}: {got['peak_kb']} KB peak (baseline {base['peak_kb']} KB)")
+    return regressions, new
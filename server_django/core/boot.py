@@ -0,0 +1,140 @@
+import hashlib
+import hmac
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection, connections, DatabaseError
+
+from .models import BootStep
+
+
+def _digest(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else str(part).encode())
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def migrations_fingerprint():
+    # Content of every installed app's migration files; cheaper than
+    # building the migration graph just to learn there is nothing to do.
+    parts = []
+    for app in apps.get_app_configs():
+        folder = Path(app.path) / 'migrations'
+        if folder.is_dir():
+            for f in sorted(folder.glob('*.py')):
+                parts += [app.label, f.name, f.read_bytes()]
+    return _digest(*parts)
+
+
+def admin_fingerprint():
+    # Keyed, so the stored value can't be checked against password guesses
+    # without SECRET_KEY
+    password = os.environ.get('ADMIN_PASSWORD', 'admin123')
+    keyed = hmac.new(settings.SECRET_KEY.encode(), password.encode(), hashlib.sha256).hexdigest()
+    return _digest(os.environ.get('ADMIN_USERNAME', 'admin'), keyed)
+
+
+def seed_fingerprint():
+    from .management.commands import seed_data
+    return _digest(Path(seed_data.__file__).read_bytes())
+
+
+# (step, fingerprint, command) in the order they run
+STEPS = [
+    ('migrate', migrations_fingerprint, ('migrate', '--no-input')),
+    ('seed_admin', admin_fingerprint, ('seed_admin',)),
+    ('seed_data', seed_fingerprint, ('seed_data',)),
+]
+
+
+def recorded():
+    try:
+        return dict(BootStep.objects.values_list('name', 'fingerprint'))
+    except DatabaseError:
+        # First boot: the table does not exist until migrate has run
+        connection.close()
+        return {}
+
+
+# pg_advisory_lock key shared by every instance of the service
+BOOT_LOCK = int.from_bytes(hashlib.sha256(b'core.boot').digest()[:8], 'big', signed=True)
+
+
+@contextmanager
+def boot_lock():
+    """
+    Serialise boots across instances: on PostgreSQL, a session advisory lock
+    held on a connection of its own, so migrate (or recorded() closing the
+    default connection) can't drop it. Instances that start together wait
+    here, then find the steps already recorded. SQLite has one host and
+    needs none.
+    """
+    lock = connections.create_connection('default')
+    try:
+        if lock.vendor != 'postgresql':
+            yield
+            return
+        with lock.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_lock(%s)', [BOOT_LOCK])
+        try:
+            yield
+        finally:
+            with lock.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_unlock(%s)', [BOOT_LOCK])
+    finally:
+        lock.close()
+
+
+def run(force=False, stdout=None):
+    """
+    Run each boot step whose inputs changed since it last succeeded and
+    record its fingerprint, one instance at a time (see boot_lock).
+    Returns [(phase, seconds, ran)].
+    """
+    timings = []
+    start = time.perf_counter()
+    with boot_lock():
+        # Read under the lock: an instance that just finished has recorded its steps
+        done = {} if force else recorded()
+        timings.append(('check', time.perf_counter() - start, True))
+
+        for name, fingerprint, command in STEPS:
+            start = time.perf_counter()
+            value = fingerprint()
+            if done.get(name) == value:
+                timings.append((name, time.perf_counter() - start, False))
+                continue
+            call_command(*command, stdout=stdout)
+            seconds = time.perf_counter() - start
+            BootStep.objects.update_or_create(name=name, defaults={'fingerprint': value, 'seconds': seconds})
+            timings.append((name, seconds, True))
+    return timings
+
+
+def warm_caches():
+    """
+    Build the shared read caches before workers fork, so they inherit them
+    instead of each paying for the first request. Connections are closed
+    afterwards: sockets (and the pool) must not be shared across a fork.
+    """
+    from .cache import get_or_build
+    from .views import public_users
+    from .matrix import inventory_matrix
+    from .analytics import forecast
+
+    start = time.perf_counter()
+    get_or_build('public_users', public_users)
+    inventory_matrix()
+    get_or_build('forecast', lambda: forecast(90, 0.3), params='90:0.3', timeout=600)
+    for conn in connections.all():
+        conn.close()
+        if hasattr(conn, 'close_pool'):
+            conn.close_pool()
+    return time.perf_counter() - start
@@ -0,0 +1,80 @@
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .localstore import local_store
+
+# How often a waiting request re-checks for the leader's result
+FLIGHT_POLL = 0.02
+
+
+def get_version(name):
+    return int(local_store.get(f'version:{name}') or 0)
+
+
+def bump_version(name):
+    # Stored in the shared local store so every worker sees the bump at once;
+    # entries cached under the old version simply stop being read.
+    key = f'version:{name}'
+    with local_store.transaction() as conn:
+        row = conn.execute('SELECT value FROM kv WHERE key = ?', (key,)).fetchone()
+        version = int(row[0]) + 1 if row else 1
+        conn.execute(
+            'INSERT OR REPLACE INTO kv (key, value, expires) VALUES (?, ?, NULL)',
+            (key, str(version))
+        )
+    return version
+
+
+def get_or_build(name, build, params='', timeout=300):
+    """
+    Return the cached value for `name` (plus optional `params`) at its current
+    version, calling `build()` on a miss.
+    """
+    key = f'{name}:v{get_version(name)}:{params}'
+    value = cache.get(key)
+    if value is None:
+        value = build()
+        cache.set(key, value, timeout)
+    return value
+
+
+def single_flight(key, build):
+    """
+    Share one computation among concurrent identical requests on this host.
+    The first caller takes a local_store lock and runs `build()`; the others
+    poll (reads only) for its JSON-encoded result, which stays readable for
+    COALESCE_TTL seconds, and only try for the lock again once it is gone
+    or expired. Every caller, the leader included, gets the decoded JSON,
+    so they all see the same types. The key carries the inventory version,
+    so a committed stock change is never hidden behind a stored result.
+
+    A waiter whose leader fails or takes longer than COALESCE_WAIT computes
+    the value itself. COALESCE_TTL=0 turns coalescing off.
+    """
+    if settings.COALESCE_TTL <= 0:
+        return build()
+    key = f'flight:v{get_version("inventory_matrix")}:{key}'
+    value = local_store.get(key)
+    if value is not None:
+        return json.loads(value)
+
+    lock = f'lock:{key}'
+    deadline = time.monotonic() + settings.COALESCE_WAIT
+    # get() skips expired rows, so a held lock costs waiters no write transaction
+    while local_store.get(lock) is not None or not local_store.add(lock, '1', ttl=settings.COALESCE_WAIT):
+        time.sleep(FLIGHT_POLL)
+        value = local_store.get(key)
+        if value is not None:
+            return json.loads(value)
+        if time.monotonic() >= deadline:
+            return build()
+    try:
+        value = json.dumps(build(), cls=DjangoJSONEncoder)
+        local_store.set(key, value, ttl=settings.COALESCE_TTL)
+        return json.loads(value)
+    finally:
+        local_store.delete(lock)
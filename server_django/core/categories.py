@@ -0,0 +1,178 @@
+"""
+Asset-type categories. CategoryClosure holds every (ancestor, descendant)
+pair of the hierarchy, so "everything under X" is one indexed join however
+deep the tree is. CategoryStock and CategoryDailyMovement are Inventory and
+DailyMovement summed per (base, category), with each asset type counted
+towards its own category and every ancestor; they are updated in the same
+transaction as the rows they summarise, so reads never walk the tree.
+"""
+from collections import defaultdict
+
+from django.db import connections, router, transaction as db_transaction
+from django.db.models import F, Sum
+
+from .cache import get_or_build, bump_version
+from .models import AssetType, AssetCategory, CategoryClosure, CategoryStock, CategoryDailyMovement, Inventory, DailyMovement
+from .sharding import gather, replicate, enabled as sharding_enabled
+from .timeseries import movement_legs, COLUMNS
+
+ROLLUP = 'asset_type__category__ancestor_links__ancestor_id'
+
+
+def category_map():
+    # {asset_type_id: [category ids it rolls up into]}, categorised types only
+    def build():
+        rows = AssetType.objects.filter(category__isnull=False).values_list('id', 'category__ancestor_links__ancestor_id')
+        m = defaultdict(list)
+        for asset_type_id, category_id in rows:
+            m[asset_type_id].append(category_id)
+        return dict(m)
+    return get_or_build('asset_categories', build)
+
+
+def asset_types_in(category_id):
+    return AssetType.objects.filter(category__ancestor_links__ancestor_id=category_id)
+
+
+def roll_up(stock, buckets):
+    """
+    Add Inventory deltas {(base, asset_type): qty} and DailyMovement deltas
+    {(base, asset_type, day): {column: qty}} to the categories above each
+    asset type, one upsert per table. Must run inside the caller's
+    transaction, on the database the router picks for the rollups.
+    """
+    from .movements import add_rows
+
+    categories = category_map()
+    category_stock = defaultdict(int)
+    category_buckets = defaultdict(lambda: dict.fromkeys(COLUMNS, 0))
+    for (base_id, asset_type_id), qty in stock.items():
+        for category_id in categories.get(asset_type_id, ()):
+            category_stock[(base_id, category_id)] += qty
+    for (base_id, asset_type_id, day), columns in buckets.items():
+        for category_id in categories.get(asset_type_id, ()):
+            row = category_buckets[(base_id, category_id, day)]
+            for column, qty in columns.items():
+                row[column] += qty
+
+    if category_stock:
+        add_rows(
+            CategoryStock, ['base_id', 'category_id'], ['quantity'],
+            [(b, c, qty) for (b, c), qty in category_stock.items()],
+        )
+    if category_buckets:
+        adapt = connections[router.db_for_write(CategoryDailyMovement)].ops.adapt_datefield_value
+        add_rows(
+            CategoryDailyMovement, ['base_id', 'category_id', 'day'], COLUMNS,
+            [(b, c, adapt(day), *(v[col] for col in COLUMNS)) for (b, c, day), v in category_buckets.items()],
+        )
+
+
+def roll_up_transaction(tx, base_id=None):
+    # roll_up for one ledger row (only `base_id`'s side of it, if given)
+    from django.utils import timezone
+    from .movements import INCREASES
+
+    day = timezone.localdate(tx.date)
+    stock = defaultdict(int)
+    buckets = defaultdict(lambda: dict.fromkeys(COLUMNS, 0))
+    for leg_base, column, qty in movement_legs(tx):
+        if base_id is not None and leg_base != base_id:
+            continue
+        stock[(leg_base, tx.asset_type_id)] += qty if column in INCREASES else -qty
+        buckets[(leg_base, tx.asset_type_id, day)][column] += qty
+    roll_up(stock, buckets)
+
+
+def rebuild(category_ids=None):
+    """
+    Recompute the rollups (for `category_ids`, or all) from Inventory and
+    DailyMovement with one grouped query each. Used when the hierarchy or an
+    asset type's category changes, and by `manage.py backfill_movements`.
+    """
+    stock = CategoryStock.objects.all()
+    buckets = CategoryDailyMovement.objects.all()
+    inventory = Inventory.objects.filter(asset_type__category__isnull=False)
+    movements = DailyMovement.objects.filter(asset_type__category__isnull=False)
+    if category_ids is not None:
+        stock = stock.filter(category_id__in=category_ids)
+        buckets = buckets.filter(category_id__in=category_ids)
+        inventory = inventory.filter(**{f'{ROLLUP}__in': category_ids})
+        movements = movements.filter(**{f'{ROLLUP}__in': category_ids})
+
+    with db_transaction.atomic(using=router.db_for_write(CategoryStock)):
+        stock.delete()
+        buckets.delete()
+        CategoryStock.objects.bulk_create(
+            [
+                CategoryStock(base_id=r['base_id'], category_id=r['category'], quantity=r['quantity'])
+                for r in inventory.order_by().values('base_id', category=F(ROLLUP)).annotate(quantity=Sum('quantity'))
+            ],
+            batch_size=5000,
+        )
+        CategoryDailyMovement.objects.bulk_create(
+            [
+                CategoryDailyMovement(base_id=r.pop('base_id'), category_id=r.pop('category'), day=r.pop('day'), **r)
+                for r in movements.order_by().values('base_id', 'day', category=F(ROLLUP))
+                .annotate(**{c: Sum(c) for c in COLUMNS})
+            ],
+            batch_size=5000,
+        )
+
+
+def ancestors(category_id):
+    if category_id is None:
+        return set()
+    return set(CategoryClosure.objects.filter(descendant_id=category_id).values_list('ancestor_id', flat=True))
+
+
+def attach(category):
+    """
+    Bring the closure rows of `category` and its subtree in line with its
+    parent: links to the old ancestors are dropped and the subtree is joined
+    under the new ones. Returns the categories whose rollups changed.
+    """
+    links = CategoryClosure.objects
+    subtree = dict(links.filter(ancestor=category).values_list('descendant_id', 'depth'))
+    if not subtree:
+        # New node: only itself below it
+        links.create(ancestor=category, descendant=category, depth=0)
+        subtree = {category.pk: 0}
+    old = set(links.filter(descendant=category, depth__gt=0).values_list('ancestor_id', flat=True))
+    above = list(links.filter(descendant_id=category.parent_id).values_list('ancestor_id', 'depth'))
+    if category.parent_id in subtree:
+        raise ValueError("A category can't be moved under itself or its descendants")
+    if old == {a for a, _ in above}:
+        return set()
+
+    links.filter(ancestor_id__in=old, descendant_id__in=subtree).delete()
+    links.bulk_create([
+        CategoryClosure(ancestor_id=a, descendant_id=d, depth=a_depth + 1 + d_depth)
+        for a, a_depth in above for d, d_depth in subtree.items()
+    ])
+    return old | {a for a, _ in above}
+
+
+def sync_reference():
+    # Shards get the categories and the whole (small) closure table afresh
+    if not sharding_enabled():
+        return
+    from django.conf import settings
+    replicate(AssetCategory, list(AssetCategory.objects.using('default').order_by('pk')))
+    closure = list(CategoryClosure.objects.using('default').all())
+    for alias in settings.SHARDS:
+        with db_transaction.atomic(using=alias):
+            CategoryClosure.objects.using(alias).all().delete()
+            CategoryClosure.objects.using(alias).bulk_create(closure, batch_size=5000)
+
+
+def regroup(category_ids):
+    """
+    After a hierarchy change commits: new category_map for every worker,
+    fresh reference copies on the shards, and the rollups of the affected
+    categories recomputed (on every shard).
+    """
+    bump_version('asset_categories')
+    sync_reference()
+    if category_ids:
+        gather(rebuild, list(category_ids))
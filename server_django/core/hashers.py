@@ -0,0 +1,57 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class HashPoolBusy(APIException):
+    # Every hashing slot is taken; the login is shed rather than queued
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Too many logins in progress, try again shortly.'
+    default_code = 'hash_pool_busy'
+
+
+def hash_pool():
+    """
+    (executor, slots) for this process: PASSWORD_HASH_WORKERS threads, and
+    a semaphore over the PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE hashes
+    allowed to be running or waiting at once. Created lazily, and again
+    after fork, so each gunicorn worker gets its own.
+    """
+    global _pool
+    key = (os.getpid(), settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_QUEUE)
+    with _pool_lock:
+        if _pool is None or _pool[0] != key:
+            _pool = (
+                key,
+                ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix='pbkdf2'),
+                threading.BoundedSemaphore(settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_QUEUE),
+            )
+        return _pool[1], _pool[2]
+
+
+class PooledPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    Same algorithm and hash format as Django's PBKDF2 hasher, but the key
+    derivation runs on a bounded thread pool. hashlib releases the GIL while
+    deriving, so a login burst uses at most PASSWORD_HASH_WORKERS cores and
+    the other request threads keep serving API traffic. Once the queue is
+    full, a hash that can't get a slot within PASSWORD_HASH_WAIT seconds
+    raises HashPoolBusy (503) instead of piling up behind the others.
+    """
+
+    def encode(self, password, salt, iterations=None):
+        executor, slots = hash_pool()
+        if not slots.acquire(timeout=settings.PASSWORD_HASH_WAIT):
+            raise HashPoolBusy()
+        try:
+            return executor.submit(super().encode, password, salt, iterations).result()
+        finally:
+            slots.release()
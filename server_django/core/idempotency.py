@@ -0,0 +1,140 @@
+import hashlib
+import json
+import random
+from contextlib import ExitStack
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+
+
+def request_fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(f'{request.method}:{request.path}:{body}'.encode()).hexdigest()
+
+
+def purge_expired():
+    return IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()[0]
+
+
+class IdempotentCreateMixin:
+    """
+    Makes create() safe to retry. When the client sends an Idempotency-Key
+    header, the first request claims the key, and the response is stored in
+    the same DB transaction as the write. Replays return the stored response
+    without running the write again. A duplicate that arrives while the first
+    request is still running gets 409, and reusing a key with a different
+    body gets 422. A request that outlives IDEMPOTENCY_LOCK_TIMEOUT loses
+    its claim to the next retry and rolls its write back, on every shard
+    the write touched. Views without create() wrap their write in
+    idempotent() instead.
+    """
+
+    def create(self, request, *args, **kwargs):
+        write = super().create
+        return self.idempotent(request, lambda: write(request, *args, **kwargs))
+
+    def idempotent(self, request, write):
+        key = request.headers.get(HEADER)
+        if not key:
+            return write()
+
+        now = timezone.now()
+        fingerprint = request_fingerprint(request)
+        record, replay = self._claim_key(request.user, key, fingerprint, now)
+        if replay is not None:
+            return replay
+
+        # Our claim, as long as no other request has taken it over as stale
+        claim = IdempotencyKey.objects.filter(pk=record.pk, created_at=record.created_at)
+        # The ledger write may land on a shard; hold each database's
+        # transaction open until the claim is settled
+        aliases = list(dict.fromkeys(['default', *settings.SHARDS]))
+        try:
+            with ExitStack() as stack:
+                for alias in aliases:
+                    stack.enter_context(db_transaction.atomic(using=alias))
+                response = write()
+                if status.is_success(response.status_code):
+                    completed = claim.filter(state=IdempotencyKey.State.PENDING).update(
+                        state=IdempotencyKey.State.COMPLETED,
+                        status_code=response.status_code,
+                        response=response.data,
+                    )
+                    if not completed:
+                        # The new owner performs the write; undo ours
+                        for alias in aliases:
+                            db_transaction.set_rollback(True, using=alias)
+                        return self._in_flight()
+        except BaseException:
+            # Release the claim so the client can retry
+            claim.delete()
+            raise
+
+        if not status.is_success(response.status_code):
+            claim.delete()
+        # Occasional TTL sweep keeps the table small
+        if random.random() < 0.01:
+            purge_expired()
+        return response
+
+    def _claim_key(self, user, key, fingerprint, now):
+        ttl = timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+        stale = now - timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT)
+        try:
+            with db_transaction.atomic():
+                record = IdempotencyKey.objects.create(
+                    user=user, key=key, fingerprint=fingerprint, expires_at=now + ttl
+                )
+            return record, None
+        except IntegrityError:
+            pass
+
+        existing = IdempotencyKey.objects.filter(user=user, key=key).first()
+        if existing is None:
+            # Released between our insert and read; let the client retry
+            return None, self._in_flight()
+        if existing.expires_at <= now or (
+            existing.state == IdempotencyKey.State.PENDING and existing.created_at < stale
+        ):
+            # Expired, or abandoned by a crashed worker. Matching on created_at
+            # makes the takeover a compare-and-swap so only one request wins;
+            # the state/expiry guard loses to a claim completed meanwhile.
+            claimed = IdempotencyKey.objects.filter(
+                Q(expires_at__lte=now) | Q(state=IdempotencyKey.State.PENDING),
+                pk=existing.pk, created_at=existing.created_at,
+            ).update(
+                fingerprint=fingerprint, state=IdempotencyKey.State.PENDING,
+                status_code=None, response=None, created_at=now, expires_at=now + ttl
+            )
+            if claimed:
+                existing.refresh_from_db()
+                return existing, None
+            return None, self._in_flight()
+
+        if existing.fingerprint != fingerprint:
+            return None, Response(
+                {"error": f"{HEADER} was already used with a different request"},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+        if existing.state == IdempotencyKey.State.PENDING:
+            return None, self._in_flight()
+
+        response = Response(existing.response, status=existing.status_code)
+        response['Idempotent-Replayed'] = 'true'
+        return None, response
+
+    def _in_flight(self):
+        return Response(
+            {"error": "A request with this Idempotency-Key is still in progress"},
+            status=status.HTTP_409_CONFLICT,
+            headers={'Retry-After': '1'}
+        )
@@ -0,0 +1,233 @@
+import csv
+import hashlib
+import json
+from datetime import datetime
+
+from django.db import connection, transaction as db_transaction
+from django.utils import timezone
+
+from .alerts import check_changes
+from .models import Base, AssetType, User, Transaction, ImportCheckpoint
+from .timeseries import COLUMNS
+
+T = Transaction.Type
+FIELDS = ['type', 'asset_type', 'quantity', 'date', 'from_base', 'to_base', 'recipient', 'performed_by']
+STAGING = 'import_staging'
+STAGING_COLUMNS = [
+    'seq', 'type', 'asset_type_id', 'quantity', 'date', 'from_base_id', 'to_base_id',
+    'recipient', 'performed_by_id', 'movement_id',
+]
+
+
+class InvalidRecord(Exception):
+    pass
+
+
+class CheckpointMoved(Exception):
+    # Another run imported this part of the file first
+    pass
+
+
+def read_records(path, fmt=None):
+    """
+    Stream dicts from a CSV (header row) or NDJSON file; the format follows
+    the extension unless given.
+    """
+    fmt = fmt or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+    with open(path, newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+class Resolver:
+    # Name -> id maps built once, so validating a row never queries
+    def __init__(self):
+        self.bases = dict(Base.objects.values_list('name', 'id'))
+        self.assets = dict(AssetType.objects.values_list('name', 'id'))
+        self.users = dict(User.objects.values_list('username', 'id'))
+        self.serialized = set(AssetType.objects.filter(serialized=True).values_list('name', flat=True))
+
+    def _lookup(self, table, name, label):
+        if not name:
+            return None
+        try:
+            return table[name]
+        except KeyError:
+            raise InvalidRecord(f"unknown {label} {name!r}")
+
+    def row(self, seq, record):
+        """
+        One staging row for a record, or InvalidRecord. Applies the same
+        rules as MovementSerializer.validate.
+        """
+        kind = str(record.get('type') or '').strip().upper()
+        if kind not in T.values:
+            raise InvalidRecord(f"type must be one of {', '.join(T.values)}")
+        asset = str(record.get('asset_type') or '').strip()
+        if asset in self.serialized:
+            raise InvalidRecord(f"{asset!r} is serialized; import its units with the serials API")
+        asset_id = self._lookup(self.assets, asset, 'asset type')
+        if asset_id is None:
+            raise InvalidRecord("asset_type is required")
+        try:
+            quantity = int(record.get('quantity'))
+        except (TypeError, ValueError):
+            raise InvalidRecord("quantity must be an integer")
+        if quantity <= 0:
+            raise InvalidRecord("quantity must be positive")
+        try:
+            date = datetime.fromisoformat(str(record.get('date') or '').strip())
+        except ValueError:
+            raise InvalidRecord("date must be ISO 8601")
+        if timezone.is_naive(date):
+            date = timezone.make_aware(date)
+        from_base = self._lookup(self.bases, str(record.get('from_base') or '').strip(), 'base')
+        to_base = self._lookup(self.bases, str(record.get('to_base') or '').strip(), 'base')
+        if kind == T.PURCHASE and not to_base:
+            raise InvalidRecord("a purchase needs to_base")
+        if kind == T.TRANSFER and (not from_base or not to_base or from_base == to_base):
+            raise InvalidRecord("a transfer needs two different bases")
+        if kind in (T.ASSIGNMENT, T.EXPENDITURE) and not from_base:
+            raise InvalidRecord("assignments and expenditures need from_base")
+        user = self._lookup(self.users, str(record.get('performed_by') or '').strip(), 'user')
+        recipient = str(record.get('recipient') or '').strip() or None
+        return [
+            seq, kind, asset_id, quantity, connection.ops.adapt_datetimefield_value(date),
+            from_base, to_base, recipient, user, None,
+        ]
+
+
+def file_digest(path):
+    # Identifies a source file by content, whatever it is called
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def advance(checkpoint, start, end):
+    """
+    Move `checkpoint` from record `start` to `end`; CheckpointMoved if it is
+    no longer at `start`. Called inside the chunk's transaction, so the
+    records and the checkpoint commit (or roll back) together.
+    """
+    moved = ImportCheckpoint.objects.filter(pk=checkpoint.pk, offset=start).update(offset=end)
+    if not moved:
+        raise CheckpointMoved(start)
+    checkpoint.offset = end
+
+
+def create_staging():
+    # Session-local, so parallel imports never see each other's rows
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            CREATE TEMPORARY TABLE IF NOT EXISTS {STAGING} (
+                seq integer, type varchar(50), asset_type_id bigint, quantity integer,
+                date timestamp{' with time zone' if connection.vendor == 'postgresql' else ''},
+                from_base_id bigint, to_base_id bigint, recipient varchar(255),
+                performed_by_id bigint, movement_id bigint
+            )""")
+
+
+def _load(cursor, rows):
+    if connection.vendor == 'postgresql':
+        # COPY streams the chunk in one round trip, without per-row parsing
+        with cursor.cursor.copy(f"COPY {STAGING} ({', '.join(STAGING_COLUMNS)}) FROM STDIN") as copy:
+            for row in rows:
+                copy.write_row(row)
+    else:
+        cursor.executemany(
+            f"INSERT INTO {STAGING} ({', '.join(STAGING_COLUMNS)}) VALUES ({', '.join(['%s'] * len(STAGING_COLUMNS))})",
+            rows,
+        )
+
+
+def _legs():
+    # One row per stock leg of each staged transaction, as (base, asset, date, column, signed qty)
+    return f"""
+        SELECT to_base_id AS base_id, asset_type_id, date, 'purchases' AS col, quantity AS qty
+          FROM {STAGING} WHERE type = '{T.PURCHASE}'
+        UNION ALL
+        SELECT to_base_id, asset_type_id, date, 'transfer_in', quantity
+          FROM {STAGING} WHERE type = '{T.TRANSFER}'
+        UNION ALL
+        SELECT from_base_id, asset_type_id, date, 'transfer_out', -quantity
+          FROM {STAGING} WHERE type = '{T.TRANSFER}'
+        UNION ALL
+        SELECT from_base_id, asset_type_id, date, 'assigned', -quantity
+          FROM {STAGING} WHERE type = '{T.ASSIGNMENT}'
+        UNION ALL
+        SELECT from_base_id, asset_type_id, date, 'expended', -quantity
+          FROM {STAGING} WHERE type = '{T.EXPENDITURE}'"""
+
+
+def merge_chunk(rows, progress=None):
+    """
+    Load one validated chunk and apply it in a single transaction: movement
+    headers and ledger lines by INSERT ... SELECT from the staging table,
+    then Inventory, the DailyMovement buckets and their category rollups
+    for the affected pairs with one grouped upsert each, and stock alerts
+    for the pairs that have thresholds. `progress` (checkpoint, start, end)
+    is advanced in the same transaction. A chunk is either fully imported
+    and recorded or not at all.
+    """
+    pg = connection.vendor == 'postgresql'
+    header = 'type, date, from_base_id, to_base_id, recipient, performed_by_id'
+    day = "(date AT TIME ZONE 'UTC')::date" if pg else 'date(date)'
+    with db_transaction.atomic(), connection.cursor() as cursor:
+        if progress:
+            advance(*progress)
+        cursor.execute(f"DELETE FROM {STAGING}")
+        _load(cursor, rows)
+        # Reserve header ids up front so each line knows its movement
+        if pg:
+            cursor.execute(f"UPDATE {STAGING} SET movement_id = nextval(pg_get_serial_sequence('core_movement', 'id'))")
+        else:
+            cursor.execute(f"UPDATE {STAGING} SET movement_id = (SELECT COALESCE(MAX(id), 0) FROM core_movement) + seq")
+        cursor.execute(f"INSERT INTO core_movement (id, {header}) SELECT movement_id, {header} FROM {STAGING}")
+        cursor.execute(
+            f"INSERT INTO core_transaction (asset_type_id, quantity, movement_id, mirror, {header}) "
+            f"SELECT asset_type_id, quantity, movement_id, FALSE, {header} FROM {STAGING}"
+        )
+        # Stock before the chunk for the pairs that have alert thresholds
+        cursor.execute(f"""
+            SELECT legs.base_id, legs.asset_type_id, COALESCE(MAX(i.quantity), 0), SUM(legs.qty)
+            FROM ({_legs()}) legs
+            JOIN core_stockthreshold t ON t.base_id = legs.base_id AND t.asset_type_id = legs.asset_type_id
+            LEFT JOIN core_inventory i ON i.base_id = legs.base_id AND i.asset_type_id = legs.asset_type_id
+            GROUP BY legs.base_id, legs.asset_type_id""")
+        watched = {(b, a): (old, old + delta) for b, a, old, delta in cursor.fetchall()}
+        cursor.execute(f"""
+            INSERT INTO core_inventory (base_id, asset_type_id, quantity)
+            SELECT base_id, asset_type_id, SUM(qty) FROM ({_legs()}) legs
+            GROUP BY base_id, asset_type_id
+            ON CONFLICT (base_id, asset_type_id) DO UPDATE SET quantity = core_inventory.quantity + EXCLUDED.quantity""")
+        sums = ', '.join(f"SUM(CASE WHEN col = '{c}' THEN ABS(qty) ELSE 0 END)" for c in COLUMNS)
+        cursor.execute(f"""
+            INSERT INTO core_dailymovement (base_id, asset_type_id, day, {', '.join(COLUMNS)})
+            SELECT base_id, asset_type_id, {day}, {sums} FROM ({_legs()}) legs
+            GROUP BY base_id, asset_type_id, {day}
+            ON CONFLICT (base_id, asset_type_id, day) DO UPDATE SET
+            {', '.join(f'{c} = core_dailymovement.{c} + EXCLUDED.{c}' for c in COLUMNS)}""")
+        # Category rollups: each leg counts towards every ancestor of its asset type's category
+        rolled = f"""({_legs()}) legs
+            JOIN core_assettype a ON a.id = legs.asset_type_id
+            JOIN core_categoryclosure cc ON cc.descendant_id = a.category_id"""
+        cursor.execute(f"""
+            INSERT INTO core_categorystock (base_id, category_id, quantity)
+            SELECT legs.base_id, cc.ancestor_id, SUM(qty) FROM {rolled}
+            GROUP BY legs.base_id, cc.ancestor_id
+            ON CONFLICT (base_id, category_id) DO UPDATE SET quantity = core_categorystock.quantity + EXCLUDED.quantity""")
+        cursor.execute(f"""
+            INSERT INTO core_categorydailymovement (base_id, category_id, day, {', '.join(COLUMNS)})
+            SELECT legs.base_id, cc.ancestor_id, {day}, {sums} FROM {rolled}
+            GROUP BY legs.base_id, cc.ancestor_id, {day}
+            ON CONFLICT (base_id, category_id, day) DO UPDATE SET
+            {', '.join(f'{c} = core_categorydailymovement.{c} + EXCLUDED.{c}' for c in COLUMNS)}""")
+        cursor.execute(f"DELETE FROM {STAGING}")
+        check_changes(watched)
@@ -0,0 +1,130 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import router, transaction as db_transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import ExpenditureEvent, Movement, Transaction
+from .sharding import gather, on_shard, shard_for_base
+
+def stage(user, events):
+    """
+    Append validated events to the staging table in one INSERT. Once this
+    returns they are durable: the flush_expenditures worker applies them
+    even if this process dies. Events whose event_id is already staged are
+    ignored, so clients can safely retry a batch. With shards, each event is
+    staged on its base's shard. Returns how many events were newly staged,
+    counted from the rows that are in the table afterwards.
+    """
+    # One timestamp for the batch tells its rows apart from a concurrent
+    # retry's, which the INSERT may have skipped in their favour
+    now = timezone.now()
+    by_shard = defaultdict(list)
+    for e in events:
+        by_shard[shard_for_base(e['base_id'])].append(ExpenditureEvent(performed_by=user, received_at=now, **e))
+    staged = 0
+    for alias, rows in by_shard.items():
+        with on_shard(alias):
+            seen = set(ExpenditureEvent.objects.filter(
+                event_id__in={r.event_id for r in rows if r.event_id}
+            ).values_list('event_id', flat=True))
+            fresh = []
+            for r in rows:
+                if r.event_id:
+                    if r.event_id in seen:
+                        continue  # A retry, or repeated within the batch
+                    seen.add(r.event_id)
+                fresh.append(r)
+            ExpenditureEvent.objects.bulk_create(fresh, ignore_conflicts=True)
+            keyed = [r.event_id for r in fresh if r.event_id]
+            staged += len(fresh) - len(keyed)  # No event_id: nothing to conflict with
+            if keyed:
+                staged += ExpenditureEvent.objects.filter(event_id__in=keyed, received_at=now).count()
+    return staged
+
+
+def pending():
+    return ExpenditureEvent.objects.filter(flushed_at__isnull=True)
+
+
+def pending_count():
+    return sum(gather(lambda: pending().count()))
+
+
+def pending_expenditures(base_ids=None):
+    # {(base_id, asset_type_id): quantity} staged but not yet in Inventory
+    def read():
+        qs = pending()
+        if base_ids is not None:
+            qs = qs.filter(base_id__in=base_ids)
+        return {
+            (r['base_id'], r['asset_type_id']): r['total']
+            for r in qs.values('base_id', 'asset_type_id').annotate(total=Sum('quantity')).order_by()
+        }
+    staged = {}
+    for part in gather(read):
+        staged.update(part)
+    return staged
+
+
+def flush(limit=None):
+    """
+    Apply up to `limit` pending events as one batch: events are grouped by
+    (base, user, recipient) into EXPENDITURE movements with one line per
+    asset type, written through post_movement. Claiming the events and
+    applying them share a transaction, so after a crash every event is
+    either applied and marked or still pending, never both or neither.
+    With shards every shard flushes its own events, in parallel.
+    Returns (events, movements).
+    """
+    limit = limit or settings.EXPENDITURE_FLUSH_BATCH
+    parts = gather(_flush, limit)
+    return sum(events for events, _ in parts), sum(movements for _, movements in parts)
+
+
+def _flush(limit):
+    from .movements import post_movement
+
+    now = timezone.now()
+    with db_transaction.atomic(using=router.db_for_write(ExpenditureEvent)):
+        # SKIP LOCKED lets a second flusher take the next batch on PostgreSQL;
+        # the guarded UPDATE below catches overlap where rows can't be locked
+        rows = list(
+            pending().select_for_update(skip_locked=True).order_by('id')
+            .values('id', 'base_id', 'asset_type_id', 'quantity', 'recipient', 'performed_by_id', 'received_at')[:limit]
+        )
+        if not rows:
+            return 0, 0
+        ids = [r['id'] for r in rows]
+        if pending().filter(id__in=ids).update(flushed_at=now) != len(ids):
+            db_transaction.set_rollback(True)
+            return 0, 0
+
+        groups = defaultdict(list)
+        for r in rows:
+            groups[(r['base_id'], r['performed_by_id'], r['recipient'])].append(r)
+        for (base_id, user_id, recipient), events in groups.items():
+            # Dated when the stock leaves Inventory, like any other movement;
+            # the events keep their received_at
+            movement = Movement.objects.create(
+                type=Transaction.Type.EXPENDITURE, date=now,
+                from_base_id=base_id, recipient=recipient, performed_by_id=user_id,
+            )
+            lines = defaultdict(int)
+            for e in events:
+                lines[e['asset_type_id']] += e['quantity']
+            post_movement(movement, list(lines.items()))
+            # Transaction.date is auto_now_add; the lines take the header's date
+            Transaction.objects.filter(movement=movement).update(date=now)
+            ExpenditureEvent.objects.filter(id__in=[e['id'] for e in events]).update(movement=movement)
+
+        retention = now - timedelta(seconds=settings.EXPENDITURE_EVENT_RETENTION)
+        ExpenditureEvent.objects.filter(flushed_at__lt=retention).delete()
+    return len(rows), len(groups)
+
+
+def oldest_pending_age():
+    received = [r for r in gather(lambda: pending().order_by('id').values_list('received_at', flat=True).first()) if r]
+    return (timezone.now() - min(received)).total_seconds() if received else 0
@@ -0,0 +1,103 @@
+import os
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job, User
+
+# kind -> (handler, roles allowed to enqueue it through the API)
+REGISTRY = {}
+
+
+def register(kind, roles=(User.Role.ADMIN,)):
+    """
+    Register a job handler. The handler receives the Job and returns a
+    JSON-serializable result; it may write a file via artifact_path(job, name).
+    """
+    def decorator(func):
+        REGISTRY[kind] = (func, set(roles))
+        return func
+    return decorator
+
+
+def enqueue(kind, payload=None, user=None, max_attempts=None, delay=0):
+    if kind not in REGISTRY:
+        raise ValueError(f"Unknown job kind: {kind}")
+    return Job.objects.create(
+        kind=kind,
+        payload=payload or {},
+        created_by=user,
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+        run_after=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def artifact_path(job, filename):
+    # Jobs write results under JOB_ARTIFACT_DIR/<id>/ and record the path
+    directory = os.path.join(settings.JOB_ARTIFACT_DIR, str(job.pk))
+    os.makedirs(directory, exist_ok=True)
+    job.artifact = os.path.join(directory, filename)
+    return job.artifact
+
+
+def claim_next(worker_id):
+    # SKIP LOCKED lets many workers poll the same table without blocking on
+    # each other; each claimed row is committed as RUNNING before work starts.
+    # The status-guarded UPDATE also keeps claims exclusive on databases
+    # without row locks (SQLite in development).
+    now = timezone.now()
+    with db_transaction.atomic():
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.Status.QUEUED, run_after__lte=now)
+            .order_by('run_after', 'id')
+            .first()
+        )
+        if job is None:
+            return None
+        claimed = Job.objects.filter(pk=job.pk, status=Job.Status.QUEUED).update(
+            status=Job.Status.RUNNING,
+            attempts=F('attempts') + 1,
+            locked_by=worker_id,
+            started_at=now,
+        )
+    if not claimed:
+        # Another worker took it first; try the next one
+        return claim_next(worker_id)
+    job.refresh_from_db()
+    return job
+
+
+def run_job(job):
+    handler = REGISTRY.get(job.kind, (None,))[0]
+    try:
+        if handler is None:
+            raise ValueError(f"No handler registered for {job.kind}")
+        job.result = handler(job)
+        job.status = Job.Status.SUCCEEDED
+        job.error = ''
+    except Exception:
+        job.error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            # Exponential backoff: base, 2x base, 4x base, ...
+            backoff = settings.JOB_RETRY_BACKOFF * 2 ** (job.attempts - 1)
+            job.status = Job.Status.QUEUED
+            job.run_after = timezone.now() + timedelta(seconds=backoff)
+        else:
+            job.status = Job.Status.FAILED
+    job.finished_at = timezone.now()
+    job.locked_by = ''
+    job.save()
+    return job
+
+
+def requeue_stale():
+    # RUNNING jobs whose worker died are put back in the queue
+    cutoff = timezone.now() - timedelta(seconds=settings.JOB_TIMEOUT)
+    return Job.objects.filter(status=Job.Status.RUNNING, started_at__lt=cutoff).update(
+        status=Job.Status.QUEUED, locked_by='', run_after=timezone.now()
+    )
@@ -0,0 +1,129 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+
+class LocalStore:
+    """
+    Small SQLite-backed key/value store shared by every worker process on the
+    host. Django's cache backends can't do atomic read-modify-write across
+    gunicorn workers, so counters and locks that must hold host-wide live here.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._local = threading.local()
+
+    def _connect(self):
+        # One connection per thread, re-opened after fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS kv ('
+            ' key TEXT PRIMARY KEY, value TEXT, expires REAL)'
+        )
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS buckets ('
+            ' key TEXT PRIMARY KEY, tokens REAL, updated REAL)'
+        )
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front so concurrent
+        # read-modify-write from other processes serializes cleanly.
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def get(self, key):
+        row = self._connect().execute(
+            'SELECT value FROM kv WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value, ttl=None):
+        expires = time.time() + ttl if ttl else None
+        self._connect().execute(
+            'INSERT OR REPLACE INTO kv (key, value, expires) VALUES (?, ?, ?)',
+            (key, value, expires)
+        )
+
+    def add(self, key, value, ttl=None):
+        # Set only if missing or expired. Returns True if this call won.
+        now = time.time()
+        expires = now + ttl if ttl else None
+        with self.transaction() as conn:
+            conn.execute('DELETE FROM kv WHERE key = ? AND expires <= ?', (key, now))
+            cur = conn.execute(
+                'INSERT OR IGNORE INTO kv (key, value, expires) VALUES (?, ?, ?)',
+                (key, value, expires)
+            )
+            return cur.rowcount == 1
+
+    def delete(self, key):
+        self._connect().execute('DELETE FROM kv WHERE key = ?', (key,))
+
+    def take_token(self, key, capacity, refill_per_second):
+        """
+        Token bucket: consume one token for `key`. Returns (allowed, wait)
+        where wait is the seconds until the next token is available.
+        """
+        return self.take_tokens([(key, capacity, refill_per_second)])
+
+    def take_tokens(self, buckets):
+        """
+        take_token for several buckets [(key, capacity, refill_per_second)]
+        in one transaction: a token is taken from every bucket, or from none
+        if any is empty. wait is the longest wait among the empty ones.
+        """
+        now = time.time()
+        keys = [key for key, _, _ in buckets]
+        with self.transaction() as conn:
+            rows = {
+                key: (tokens, updated) for key, tokens, updated in conn.execute(
+                    f'SELECT key, tokens, updated FROM buckets WHERE key IN ({", ".join("?" * len(keys))})', keys
+                )
+            }
+            levels = []
+            for key, capacity, refill in buckets:
+                row = rows.get(key)
+                levels.append(float(capacity) if row is None else min(capacity, row[0] + (now - row[1]) * refill))
+            allowed = all(tokens >= 1 for tokens in levels)
+            if allowed:
+                levels = [tokens - 1 for tokens in levels]
+            conn.executemany(
+                'INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)',
+                [(key, tokens, now) for key, tokens in zip(keys, levels)]
+            )
+        wait = 0 if allowed else max(
+            (1 - tokens) / refill for tokens, (_, _, refill) in zip(levels, buckets) if tokens < 1
+        )
+        return allowed, wait
+
+    def purge(self, idle_seconds=3600):
+        # Drop expired keys and buckets that have long since refilled
+        now = time.time()
+        with self.transaction() as conn:
+            conn.execute('DELETE FROM kv WHERE expires <= ?', (now,))
+            conn.execute('DELETE FROM buckets WHERE updated <= ?', (now - idle_seconds,))
+
+
+local_store = LocalStore(settings.LOCAL_STORE_PATH)
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from core.timeseries import backfill
+from core.categories import rebuild
+from core.sharding import gather
+from datetime import date
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the DailyMovement buckets from the Transaction ledger, then the category rollups'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=date.fromisoformat, help='Only rebuild days on or after YYYY-MM-DD')
+
+    def handle(self, *args, **options):
+        # Each shard rebuilds the buckets of its own bases
+        count = sum(gather(backfill, options['since']))
+        # Rollups are recomputed in full from Inventory and the new buckets
+        gather(rebuild)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} daily bucket(s) and the category rollups'))
@@ -0,0 +1,76 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Sum
+from datetime import timedelta
+from django.utils import timezone
+from core.benchmark import scratch_database, measure
+from core.metrics import base_metrics
+import random
+
+
+class Command(BaseCommand):
+    help = 'Compares the one-pass all-bases metrics with per-base dashboard aggregates on a scratch database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bases', type=int, default=1000)
+        parser.add_argument('--assets', type=int, default=20)
+        parser.add_argument('--days', type=int, default=30)
+        parser.add_argument('--sample', type=int, default=50, help='Bases timed with the per-base approach (extrapolated)')
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            self.seed(options['bases'], options['assets'], options['days'])
+
+            _, one_pass = measure(base_metrics, trace_memory=False)
+            self.stdout.write(f"One pass, {options['bases']} bases: {one_pass['seconds'] * 1000:.1f} ms, {one_pass['queries']} queries")
+            _, by_asset = measure(base_metrics, by_asset=True, trace_memory=False)
+            self.stdout.write(f"One pass per asset type: {by_asset['seconds'] * 1000:.1f} ms, {by_asset['queries']} queries")
+
+            from core.models import Base
+            sample = list(Base.objects.all()[:options['sample']])
+            _, loop = measure(lambda: [self.per_base(b) for b in sample], trace_memory=False)
+            per_base = loop['seconds'] / len(sample)
+            self.stdout.write(
+                f"Per-base aggregates: {per_base * 1000:.2f} ms/base, "
+                f"~{per_base * options['bases'] * 1000:.0f} ms and {loop['queries'] // len(sample) * options['bases']} queries for all bases"
+            )
+
+    def per_base(self, base):
+        # The six aggregates DashboardView runs for one base
+        from core.models import Inventory, Transaction
+        tx = Transaction.objects.filter(from_base=base) | Transaction.objects.filter(to_base=base)
+        Inventory.objects.filter(base=base).aggregate(t=Sum('quantity'))
+        for t in ['PURCHASE', 'EXPENDITURE']:
+            tx.filter(type=t).aggregate(t=Sum('quantity'))
+        tx.filter(type='TRANSFER', to_base=base).aggregate(t=Sum('quantity'))
+        tx.filter(type='TRANSFER', from_base=base).aggregate(t=Sum('quantity'))
+        list(tx.order_by('-date')[:5])
+
+    def seed(self, n_bases, n_assets, n_days):
+        from core.models import Base, AssetType, Inventory, DailyMovement, Transaction
+        rng = random.Random(0)
+        bases = Base.objects.bulk_create([Base(name=f'Base {i}', location='Bench') for i in range(n_bases)])
+        assets = AssetType.objects.bulk_create([AssetType(name=f'Asset {i}') for i in range(n_assets)])
+        Inventory.objects.bulk_create(
+            [Inventory(base=b, asset_type=a, quantity=rng.randint(0, 500)) for b in bases for a in assets],
+            batch_size=5000,
+        )
+        today = timezone.localdate()
+        DailyMovement.objects.bulk_create(
+            [
+                DailyMovement(base=b, asset_type=a, day=today - timedelta(days=d),
+                              purchases=rng.randint(0, 20), transfer_in=rng.randint(0, 5),
+                              transfer_out=rng.randint(0, 5), expended=rng.randint(0, 10))
+                for b in bases for a in assets for d in range(n_days) if rng.random() < 0.3
+            ],
+            batch_size=5000,
+        )
+        # Ledger rows for the per-base comparison
+        Transaction.objects.bulk_create(
+            [
+                Transaction(type=rng.choice(['PURCHASE', 'EXPENDITURE', 'TRANSFER']), asset_type=rng.choice(assets),
+                            quantity=rng.randint(1, 50), from_base=b, to_base=rng.choice(bases))
+                for b in bases for _ in range(n_days)
+            ],
+            batch_size=5000,
+        )
+        self.stdout.write(f"Seeded {n_bases} bases x {n_assets} asset types, {DailyMovement.objects.count()} buckets")
@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+
+class Command(BaseCommand):
+    help = 'Burst-load benchmark for database connections (run with DB_POOL=True and DB_POOL=False to compare)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=32, help='Concurrent clients per burst')
+        parser.add_argument('--bursts', type=int, default=10)
+        parser.add_argument('--requests', type=int, default=20, help='Requests per client per burst')
+        parser.add_argument('--pause', type=float, default=0.5, help='Seconds between bursts')
+
+    def handle(self, *args, **options):
+        latencies = []
+        lock = threading.Lock()
+        peak = {'connections': 0}
+        is_postgres = connection.vendor == 'postgresql'
+
+        def backend_count():
+            with connections['default'].cursor() as cur:
+                cur.execute(
+                    "SELECT count(*) FROM pg_stat_activity WHERE datname = current_database()"
+                )
+                return cur.fetchone()[0]
+
+        def client():
+            local = []
+            for _ in range(options['requests']):
+                start = time.perf_counter()
+                # Same shape as a request: check out, query, hand back
+                with connection.cursor() as cur:
+                    cur.execute('SELECT 1')
+                    cur.fetchone()
+                connection.close()
+                local.append(time.perf_counter() - start)
+            with lock:
+                latencies.extend(local)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+            for _ in range(options['bursts']):
+                futures = [pool.submit(client) for _ in range(options['threads'])]
+                if is_postgres:
+                    peak['connections'] = max(peak['connections'], backend_count())
+                for f in futures:
+                    f.result()
+                time.sleep(options['pause'])
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        n = len(latencies)
+
+        def pct(p):
+            return latencies[min(n - 1, int(n * p))] * 1000
+
+        pool_opts = connection.settings_dict.get('OPTIONS', {}).get('pool')
+        self.stdout.write(f"Pooling: {'on ' + str({k: v for k, v in pool_opts.items() if k != 'check'}) if pool_opts else 'off'}")
+        self.stdout.write(f"Requests: {n} in {elapsed:.2f}s")
+        self.stdout.write(f"Latency ms: p50={pct(0.5):.2f} p95={pct(0.95):.2f} p99={pct(0.99):.2f} max={latencies[-1] * 1000:.2f}")
+        if is_postgres:
+            self.stdout.write(f"Peak server connections: {peak['connections']}")
+        self.stdout.write(self.style.SUCCESS('Benchmark complete'))
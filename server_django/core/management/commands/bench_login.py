@@ -0,0 +1,71 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth import authenticate
+from django.conf import settings
+from django.db import connection
+from concurrent.futures import ThreadPoolExecutor
+from core.hashers import HashPoolBusy
+from core.models import User
+import threading
+import time
+
+
+class Command(BaseCommand):
+    help = 'Measures login (password hashing) throughput and concurrent API latency at several worker counts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', default='1,2,4,8', help='Comma separated request thread counts')
+        parser.add_argument('--logins', type=int, default=40, help='Logins per run')
+
+    def handle(self, *args, **options):
+        username, password = '_bench_login', 'bench-pass-0803'
+        user, _ = User.objects.get_or_create(username=username)
+        user.set_password(password)
+        user.save()
+
+        self.stdout.write(
+            f"Hash pool: {settings.PASSWORD_HASH_WORKERS} threads, {settings.PASSWORD_HASH_QUEUE} queued, "
+            f"{settings.PASSWORD_HASH_WAIT}s wait"
+        )
+        self.stdout.write(f"{'workers':>8} {'logins/s':>10} {'shed':>6} {'api p95 ms':>11}")
+        try:
+            for workers in [int(w) for w in options['workers'].split(',')]:
+                rate, shed, p95 = self.run(workers, options['logins'], username, password)
+                self.stdout.write(f"{workers:>8} {rate:>10.1f} {shed:>6} {p95:>11.2f}")
+        finally:
+            user.delete()
+
+    def run(self, workers, logins, username, password):
+        done = threading.Event()
+        api_latencies = []
+
+        def login(_):
+            # False when the hash pool was full and the login was shed
+            try:
+                assert authenticate(username=username, password=password) is not None
+                return True
+            except HashPoolBusy:
+                return False
+            finally:
+                connection.close()
+
+        def api_probe():
+            # Cheap request running alongside the burst on its own thread
+            while not done.is_set():
+                start = time.perf_counter()
+                User.objects.filter(username=username).exists()
+                api_latencies.append(time.perf_counter() - start)
+                time.sleep(0.005)
+            connection.close()
+
+        probe = threading.Thread(target=api_probe)
+        probe.start()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            served = sum(pool.map(login, range(logins)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        probe.join()
+
+        api_latencies.sort()
+        p95 = api_latencies[int(len(api_latencies) * 0.95)] * 1000 if api_latencies else 0
+        return served / elapsed, logins - served, p95
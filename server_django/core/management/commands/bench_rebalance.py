@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from core.rebalance import imbalances, solve_uniform, solve_costed
+import numpy as np
+import time
+
+
+class Command(BaseCommand):
+    help = 'Times the rebalancing solver on synthetic problems (no database access)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='50x200,100x1000,300x3000', help='Comma separated BASESxASSETS problem sizes')
+        parser.add_argument('--neighbours', type=int, default=4, help='Arcs kept per node in the costed solver')
+        parser.add_argument('--skip-costed-above', type=int, default=100000,
+                            help='Skip the costed LP when more (base, asset) rows than this are imbalanced')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        self.stdout.write(f"{'size':>10} {'rows':>9} {'uniform ms':>11} {'moves':>8} {'costed ms':>10} {'moves':>8} {'cost ratio':>10}")
+
+        for size in options['sizes'].split(','):
+            n_bases, n_assets = (int(x) for x in size.split('x'))
+            keys = np.stack(np.meshgrid(np.arange(n_assets), np.arange(n_bases), indexing='ij'), axis=-1).reshape(-1, 2)
+            quantity = rng.integers(0, 500, len(keys))
+            target = rng.integers(0, 500, len(keys))
+            s_keys, s_qty, d_keys, d_qty = imbalances(keys, quantity, target)
+
+            start = time.perf_counter()
+            u = solve_uniform(s_keys, s_qty, d_keys, d_qty)
+            uniform_ms = (time.perf_counter() - start) * 1000
+
+            # Bases on a plane, cost = distance
+            coords = rng.random((n_bases, 2))
+            cost = np.sqrt(((coords[:, None, :] - coords[None, :, :]) ** 2).sum(-1)) * 100 + 1
+            rows = len(s_keys) + len(d_keys)
+            if rows <= options['skip_costed_above']:
+                start = time.perf_counter()
+                c = solve_costed(np.c_[s_keys, s_keys[:, 1]], s_qty, np.c_[d_keys, d_keys[:, 1]], d_qty,
+                                 cost, options['neighbours'])
+                costed_ms = f"{(time.perf_counter() - start) * 1000:10.1f}"
+                costed_moves = f"{len(c[3]):>8}"
+                # Distance cost of the costed plan vs. the cost-blind one
+                ratio = (cost[c[1], c[2]] * c[3]).sum() / (cost[u[1], u[2]] * u[3]).sum()
+                ratio = f"{ratio:10.3f}"
+            else:
+                costed_ms, costed_moves, ratio = f"{'skipped':>10}", f"{'-':>8}", f"{'-':>10}"
+
+            self.stdout.write(f"{size:>10} {rows:>9} {uniform_ms:11.1f} {len(u[3]):>8} {costed_ms} {costed_moves} {ratio}")
@@ -0,0 +1,186 @@
+import json
+import random
+import statistics
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction as db_transaction
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.benchmark import scratch_database, measure, load_baseline, compare
+
+BASELINE = Path(__file__).resolve().parents[2] / 'bench_baseline.json'
+BATCH = 10000
+
+
+class Command(BaseCommand):
+    help = (
+        'Query-count, wall-time and peak-memory regression suite on a scratch database; '
+        'fails when a case exceeds its stored baseline by more than the tolerance'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,100000,1000000', help='Comma-separated ledger sizes to seed')
+        parser.add_argument('--repeat', type=int, default=3, help='Timed runs per case (median is kept)')
+        parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed growth in time and memory')
+        parser.add_argument('--query-tolerance', type=int, default=0, help='Allowed extra queries per case')
+        parser.add_argument('--baseline', default=str(BASELINE))
+        parser.add_argument('--update-baseline', action='store_true', help='Write these results as the new baseline')
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(s) for s in options['sizes'].split(','))
+        self.repeat = max(1, options['repeat'])
+        results = {}
+        # Coalescing off: repeated runs must do the work, not reuse the first result
+        with scratch_database(), override_settings(COALESCE_TTL=0):
+            self.rng = random.Random(0)
+            self.setup()
+            seeded = 0
+            for n in sizes:
+                self.seed(n - seeded)
+                self.stdout.write(f"-- {n} ledger rows")
+                for case, func in self.cases(n, first=not seeded):
+                    results[case] = self.run_case(case, func)
+                seeded = n
+            vendor = connection.vendor
+
+        path = options['baseline']
+        stored = load_baseline(path)
+        if options['update_baseline']:
+            stored.setdefault(vendor, {}).update(results)
+            with open(path, 'w') as f:
+                json.dump(stored, f, indent=2, sort_keys=True)
+                f.write('\n')
+            self.stdout.write(self.style.SUCCESS(f"Baseline for {vendor} written to {path}"))
+            return
+
+        regressions, new = compare(
+            results, stored.get(vendor, {}), options['tolerance'], options['query_tolerance']
+        )
+        for case in new:
+            self.stdout.write(f"No baseline for {case}")
+        if regressions:
+            for line in regressions:
+                self.stderr.write(line)
+            raise CommandError(f"{len(regressions)} regression(s) against {path}")
+        self.stdout.write(self.style.SUCCESS(f"{len(results) - len(new)} case(s) within baseline"))
+
+    def run_case(self, case, func):
+        # Queries and peak memory from one traced run, time from untraced ones
+        _, traced = measure(func)
+        seconds = []
+        for _ in range(self.repeat):
+            _, timed = measure(func, trace_memory=False)
+            seconds.append(timed['seconds'])
+        row = {'queries': traced['queries'], 'seconds': round(statistics.median(seconds), 5), 'peak_kb': traced['peak_kb']}
+        self.stdout.write(f"{case:<40} {row['seconds'] * 1000:9.1f} ms {row['queries']:6d} q {row['peak_kb']:8d} KB")
+        return row
+
+    def cases(self, n, first=False):
+        from core.models import Transaction
+        from core.serializers import TransactionSerializer
+        from core.views import DashboardView, TransactionViewSet, MovementViewSet, SerialItemViewSet
+
+        if first:
+            rows = list(Transaction.objects.select_related(
+                'asset_type', 'from_base', 'to_base', 'performed_by'
+            ).order_by('id')[:1000])
+            yield 'serializer.read.1000', lambda: TransactionSerializer(rows, many=True).data
+            yield 'serializer.validate.1000', lambda: self.validate(TransactionSerializer, 1000)
+
+        for tx_type in Transaction.Type.values:
+            yield f'update_inventory.{tx_type}@{n}', lambda t=tx_type: self.apply(t)
+
+        dashboard = DashboardView.as_view(throttle_classes=[])
+        for role, user in self.users.items():
+            yield f'dashboard.{role}@{n}', lambda u=user: self.get(dashboard, '/api/dashboard/', u)
+
+        admin = self.users['admin']
+        endpoints = [
+            ('transactions', TransactionViewSet, '/api/transactions/'),
+            ('movements', MovementViewSet, '/api/movements/'),
+            ('serials', SerialItemViewSet, '/api/serials/'),
+        ]
+        for name, viewset, url in endpoints:
+            view = viewset.as_view({'get': 'list'}, throttle_classes=[])
+            yield f'list.{name}@{n}', lambda v=view, u=url: self.get(v, u, admin)
+
+    def get(self, view, url, user):
+        request = APIRequestFactory().get(url)
+        force_authenticate(request, user=user)
+        response = view(request)
+        response.render()
+        if response.status_code != 200:
+            raise CommandError(f"{url} returned {response.status_code}")
+        return response
+
+    def validate(self, serializer_class, count):
+        a, b = self.bases[0], self.bases[1]
+        data = [
+            {'type': 'TRANSFER', 'asset_type': self.assets[5 + i % 45].id,
+             'quantity': 1, 'from_base': a.id, 'to_base': b.id}
+            for i in range(count)
+        ]
+        serializer = serializer_class(data=data, many=True)
+        serializer.is_valid(raise_exception=True)
+        return serializer
+
+    def apply(self, tx_type, count=50):
+        # `count` calls of update_inventory (what _update_inventory runs),
+        # rolled back so repeated runs measure the same state
+        from core.models import Transaction
+        from core.views import update_inventory
+        a, b = self.bases[0], self.bases[1]
+        with db_transaction.atomic():
+            for i in range(count):
+                tx = Transaction(
+                    type=tx_type, asset_type=self.assets[i % len(self.assets)], quantity=1,
+                    from_base=a, to_base=b, recipient='Bench',
+                )
+                update_inventory(tx)
+            db_transaction.set_rollback(True)
+
+    def setup(self):
+        from core.models import Base, AssetType, Inventory, User
+        self.bases = Base.objects.bulk_create([Base(name=f'Base {i}', location='Bench') for i in range(20)])
+        self.assets = AssetType.objects.bulk_create(
+            [AssetType(name=f'Asset {i}', serialized=i < 5) for i in range(50)]
+        )
+        Inventory.objects.bulk_create(
+            [Inventory(base=b, asset_type=a, quantity=10 ** 6) for b in self.bases for a in self.assets]
+        )
+        self.users = {
+            'admin': User.objects.create_user('bench_admin', role=User.Role.ADMIN),
+            'commander': User.objects.create_user('bench_commander', role=User.Role.COMMANDER, base=self.bases[0]),
+            'logistics': User.objects.create_user('bench_logistics', role=User.Role.LOGISTICS, base=self.bases[0]),
+        }
+
+    def seed(self, count):
+        # Ledger rows as five-line movement documents, plus one serial item per ten rows
+        from core.models import Movement, Transaction, SerialItem
+        rng = self.rng
+        types = Transaction.Type.values
+        admin = self.users['admin']
+        offset = Transaction.objects.count()
+        for start in range(0, count, BATCH):
+            size = min(BATCH, count - start)
+            headers = []
+            for _ in range((size + 4) // 5):
+                src, dst = rng.sample(self.bases, 2)
+                headers.append(Movement(
+                    type=rng.choice(types), from_base=src, to_base=dst, recipient=f'Unit {rng.randint(0, 999)}', performed_by=admin,
+                ))
+            headers = Movement.objects.bulk_create(headers)
+            Transaction.objects.bulk_create([
+                Transaction(
+                    movement=m, type=m.type, asset_type=rng.choice(self.assets),
+                    quantity=rng.randint(1, 50), from_base=m.from_base, to_base=m.to_base,
+                    recipient=m.recipient, performed_by=admin,
+                )
+                for i, m in enumerate(headers) for _ in range(min(5, size - i * 5))
+            ])
+            SerialItem.objects.bulk_create([
+                SerialItem(serial=f'SN-{offset + start + i:08d}', asset_type=self.assets[i % 5], base=rng.choice(self.bases))
+                for i in range(0, size, 10)
+            ])
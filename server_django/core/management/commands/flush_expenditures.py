@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, DatabaseError
+from core.ingest import flush, oldest_pending_age
+import signal
+import threading
+
+
+class Command(BaseCommand):
+    help = 'Applies staged expenditure events to Inventory and the ledger in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=settings.EXPENDITURE_FLUSH_INTERVAL,
+                            help='Seconds between flushes')
+        parser.add_argument('--once', action='store_true', help='Drain the staging table and exit')
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *a: stop.set())
+        signal.signal(signal.SIGINT, lambda *a: stop.set())
+
+        # Events staged before a crash are still pending and go out first
+        self.stdout.write(f"Expenditure flusher started, oldest pending event {oldest_pending_age():.1f}s old")
+        try:
+            while not stop.is_set():
+                try:
+                    events, movements = flush()
+                except DatabaseError as e:
+                    self.stderr.write(f"Flush failed, retrying: {e}")
+                    connection.close()
+                    stop.wait(options['interval'])
+                    continue
+                if events:
+                    self.stdout.write(f"Flushed {events} event(s) as {movements} movement(s)")
+                if events >= settings.EXPENDITURE_FLUSH_BATCH:
+                    continue  # Backlog: keep going without waiting
+                if options['once']:
+                    break
+                stop.wait(options['interval'])
+        finally:
+            connection.close()
+        self.stdout.write(self.style.SUCCESS('Expenditure flusher stopped'))
@@ -0,0 +1,97 @@
+from itertools import islice
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction as db_transaction
+from core.cache import bump_version
+from core.importer import (
+    read_records, Resolver, InvalidRecord, CheckpointMoved, create_staging, merge_chunk, file_digest, advance,
+)
+from core.models import ImportCheckpoint
+from core.sharding import enabled as sharding_enabled
+
+MAX_REPORTED = 20
+
+
+class Command(BaseCommand):
+    help = 'Bulk-loads legacy transactions from CSV or NDJSON into the ledger and Inventory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'ndjson'], help='Defaults to the file extension')
+        parser.add_argument('--chunk', type=int, default=50000, help='Records validated and committed together')
+        parser.add_argument('--offset', type=int, default=0, help='Start at this record instead of where the last run stopped')
+        parser.add_argument('--skip-invalid', action='store_true', help='Drop invalid records instead of stopping')
+        parser.add_argument('--dry-run', action='store_true', help='Validate only')
+
+    def handle(self, *args, **options):
+        if sharding_enabled() and not options['dry_run']:
+            # merge_chunk writes the ledger with raw SQL on default only
+            raise CommandError('Importing is not supported with SHARD_DATABASE_URLS set; import before sharding')
+        resolver = Resolver()
+        offset = options['offset']
+        checkpoint = None
+        if not options['dry_run']:
+            create_staging()
+            # Progress is kept per file content and advanced with each chunk,
+            # so a rerun after a crash picks up after the last committed chunk
+            checkpoint, _ = ImportCheckpoint.objects.get_or_create(
+                source=file_digest(options['path']), defaults={'path': options['path']}
+            )
+            if offset and offset < checkpoint.offset:
+                raise CommandError(
+                    f"Records before {checkpoint.offset} of this file were already imported; "
+                    f"--offset {offset} would import them again"
+                )
+            if offset > checkpoint.offset:
+                advance(checkpoint, checkpoint.offset, offset)  # Records skipped on purpose
+            offset = checkpoint.offset
+            if offset:
+                self.stdout.write(f"Resuming at record {offset}")
+        records = islice(read_records(options['path'], options['format']), offset, None)
+        imported = rejected = 0
+        start = time.perf_counter()
+
+        while True:
+            chunk = list(islice(records, options['chunk']))
+            if not chunk:
+                break
+            rows, errors = [], []
+            for i, record in enumerate(chunk):
+                try:
+                    rows.append(resolver.row(len(rows) + 1, record))
+                except InvalidRecord as e:
+                    errors.append((offset + i, str(e)))
+            for n, message in errors[:MAX_REPORTED]:
+                self.stderr.write(f"  record {n}: {message}")
+            if errors and not options['skip_invalid']:
+                raise CommandError(
+                    f"{len(errors)} invalid record(s) in the chunk starting at {offset}; nothing from it was "
+                    f"imported. Fix them or pass --skip-invalid and rerun; it resumes at this chunk"
+                )
+            if checkpoint:
+                progress = (checkpoint, offset, offset + len(chunk))
+                try:
+                    if rows:
+                        merge_chunk(rows, progress)
+                    else:
+                        with db_transaction.atomic():
+                            advance(*progress)
+                except CheckpointMoved:
+                    raise CommandError(
+                        f"Another run has already imported past record {offset} of this file; stopping"
+                    )
+            offset += len(chunk)
+            imported += len(rows)
+            rejected += len(errors)
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f"offset {offset}: {imported} imported, {rejected} rejected, "
+                f"{imported / elapsed if elapsed else 0:.0f} records/s"
+            )
+
+        if imported and not options['dry_run']:
+            # Raw SQL skips post_save, so invalidate the matrix cache here
+            bump_version('inventory_matrix')
+        verb = 'Validated' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {imported} record(s), rejected {rejected}, next offset {offset}"))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import connections, DatabaseError
+from core.sharding import relay_pending
+import signal
+import threading
+
+
+class Command(BaseCommand):
+    help = 'Delivers pending cross-shard transfer credits to their destination shards'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds between passes')
+        parser.add_argument('--once', action='store_true', help='Make one pass and exit')
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *a: stop.set())
+        signal.signal(signal.SIGINT, lambda *a: stop.set())
+
+        while not stop.is_set():
+            try:
+                delivered = relay_pending()
+            except DatabaseError as e:
+                # A shard is down; its messages stay pending until the next pass
+                self.stderr.write(f"Relay failed, retrying: {e}")
+                connections.close_all()
+                delivered = 0
+            if delivered:
+                self.stdout.write(f"Delivered {delivered} transfer credit(s)")
+            if options['once']:
+                break
+            stop.wait(options['interval'])
+        self.stdout.write(self.style.SUCCESS('Outbox relay stopped'))
@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, DatabaseError
+from core.jobs import claim_next, run_job, requeue_stale
+import signal
+import socket
+import os
+import threading
+
+
+class Command(BaseCommand):
+    help = 'Runs queued background jobs (exports, reconciliation, rebuilds)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=2, help='Jobs run in parallel by this process')
+        parser.add_argument('--poll', type=float, default=2.0, help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--burst', action='store_true', help='Exit once the queue is drained')
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *a: stop.set())
+        signal.signal(signal.SIGINT, lambda *a: stop.set())
+
+        requeued = requeue_stale()
+        if requeued:
+            self.stdout.write(self.style.WARNING(f"Re-queued {requeued} stale job(s)"))
+
+        base_id = f"{socket.gethostname()}:{os.getpid()}"
+
+        def loop(n):
+            worker_id = f"{base_id}:{n}"
+            try:
+                while not stop.is_set():
+                    try:
+                        job = claim_next(worker_id)
+                    except DatabaseError as e:
+                        self.stderr.write(f"[{worker_id}] claim failed: {e}")
+                        connection.close()
+                        stop.wait(options['poll'])
+                        continue
+                    if job is None:
+                        if options['burst']:
+                            return
+                        stop.wait(options['poll'])
+                        continue
+                    job = run_job(job)
+                    self.stdout.write(f"[{worker_id}] {job} attempt {job.attempts}")
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=loop, args=(n,)) for n in range(options['concurrency'])]
+        self.stdout.write(f"Job worker {base_id} started with {len(threads)} thread(s)")
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.stdout.write(self.style.SUCCESS('Job worker stopped'))
@@ -1,5 +1,11 @@
+from collections import defaultdict
 from django.core.management.base import BaseCommand
-from core.models import Base, AssetType, Inventory
+from django.utils import timezone
+from core.categories import roll_up
+from core.models import Base, AssetType, Inventory, DailyMovement
+from core.movements import add_rows
+from core.timeseries import movement_legs, COLUMNS
+from django.db import connection, transaction as db_transaction
 import random
 
 class Command(BaseCommand):
@@ -20,15 +26,9 @@ class Command(BaseCommand):
             {'name': 'INS Kadamba (Naval Base)', 'location': 'Karwar, Karnataka'},
         ]
 
-        created_bases = []
-        for b_data in bases_data:
-            base, created = Base.objects.get_or_create(
-                name=b_data['name'], 
-                defaults={'location': b_data['location']}
-            )
-            created_bases.append(base)
-            if created:
-                self.stdout.write(f"Created Base: {base.name}")
+        # Bulk insert whatever is missing, then read everything back by name
+        Base.objects.bulk_create([Base(**b) for b in bases_data], ignore_conflicts=True)
+        created_bases = list(Base.objects.filter(name__in=[b['name'] for b in bases_data]))
 
         # 2. Define Assets
         assets_data = [
@@ -41,19 +41,12 @@ class Command(BaseCommand):
             {'name': 'Ashok Leyland Stallion', 'description': 'Logistics Truck'},
         ]
 
-        created_assets = []
-        for a_data in assets_data:
-            asset, created = AssetType.objects.get_or_create(
-                name=a_data['name'],
-                defaults={'description': a_data['description']}
-            )
-            created_assets.append(asset)
-            if created:
-                self.stdout.write(f"Created Asset: {asset.name}")
+        AssetType.objects.bulk_create([AssetType(**a) for a in assets_data], ignore_conflicts=True)
+        created_assets = list(AssetType.objects.filter(name__in=[a['name'] for a in assets_data]))
 
         # 3. Seed Inventory & Transactions
         self.stdout.write('Seeding Inventory & History...')
-        from core.models import Transaction, User
+        from core.models import Transaction, Movement, User
         
         # Create Specific Users requested by User
         north_base = Base.objects.get(name='Northern Command HQ')
@@ -92,8 +85,17 @@ class Command(BaseCommand):
             u.set_password('admin123')
             u.save()
 
+        # Inventory and history are only seeded for pairs that have no
+        # inventory yet, so re-running never adds ledger rows.
+        existing = set(
+            Inventory.objects.filter(base__in=created_bases, asset_type__in=created_assets)
+            .values_list('base_id', 'asset_type_id')
+        )
+        inventory, history = [], []
         for base in created_bases:
             for asset in created_assets:
+                if (base.id, asset.id) in existing:
+                    continue
                 # Random quantity between 10 and 500
                 qty = random.randint(10, 500)
                 
@@ -103,47 +105,58 @@ class Command(BaseCommand):
                 if 'Tank' in asset.name and ('Western' in base.name or 'Jaipur' in base.location):
                     qty = random.randint(50, 100)
 
-                # Create Inventory
-                Inventory.objects.get_or_create(
-                    base=base,
-                    asset_type=asset,
-                    defaults={'quantity': qty}
-                )
+                inventory.append(Inventory(base=base, asset_type=asset, quantity=qty))
 
-                # Create 'Purchase' History (to explain this inventory)
+                # 'Purchase' History (to explain this inventory)
                 # We assume 120% was purchased, and 20% might be expended/transferred
-                purchase_qty = int(qty * 1.2) 
-                Transaction.objects.get_or_create(
-                    type=Transaction.Type.PURCHASE,
-                    asset_type=asset,
-                    to_base=base,
-                    quantity=purchase_qty,
-                    defaults={'recipient': 'Central Supply'}
-                )
+                history.append(dict(
+                    type=Transaction.Type.PURCHASE, asset_type=asset, to_base=base,
+                    quantity=int(qty * 1.2), recipient='Central Supply'
+                ))
 
-                # Create 'Expenditure' (some usage)
+                # 'Expenditure' (some usage)
                 expend_qty = int(qty * 0.1)
                 if expend_qty > 0:
-                    Transaction.objects.create(
-                        type=Transaction.Type.EXPENDITURE,
-                        asset_type=asset,
-                        from_base=base,
-                        quantity=expend_qty,
-                        recipient='Training Exercise'
-                    )
+                    history.append(dict(
+                        type=Transaction.Type.EXPENDITURE, asset_type=asset, from_base=base,
+                        quantity=expend_qty, recipient='Training Exercise'
+                    ))
                 
                 # Random Transfers (between bases)
                 if random.random() > 0.7:
                     other_base = random.choice([b for b in created_bases if b != base])
                     transfer_qty = int(qty * 0.05)
                     if transfer_qty > 0:
-                         Transaction.objects.create(
-                            type=Transaction.Type.TRANSFER,
-                            asset_type=asset,
-                            from_base=base,
-                            to_base=other_base,
-                            quantity=transfer_qty,
-                            recipient='Logistics Move'
-                        )
+                        history.append(dict(
+                            type=Transaction.Type.TRANSFER, asset_type=asset, from_base=base,
+                            to_base=other_base, quantity=transfer_qty, recipient='Logistics Move'
+                        ))
+
+        with db_transaction.atomic():
+            Inventory.objects.bulk_create(inventory, ignore_conflicts=True)
+            # One single-line movement document per seeded ledger row
+            headers = Movement.objects.bulk_create([
+                Movement(**{k: v for k, v in h.items() if k not in ('asset_type', 'quantity')}) for h in history
+            ])
+            txs = Transaction.objects.bulk_create([
+                Transaction(movement=m, **h) for m, h in zip(headers, history)
+            ])
+            # bulk_create skips the write path, so the DailyMovement buckets
+            # and category rollups are filled in here
+            buckets = defaultdict(lambda: dict.fromkeys(COLUMNS, 0))
+            for tx in txs:
+                for base_id, column, qty in movement_legs(tx):
+                    buckets[(base_id, tx.asset_type_id, timezone.localdate(tx.date))][column] += qty
+            adapt = connection.ops.adapt_datefield_value
+            add_rows(
+                DailyMovement, ['base_id', 'asset_type_id', 'day'], COLUMNS,
+                [(b, a, adapt(day), *(v[c] for c in COLUMNS)) for (b, a, day), v in buckets.items()],
+            )
+            roll_up({(i.base_id, i.asset_type_id): i.quantity for i in inventory}, buckets)
+        if inventory:
+            # bulk_create skips post_save, so invalidate the matrix cache here
+            from core.cache import bump_version
+            bump_version('inventory_matrix')
+        self.stdout.write(f"Seeded {len(inventory)} inventory rows and {len(history)} ledger rows")
 
         self.stdout.write(self.style.SUCCESS('Successfully seeded Indian Military Data!'))
@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from core.models import Base, AssetCategory, CategoryClosure, AssetType, User
+from core.sharding import enabled, replicate
+
+BATCH = 5000
+
+
+class Command(BaseCommand):
+    help = 'Migrates every shard database, copies the reference tables to it and interleaves its ledger ids'
+
+    def handle(self, *args, **options):
+        if not enabled():
+            raise CommandError('SHARD_DATABASE_URLS is not set')
+        n = len(settings.SHARDS)
+        for k, alias in enumerate(settings.SHARDS):
+            call_command('migrate', database=alias, interactive=False, verbosity=0)
+            # Parents before the rows that point at them
+            for model in (Base, AssetCategory, CategoryClosure, AssetType, User):
+                qs = model.objects.using('default').order_by('pk')
+                for i in range(0, qs.count(), BATCH):
+                    replicate(model, list(qs[i:i + BATCH]), aliases=[alias])
+            self.interleave(alias, k, n)
+            self.stdout.write(f"{alias}: migrated, reference tables copied")
+        self.stdout.write(self.style.SUCCESS(f'{n} shard(s) in sync'))
+
+    def interleave(self, alias, k, n):
+        # Shard k hands out ids = k + 1 (mod n), so an id alone names its shard
+        connection = connections[alias]
+        if connection.vendor != 'postgresql':
+            self.stdout.write(self.style.WARNING(
+                f"{alias}: ids not interleaved on {connection.vendor}; admin lookups by id need PostgreSQL"
+            ))
+            return
+        with connection.cursor() as cursor:
+            for table in ('core_movement', 'core_transaction'):
+                cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [table])
+                sequence = cursor.fetchone()[0]
+                cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}")
+                top = cursor.fetchone()[0]
+                start = top + 1 + (k - top) % n
+                cursor.execute(f"ALTER SEQUENCE {sequence} INCREMENT BY {n} RESTART WITH {start}")
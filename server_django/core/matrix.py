@@ -0,0 +1,76 @@
+import numpy as np
+
+from .cache import get_or_build
+from .ingest import pending_expenditures
+from .sharding import gather
+from .models import Base, AssetType, Inventory
+
+
+def _rows():
+    return list(Inventory.objects.order_by().values_list('base_id', 'asset_type_id', 'quantity'))
+
+
+def build_matrix():
+    # Whole bases x asset_types grid as COO arrays plus labels: every base and
+    # asset type gets a row/column, cells without Inventory read as 0. One
+    # Inventory query (one per shard, run in parallel, when bases are sharded)
+    rows = [r for part in gather(_rows) for r in part]
+    bases = list(Base.objects.order_by('id').values_list('id', 'name'))
+    assets = list(AssetType.objects.order_by('id').values_list('id', 'name'))
+    base_ids = np.array([b[0] for b in bases], dtype=np.int64)
+    asset_ids = np.array([a[0] for a in assets], dtype=np.int64)
+    return {
+        'bases': bases,
+        'assets': assets,
+        'row': np.searchsorted(base_ids, np.array([r[0] for r in rows], dtype=np.int64)),
+        'col': np.searchsorted(asset_ids, np.array([r[1] for r in rows], dtype=np.int64)),
+        'value': np.array([r[2] for r in rows], dtype=np.int64),
+    }
+
+
+def inventory_matrix(base_ids=None, asset_ids=None, layout='dense'):
+    """
+    Slice of the cached matrix. The cache key carries the 'inventory'
+    version, which is bumped after every committed Inventory change.
+    """
+    m = get_or_build('inventory_matrix', build_matrix)
+    keep_b = np.array([base_ids is None or b in base_ids for b, _ in m['bases']], dtype=bool)
+    keep_a = np.array([asset_ids is None or a in asset_ids for a, _ in m['assets']], dtype=bool)
+
+    # Renumber the kept rows/cols so indices point into the returned labels
+    new_row = np.cumsum(keep_b) - 1
+    new_col = np.cumsum(keep_a) - 1
+    mask = keep_b[m['row']] & keep_a[m['col']] if len(m['value']) else np.zeros(0, dtype=bool)
+    row, col, value = new_row[m['row'][mask]], new_col[m['col'][mask]], m['value'][mask]
+
+    data = {
+        'bases': [{'id': b, 'name': n} for (b, n), k in zip(m['bases'], keep_b) if k],
+        'assetTypes': [{'id': a, 'name': n} for (a, n), k in zip(m['assets'], keep_a) if k],
+        'layout': layout,
+    }
+    # Expenditures staged by the bulk ingest path; not in Inventory (or the
+    # cached matrix) until the next flush
+    staged = pending_expenditures(base_ids)
+    if staged:
+        b_pos = {b['id']: i for i, b in enumerate(data['bases'])}
+        a_pos = {a['id']: i for i, a in enumerate(data['assetTypes'])}
+        extra = []
+        for (b, a), qty in staged.items():
+            if b in b_pos and a in a_pos:
+                cell = (row == b_pos[b]) & (col == a_pos[a])
+                if cell.any():
+                    value[cell] -= qty
+                else:
+                    extra.append((b_pos[b], a_pos[a], -qty))
+        if extra:
+            row = np.concatenate([row, [e[0] for e in extra]]).astype(np.int64)
+            col = np.concatenate([col, [e[1] for e in extra]]).astype(np.int64)
+            value = np.concatenate([value, [e[2] for e in extra]]).astype(np.int64)
+
+    if layout == 'sparse':
+        data.update(rows=row.tolist(), cols=col.tolist(), values=value.tolist())
+    else:
+        dense = np.zeros((int(keep_b.sum()), int(keep_a.sum())), dtype=np.int64)
+        dense[row, col] = value
+        data['quantities'] = dense.tolist()
+    return data
@@ -0,0 +1,95 @@
+import numpy as np
+from django.db.models import Sum, Case, When, Q, Value
+from django.db.models.functions import Coalesce
+
+from .models import DailyMovement, Inventory, Base
+
+COLUMNS = ['purchases', 'transfer_in', 'transfer_out', 'assigned', 'expended']
+
+
+def base_metrics(start=None, end=None, by_asset=False):
+    """
+    Dashboard metrics for every base at once (optionally per asset type),
+    from one conditional-aggregation query over DailyMovement plus one
+    grouped Inventory query. Same formulas as DashboardView:
+
+        net     = purchases + transfer_in - transfer_out
+        opening = closing - net + expended
+
+    With `end` in the past, closing is current stock rewound by everything
+    that moved after `end`.
+    """
+    keys = ['base_id', 'asset_type_id'] if by_asset else ['base_id']
+
+    in_range = Q()
+    if start:
+        in_range &= Q(day__gte=start)
+    if end:
+        in_range &= Q(day__lte=end)
+
+    def total(column, cond):
+        if not cond:
+            return Coalesce(Sum(column), Value(0))
+        return Coalesce(Sum(Case(When(cond, then=column), default=Value(0))), Value(0))
+
+    # Aliases must not shadow the bucket columns they sum
+    aggregates = {f'{c}_in': total(c, in_range) for c in COLUMNS}
+    if end:
+        aggregates.update({f'{c}_after': total(c, Q(day__gt=end)) for c in COLUMNS})
+    moves = list(DailyMovement.objects.order_by().values(*keys).annotate(**aggregates))
+    stock = list(Inventory.objects.order_by().values(*keys).annotate(closing=Sum('quantity')))
+
+    # Align both result sets on the group key
+    index = {}
+    for r in moves + stock:
+        index.setdefault(tuple(r[k] for k in keys), len(index))
+    n = len(index)
+    cols = {c: np.zeros(n, dtype=np.int64) for c in COLUMNS + [f'{c}_after' for c in COLUMNS] + ['closing']}
+    for r in moves:
+        i = index[tuple(r[k] for k in keys)]
+        for c in COLUMNS:
+            cols[c][i] = r[f'{c}_in']
+            cols[f'{c}_after'][i] = r.get(f'{c}_after', 0)
+    for r in stock:
+        cols['closing'][index[tuple(r[k] for k in keys)]] = r['closing'] or 0
+
+    after_change = (
+        cols['purchases_after'] + cols['transfer_in_after'] - cols['transfer_out_after']
+        - cols['assigned_after'] - cols['expended_after']
+    )
+    closing = cols['closing'] - after_change
+    net = cols['purchases'] + cols['transfer_in'] - cols['transfer_out']
+    opening = closing - net + cols['expended']
+
+    group_keys = list(index)
+    order = sorted(range(n), key=group_keys.__getitem__)
+    names = dict(Base.objects.values_list('id', 'name'))
+
+    def column(a):
+        return [int(a[i]) for i in order]
+
+    data = {
+        'base': [group_keys[i][0] for i in order],
+        'baseName': [names.get(group_keys[i][0]) for i in order],
+        'openingBalance': column(opening),
+        'purchases': column(cols['purchases']),
+        'transferIn': column(cols['transfer_in']),
+        'transferOut': column(cols['transfer_out']),
+        'assigned': column(cols['assigned']),
+        'expended': column(cols['expended']),
+        'netMovement': column(net),
+        'closingBalance': column(closing),
+    }
+    if by_asset:
+        data['assetType'] = [group_keys[i][1] for i in order]
+    return data
+
+
+def merge_columns(parts):
+    # Combine base_metrics results from shards holding disjoint bases
+    if len(parts) == 1:
+        return parts[0]
+    keys = ['base', 'assetType'] if 'assetType' in parts[0] else ['base']
+    data = {k: [v for p in parts for v in p[k]] for k in parts[0]}
+    order = sorted(range(len(data['base'])), key=lambda i: tuple(data[k][i] for k in keys))
+    return {k: [v[i] for i in order] for k, v in data.items()}
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReconciliationRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('watermark', models.BigIntegerField(default=0)),
+                ('full', models.BooleanField(default=False)),
+                ('repaired', models.BooleanField(default=False)),
+                ('transactions_scanned', models.PositiveIntegerField(default=0)),
+                ('mismatch_count', models.PositiveIntegerField(default=0)),
+                ('mismatches', models.JSONField(blank=True, default=list)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LedgerBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.BigIntegerField(default=0)),
+                ('asset_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.assettype')),
+                ('base', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.base')),
+            ],
+            options={
+                'unique_together': {('base', 'asset_type')},
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_ledger_reconciliation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('purchases', models.BigIntegerField(default=0)),
+                ('transfer_in', models.BigIntegerField(default=0)),
+                ('transfer_out', models.BigIntegerField(default=0)),
+                ('assigned', models.BigIntegerField(default=0)),
+                ('expended', models.BigIntegerField(default=0)),
+                ('asset_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_movements', to='core.assettype')),
+                ('base', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_movements', to='core.base')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['base', 'day'], name='core_dailym_base_id_d9672c_idx'), models.Index(fields=['day'], name='core_dailym_day_56db4f_idx')],
+                'unique_together': {('base', 'asset_type', 'day')},
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_dailymovement'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.CharField(choices=[('REORDER', 'Below reorder level'), ('CRITICAL', 'Below minimum')], max_length=20)),
+                ('threshold', models.IntegerField()),
+                ('quantity', models.IntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('resolved_at', models.DateTimeField(blank=True, null=True)),
+                ('asset_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alerts', to='core.assettype')),
+                ('base', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alerts', to='core.base')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['base', 'resolved_at'], name='core_stocka_base_id_0fea18_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('resolved_at__isnull', True)), fields=('base', 'asset_type', 'level'), name='one_open_alert_per_level')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockThreshold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('minimum', models.IntegerField(default=0)),
+                ('reorder_level', models.IntegerField(default=0)),
+                ('asset_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='thresholds', to='core.assettype')),
+                ('base', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='thresholds', to='core.base')),
+            ],
+            options={
+                'unique_together': {('base', 'asset_type')},
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:46
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def link_existing(apps, schema_editor):
+    # Every existing single-line transaction becomes a one-line document
+    Transaction = apps.get_model('core', 'Transaction')
+    Movement = apps.get_model('core', 'Movement')
+    fields = ['type', 'date', 'from_base_id', 'to_base_id', 'recipient', 'performed_by_id']
+    while True:
+        batch = list(Transaction.objects.filter(movement__isnull=True).order_by('id')[:5000])
+        if not batch:
+            break
+        headers = Movement.objects.bulk_create(
+            [Movement(**{f: getattr(tx, f) for f in fields}) for tx in batch]
+        )
+        for tx, header in zip(batch, headers):
+            tx.movement_id = header.id
+        Transaction.objects.bulk_update(batch, ['movement'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_stock_alerts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Movement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(choices=[('PURCHASE', 'Purchase'), ('TRANSFER', 'Transfer'), ('ASSIGNMENT', 'Assignment'), ('EXPENDITURE', 'Expenditure')], max_length=50)),
+                ('date', models.DateTimeField(default=django.utils.timezone.now)),
+                ('recipient', models.CharField(blank=True, max_length=255, null=True)),
+                ('from_base', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='outgoing_movements', to='core.base')),
+                ('performed_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('to_base', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='incoming_movements', to='core.base')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='movement',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='core.movement'),
+        ),
+        migrations.RunPython(link_existing, migrations.RunPython.noop),
+    ]
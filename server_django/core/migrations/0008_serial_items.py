@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:48
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_movement_documents'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assettype',
+            name='serialized',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='SerialItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('serial', models.CharField(max_length=100, unique=True)),
+                ('status', models.CharField(choices=[('IN_STOCK', 'In stock'), ('ASSIGNED', 'Assigned'), ('EXPENDED', 'Expended')], default='IN_STOCK', max_length=20)),
+                ('assigned_to', models.CharField(blank=True, max_length=255, null=True)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('asset_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='serials', to='core.assettype')),
+                ('base', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='serials', to='core.base')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['base', 'status', 'id'], name='core_serial_base_id_6bd1e7_idx'), models.Index(fields=['asset_type', 'status', 'id'], name='core_serial_asset_t_22f8e9_idx')],
+            },
+        ),
+    ]
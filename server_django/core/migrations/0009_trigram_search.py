@@ -0,0 +1,43 @@
+from django.db import migrations
+
+# UPPER(col) matches the SQL Django emits for icontains on PostgreSQL
+INDEXES = [
+    ('core_transaction_recipient_trgm', 'core_transaction', 'recipient'),
+    ('core_assettype_name_trgm', 'core_assettype', 'name'),
+    ('core_assettype_description_trgm', 'core_assettype', 'description'),
+    ('core_base_name_trgm', 'core_base', 'name'),
+    ('core_base_location_trgm', 'core_base', 'location'),
+]
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return  # SQLite searches with a plain scan
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for name, table, column in INDEXES:
+            # CONCURRENTLY keeps the ledger writable while the index builds
+            cursor.execute(
+                f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} '
+                f'ON {table} USING gin (UPPER({column}) gin_trgm_ops)'
+            )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for name, _, _ in INDEXES:
+            cursor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('core', '0008_serial_items'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
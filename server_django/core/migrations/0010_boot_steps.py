@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_trigram_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BootStep',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('fingerprint', models.CharField(max_length=64)),
+                ('seconds', models.FloatField(default=0)),
+                ('applied_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations, models
+
+INDEXES = [
+    ('transaction', models.Index(fields=['date', 'id'], name='core_tx_date_id_idx')),
+    ('transaction', models.Index(fields=['type', 'date'], name='core_tx_type_date_idx')),
+    ('movement', models.Index(fields=['date', 'id'], name='core_mv_date_id_idx')),
+]
+
+
+def create_indexes(apps, schema_editor):
+    for model_name, index in INDEXES:
+        model = apps.get_model('core', model_name)
+        if schema_editor.connection.vendor == 'postgresql':
+            # CONCURRENTLY keeps the ledger writable while the index builds
+            sql = str(index.create_sql(model, schema_editor)).replace('CREATE INDEX', 'CREATE INDEX CONCURRENTLY IF NOT EXISTS', 1)
+            schema_editor.execute(sql)
+        else:
+            schema_editor.add_index(model, index)
+
+
+def drop_indexes(apps, schema_editor):
+    for model_name, index in INDEXES:
+        model = apps.get_model('core', model_name)
+        if schema_editor.connection.vendor == 'postgresql':
+            schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {index.name}')
+        else:
+            schema_editor.remove_index(model, index)
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('core', '0010_boot_steps'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[migrations.RunPython(create_indexes, drop_indexes)],
+            state_operations=[
+                migrations.AddIndex(model_name=model_name, index=index) for model_name, index in INDEXES
+            ],
+        ),
+    ]
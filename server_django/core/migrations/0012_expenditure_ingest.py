@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:10
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_admin_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExpenditureEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.CharField(blank=True, max_length=64, null=True, unique=True)),
+                ('quantity', models.PositiveIntegerField()),
+                ('recipient', models.CharField(blank=True, max_length=255, null=True)),
+                ('received_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('flushed_at', models.DateTimeField(blank=True, null=True)),
+                ('asset_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='expenditure_events', to='core.assettype')),
+                ('base', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='expenditure_events', to='core.base')),
+                ('movement', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='events', to='core.movement')),
+                ('performed_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('flushed_at__isnull', True)), fields=['id'], name='core_expenditure_pending'), models.Index(fields=['flushed_at'], name='core_expend_flushed_704db2_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_base_shards'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssetCategory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('parent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='children', to='core.assetcategory')),
+            ],
+            options={
+                'verbose_name_plural': 'Asset categories',
+                'unique_together': {('parent', 'name')},
+            },
+        ),
+        migrations.AddField(
+            model_name='assettype',
+            name='category',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='asset_types', to='core.assetcategory'),
+        ),
+        migrations.CreateModel(
+            name='CategoryClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveIntegerField()),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='descendant_links', to='core.assetcategory')),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_links', to='core.assetcategory')),
+            ],
+            options={
+                'unique_together': {('ancestor', 'descendant')},
+            },
+        ),
+        migrations.CreateModel(
+            name='CategoryDailyMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('purchases', models.BigIntegerField(default=0)),
+                ('transfer_in', models.BigIntegerField(default=0)),
+                ('transfer_out', models.BigIntegerField(default=0)),
+                ('assigned', models.BigIntegerField(default=0)),
+                ('expended', models.BigIntegerField(default=0)),
+                ('base', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='category_movements', to='core.base')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_movements', to='core.assetcategory')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['category', 'day'], name='core_catego_categor_6f3a34_idx')],
+                'unique_together': {('base', 'category', 'day')},
+            },
+        ),
+        migrations.CreateModel(
+            name='CategoryStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.BigIntegerField(default=0)),
+                ('base', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='category_stock', to='core.base')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock', to='core.assetcategory')),
+            ],
+            options={
+                'unique_together': {('base', 'category')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_asset_categories'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='transaction',
+            name='mirror',
+            field=models.BooleanField(db_default=False, default=False),
+        ),
+    ]
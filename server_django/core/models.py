@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
 
 class Base(models.Model):
     name = models.CharField(max_length=255, unique=True)
@@ -18,9 +19,42 @@ class User(AbstractUser):
     role = models.CharField(max_length=50, choices=Role.choices, default=Role.LOGISTICS)
     base = models.ForeignKey(Base, on_delete=models.SET_NULL, null=True, blank=True, related_name='users')
 
+class AssetCategory(models.Model):
+    # Node of the asset-type hierarchy ("Armour" > "Tanks"); CategoryClosure
+    # lists every ancestor of every node (core/categories.py)
+    name = models.CharField(max_length=255)
+    parent = models.ForeignKey('self', on_delete=models.PROTECT, null=True, blank=True, related_name='children')
+
+    class Meta:
+        unique_together = ('parent', 'name')
+        verbose_name_plural = "Asset categories"
+
+    def __str__(self):
+        return self.name
+
+    def clean(self):
+        from django.core.exceptions import ValidationError
+        if self.pk and self.parent_id and CategoryClosure.objects.filter(
+            ancestor_id=self.pk, descendant_id=self.parent_id
+        ).exists():
+            raise ValidationError({'parent': "A category can't be moved under itself or its descendants"})
+
+class CategoryClosure(models.Model):
+    # One row per (ancestor, descendant) pair, including each node with
+    # itself at depth 0, so a whole subtree is one indexed lookup
+    ancestor = models.ForeignKey(AssetCategory, on_delete=models.CASCADE, related_name='descendant_links')
+    descendant = models.ForeignKey(AssetCategory, on_delete=models.CASCADE, related_name='ancestor_links')
+    depth = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ('ancestor', 'descendant')
+
 class AssetType(models.Model):
     name = models.CharField(max_length=255, unique=True)
     description = models.TextField(blank=True)
+    # Movements of serialized types must name the units they move
+    serialized = models.BooleanField(default=False)
+    category = models.ForeignKey(AssetCategory, on_delete=models.PROTECT, null=True, blank=True, related_name='asset_types')
     
     def __str__(self):
         return self.name
@@ -51,6 +85,263 @@ class Transaction(models.Model):
     to_base = models.ForeignKey(Base, on_delete=models.SET_NULL, null=True, blank=True, related_name='incoming_transactions')
     recipient = models.CharField(max_length=255, blank=True, null=True) 
     performed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
+    movement = models.ForeignKey('Movement', on_delete=models.CASCADE, null=True, blank=True, related_name='lines')
+    # Copy of a cross-shard transfer kept on the receiving base's shard
+    # (core/sharding.py); admin-wide reads skip it
+    mirror = models.BooleanField(default=False, db_default=False)
+
+    class Meta:
+        # Newest-first listings (admin changelist, date drill-down) walk these
+        # backwards instead of sorting the ledger
+        indexes = [
+            models.Index(fields=['date', 'id'], name='core_tx_date_id_idx'),
+            models.Index(fields=['type', 'date'], name='core_tx_type_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.type} - {self.asset_type} ({self.quantity})"
+
+class Movement(models.Model):
+    # Document header: one purchase order, convoy or issue covering many asset
+    # types. Its lines are Transaction rows, which keep the header columns so
+    # ledger queries (dashboard, reconciliation, buckets) work unchanged.
+    type = models.CharField(max_length=50, choices=Transaction.Type.choices)
+    date = models.DateTimeField(default=timezone.now)
+    from_base = models.ForeignKey(Base, on_delete=models.SET_NULL, null=True, blank=True, related_name='outgoing_movements')
+    to_base = models.ForeignKey(Base, on_delete=models.SET_NULL, null=True, blank=True, related_name='incoming_movements')
+    recipient = models.CharField(max_length=255, blank=True, null=True)
+    performed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['date', 'id'], name='core_mv_date_id_idx')]
+
+    def __str__(self):
+        return f"{self.type} #{self.pk}"
+
+class IdempotencyKey(models.Model):
+    # Stored responses for client-supplied Idempotency-Key headers
+    class State(models.TextChoices):
+        PENDING = 'PENDING', 'Pending'
+        COMPLETED = 'COMPLETED', 'Completed'
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    state = models.CharField(max_length=20, choices=State.choices, default=State.PENDING)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response = models.JSONField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        unique_together = ('user', 'key')
+
+class Job(models.Model):
+    # Background work queued in Postgres and run by `manage.py run_jobs`
+    class Status(models.TextChoices):
+        QUEUED = 'QUEUED', 'Queued'
+        RUNNING = 'RUNNING', 'Running'
+        SUCCEEDED = 'SUCCEEDED', 'Succeeded'
+        FAILED = 'FAILED', 'Failed'
+
+    kind = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField()
+    locked_by = models.CharField(max_length=255, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    artifact = models.CharField(max_length=500, blank=True)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        # Workers poll for the oldest runnable job
+        indexes = [models.Index(fields=['status', 'run_after'])]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+class LedgerBalance(models.Model):
+    # Net quantity per (base, asset_type) implied by the Transaction ledger,
+    # maintained incrementally by core.reconciliation
+    base = models.ForeignKey(Base, on_delete=models.CASCADE)
+    asset_type = models.ForeignKey(AssetType, on_delete=models.CASCADE)
+    quantity = models.BigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('base', 'asset_type')
+
+class ReconciliationRun(models.Model):
+    watermark = models.BigIntegerField(default=0)  # Highest Transaction id folded into LedgerBalance
+    full = models.BooleanField(default=False)
+    repaired = models.BooleanField(default=False)
+    transactions_scanned = models.PositiveIntegerField(default=0)
+    mismatch_count = models.PositiveIntegerField(default=0)
+    mismatches = models.JSONField(default=list, blank=True)  # First 1000 only
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Reconciliation #{self.pk} ({self.mismatch_count} mismatches)"
+
+class DailyMovement(models.Model):
+    # Per-day movement totals for charts, updated alongside Inventory on every
+    # write and rebuilt by `manage.py backfill_movements`
+    base = models.ForeignKey(Base, on_delete=models.CASCADE, related_name='daily_movements')
+    asset_type = models.ForeignKey(AssetType, on_delete=models.CASCADE, related_name='daily_movements')
+    day = models.DateField()
+    purchases = models.BigIntegerField(default=0)
+    transfer_in = models.BigIntegerField(default=0)
+    transfer_out = models.BigIntegerField(default=0)
+    assigned = models.BigIntegerField(default=0)
+    expended = models.BigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('base', 'asset_type', 'day')
+        indexes = [models.Index(fields=['base', 'day']), models.Index(fields=['day'])]
+
+class CategoryStock(models.Model):
+    # Inventory summed over every asset type under `category`, kept in step
+    # with Inventory on each write (core/categories.py)
+    base = models.ForeignKey(Base, on_delete=models.CASCADE, related_name='category_stock')
+    category = models.ForeignKey(AssetCategory, on_delete=models.CASCADE, related_name='stock')
+    quantity = models.BigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('base', 'category')
+
+class CategoryDailyMovement(models.Model):
+    # DailyMovement summed per category, same columns
+    base = models.ForeignKey(Base, on_delete=models.CASCADE, related_name='category_movements')
+    category = models.ForeignKey(AssetCategory, on_delete=models.CASCADE, related_name='daily_movements')
+    day = models.DateField()
+    purchases = models.BigIntegerField(default=0)
+    transfer_in = models.BigIntegerField(default=0)
+    transfer_out = models.BigIntegerField(default=0)
+    assigned = models.BigIntegerField(default=0)
+    expended = models.BigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('base', 'category', 'day')
+        indexes = [models.Index(fields=['category', 'day'])]
+
+class StockThreshold(models.Model):
+    # Alert levels for one (base, asset_type); checked on every Inventory change
+    base = models.ForeignKey(Base, on_delete=models.CASCADE, related_name='thresholds')
+    asset_type = models.ForeignKey(AssetType, on_delete=models.CASCADE, related_name='thresholds')
+    minimum = models.IntegerField(default=0)
+    reorder_level = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('base', 'asset_type')
+
+class StockAlert(models.Model):
+    class Level(models.TextChoices):
+        REORDER = 'REORDER', 'Below reorder level'
+        CRITICAL = 'CRITICAL', 'Below minimum'
+
+    base = models.ForeignKey(Base, on_delete=models.CASCADE, related_name='alerts')
+    asset_type = models.ForeignKey(AssetType, on_delete=models.CASCADE, related_name='alerts')
+    level = models.CharField(max_length=20, choices=Level.choices)
+    threshold = models.IntegerField()
+    quantity = models.IntegerField()  # Stock when the alert was raised
+    created_at = models.DateTimeField(auto_now_add=True)
+    resolved_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            # At most one open alert per level for a pair
+            models.UniqueConstraint(
+                fields=['base', 'asset_type', 'level'],
+                condition=models.Q(resolved_at__isnull=True),
+                name='one_open_alert_per_level',
+            ),
+        ]
+        indexes = [models.Index(fields=['base', 'resolved_at'])]
+
+class SerialItem(models.Model):
+    # One tracked unit of a serialized asset type. IN_STOCK units at a base
+    # always add up to that base's Inventory quantity.
+    class Status(models.TextChoices):
+        IN_STOCK = 'IN_STOCK', 'In stock'
+        ASSIGNED = 'ASSIGNED', 'Assigned'
+        EXPENDED = 'EXPENDED', 'Expended'
+
+    serial = models.CharField(max_length=100, unique=True)
+    asset_type = models.ForeignKey(AssetType, on_delete=models.CASCADE, related_name='serials')
+    base = models.ForeignKey(Base, on_delete=models.SET_NULL, null=True, blank=True, related_name='serials')
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.IN_STOCK)
+    assigned_to = models.CharField(max_length=255, blank=True, null=True)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        # Trailing id keeps filtered, cursor-paginated lookups on the index
+        indexes = [
+            models.Index(fields=['base', 'status', 'id']),
+            models.Index(fields=['asset_type', 'status', 'id']),
+        ]
+
+    def __str__(self):
+        return self.serial
+
+class BootStep(models.Model):
+    # Fingerprint of the inputs each boot step last ran with (see core/boot.py)
+    name = models.CharField(max_length=50, unique=True)
+    fingerprint = models.CharField(max_length=64)
+    seconds = models.FloatField(default=0)
+    applied_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.name
+
+class ImportCheckpoint(models.Model):
+    # How far `manage.py import_transactions` got through one file; advanced
+    # in the same transaction as each chunk, so a rerun resumes after it
+    source = models.CharField(max_length=64, unique=True)  # sha256 of the file
+    path = models.CharField(max_length=500)
+    offset = models.PositiveBigIntegerField(default=0)  # Records consumed
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.path} @ {self.offset}"
+
+class ExpenditureEvent(models.Model):
+    # Staged EXPENDITURE from the bulk ingest path (core/ingest.py). Pending
+    # until a flush folds it into a Movement; kept for a day afterwards so
+    # client retries carrying the same event_id are recognised.
+    event_id = models.CharField(max_length=64, unique=True, null=True, blank=True)
+    base = models.ForeignKey(Base, on_delete=models.CASCADE, related_name='expenditure_events')
+    asset_type = models.ForeignKey(AssetType, on_delete=models.CASCADE, related_name='expenditure_events')
+    quantity = models.PositiveIntegerField()
+    recipient = models.CharField(max_length=255, blank=True, null=True)
+    performed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
+    received_at = models.DateTimeField(default=timezone.now)
+    flushed_at = models.DateTimeField(null=True, blank=True)
+    movement = models.ForeignKey(Movement, on_delete=models.SET_NULL, null=True, blank=True, related_name='events')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['id'], condition=models.Q(flushed_at__isnull=True), name='core_expenditure_pending'),
+            models.Index(fields=['flushed_at']),
+        ]
+
+class ShardOutbox(models.Model):
+    # Credit leg of a cross-shard transfer, written on the source shard in
+    # the same transaction as the debit and relayed to `destination`
+    destination = models.CharField(max_length=50)
+    payload = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['id'], condition=models.Q(delivered_at__isnull=True), name='core_outbox_pending')]
+
+class ShardInbox(models.Model):
+    # Outbox messages already applied on this shard, so redelivery is a no-op
+    message_id = models.CharField(max_length=100, unique=True)
+    received_at = models.DateTimeField(auto_now_add=True)
@@ -0,0 +1,91 @@
+from collections import defaultdict
+
+from django.db import connections, router, transaction as db_transaction
+from django.utils import timezone
+
+from .alerts import check_changes
+from .cache import bump_version
+from .categories import roll_up
+from .models import Transaction, Inventory, DailyMovement
+from .serials import move_serials
+from .timeseries import movement_legs, COLUMNS
+
+INCREASES = {'purchases', 'transfer_in'}
+CHUNK = 1000
+
+
+def add_rows(model, keys, columns, rows, returning=False):
+    """
+    INSERT ... ON CONFLICT (keys) DO UPDATE SET col = col + EXCLUDED.col,
+    so many counters are created or incremented in one statement without a
+    read first. PostgreSQL and SQLite (3.35+) both accept this form.
+    """
+    connection = connections[router.db_for_write(model)]
+    q = connection.ops.quote_name
+    table = q(model._meta.db_table)
+    names = keys + columns
+    row_sql = '(' + ', '.join(['%s'] * len(names)) + ')'
+    out = []
+    with connection.cursor() as cursor:
+        for i in range(0, len(rows), CHUNK):
+            chunk = rows[i:i + CHUNK]
+            sql = (
+                f"INSERT INTO {table} ({', '.join(q(n) for n in names)}) "
+                f"VALUES {', '.join([row_sql] * len(chunk))} "
+                f"ON CONFLICT ({', '.join(q(k) for k in keys)}) DO UPDATE SET "
+                + ', '.join(f"{q(c)} = {table}.{q(c)} + EXCLUDED.{q(c)}" for c in columns)
+            )
+            if returning:
+                sql += f" RETURNING {', '.join(q(n) for n in names)}"
+            cursor.execute(sql, [v for row in chunk for v in row])
+            if returning:
+                out += cursor.fetchall()
+    return out
+
+
+def post_movement(movement, lines, serials=None):
+    """
+    Write a document's lines [(asset_type_id, quantity), ...] and apply them:
+    one INSERT for the ledger rows, one upsert for Inventory and one for the
+    DailyMovement buckets (plus their category rollups), however many lines
+    the document has. `serials`
+    maps asset_type_id to the units a serialized line moves. Must run inside
+    the caller's transaction. Returns the created Transaction rows.
+    """
+    txs = Transaction.objects.bulk_create([
+        Transaction(
+            movement=movement, type=movement.type, asset_type_id=asset_type_id, quantity=quantity,
+            from_base_id=movement.from_base_id, to_base_id=movement.to_base_id,
+            recipient=movement.recipient, performed_by_id=movement.performed_by_id,
+        )
+        for asset_type_id, quantity in lines
+    ])
+
+    stock = defaultdict(int)
+    buckets = defaultdict(lambda: dict.fromkeys(COLUMNS, 0))
+    for tx in txs:
+        day = timezone.localdate(tx.date)
+        for base_id, column, qty in movement_legs(tx):
+            stock[(base_id, tx.asset_type_id)] += qty if column in INCREASES else -qty
+            buckets[(base_id, tx.asset_type_id, day)][column] += qty
+    if not stock:
+        return txs
+
+    updated = add_rows(
+        Inventory, ['base_id', 'asset_type_id'], ['quantity'],
+        [(b, a, d) for (b, a), d in stock.items()], returning=True,
+    )
+    adapt = connections[router.db_for_write(DailyMovement)].ops.adapt_datefield_value
+    add_rows(
+        DailyMovement, ['base_id', 'asset_type_id', 'day'], COLUMNS,
+        [(b, a, adapt(day), *(v[c] for c in COLUMNS)) for (b, a, day), v in buckets.items()],
+    )
+    roll_up(stock, buckets)
+
+    for asset_type_id, units in (serials or {}).items():
+        move_serials(movement, asset_type_id, units)
+
+    # Raw SQL skips post_save, so invalidate the matrix cache here
+    db_transaction.on_commit(lambda: bump_version('inventory_matrix'), using=router.db_for_write(Inventory))
+    check_changes({(b, a): (quantity - stock[(b, a)], quantity) for b, a, quantity in updated})
+    return txs
@@ -0,0 +1,218 @@
+import numpy as np
+from scipy import sparse
+from scipy.optimize import linprog
+
+from .models import Inventory
+from .sharding import gather
+
+
+def imbalances(keys, quantity, target):
+    """
+    Split (asset, base) rows into surplus and deficit sides. Only rows with a
+    target take part; `keys` is an (n, 2) array of [asset_type_id, base_id].
+    """
+    diff = quantity - target
+    surplus = diff > 0
+    deficit = diff < 0
+    return keys[surplus], diff[surplus], keys[deficit], -diff[deficit]
+
+
+def lookup(src_keys, src_values, query_keys, default=0):
+    # Vectorized dict lookup on (asset, base) key pairs
+    if not len(src_keys):
+        return np.full(len(query_keys), default, dtype=np.int64)
+    src = src_keys[:, 0] * (1 << 32) + src_keys[:, 1]
+    query = query_keys[:, 0] * (1 << 32) + query_keys[:, 1]
+    order = np.argsort(src)
+    src, src_values = src[order], src_values[order]
+    pos = np.minimum(np.searchsorted(src, query), len(src) - 1)
+    return np.where(src[pos] == query, src_values[pos], default)
+
+
+def _group_bounds(asset):
+    # Start/end offsets of each run of equal asset ids in a sorted array
+    starts = np.flatnonzero(np.r_[True, asset[1:] != asset[:-1]])
+    ends = np.r_[starts[1:], len(asset)]
+    return starts, ends
+
+
+def _grouped_cumsum(asset, qty):
+    total = np.cumsum(qty)
+    starts, ends = _group_bounds(asset)
+    offset = np.repeat(np.r_[0, total[starts[1:] - 1]], ends - starts)
+    return total - offset
+
+
+def solve_uniform(s_keys, s_qty, d_keys, d_qty):
+    """
+    Transportation problem with equal cost per unit: any maximum flow is
+    optimal, so surpluses and deficits are matched largest-first by merging
+    their cumulative sums. Fully vectorized across all asset types.
+    Returns arrays (asset, from_base, to_base, quantity).
+    """
+    empty = np.empty(0, np.int64)
+    if not len(s_keys) or not len(d_keys):
+        return empty, empty, empty, empty
+
+    # Sort each side by asset, then largest first
+    s_order = np.lexsort((-s_qty, s_keys[:, 0]))
+    d_order = np.lexsort((-d_qty, d_keys[:, 0]))
+    s_keys, s_qty = s_keys[s_order], s_qty[s_order]
+    d_keys, d_qty = d_keys[d_order], d_qty[d_order]
+
+    s_end = _grouped_cumsum(s_keys[:, 0], s_qty)
+    d_end = _grouped_cumsum(d_keys[:, 0], d_qty)
+
+    # Encode (asset, position) into one sortable int64 so every asset's
+    # interval merge happens in a single searchsorted.
+    span = int(max(s_end.max(), d_end.max())) + 1
+    s_key = s_keys[:, 0] * span + s_end
+    d_key = d_keys[:, 0] * span + d_end
+    s_start = s_key - s_qty
+    d_start = d_key - d_qty
+
+    cuts = np.unique(np.r_[s_start, s_key, d_start, d_key])
+    lo, hi = cuts[:-1], cuts[1:]
+    same_asset = lo // span == (hi - 1) // span
+    lo, hi = lo[same_asset], hi[same_asset]
+
+    si = np.searchsorted(s_key, lo, side='right')
+    di = np.searchsorted(d_key, lo, side='right')
+    ok = (si < len(s_key)) & (di < len(d_key))
+    si, di, lo, hi = si[ok], di[ok], lo[ok], hi[ok]
+    # Segment must lie inside both a supplier's and a demander's interval
+    ok = (s_start[si] <= lo) & (d_start[di] <= lo) & (s_keys[si, 0] == d_keys[di, 0])
+    si, di, amount = si[ok], di[ok], (hi - lo)[ok]
+    return s_keys[si, 0], s_keys[si, 1], d_keys[di, 1], amount
+
+
+def _transport_lp(supply, demand, cost):
+    # Maximise moved quantity first, then minimise cost: every unit earns a
+    # reward larger than any cost difference it could cause.
+    i, j = np.nonzero(np.isfinite(cost))
+    n_arcs = len(i)
+    reward = (cost[i, j].max() + 1) * (len(supply) + len(demand))
+    cols = np.arange(n_arcs)
+    a_ub = sparse.vstack([
+        sparse.csr_matrix((np.ones(n_arcs), (i, cols)), shape=(len(supply), n_arcs)),
+        sparse.csr_matrix((np.ones(n_arcs), (j, cols)), shape=(len(demand), n_arcs)),
+    ]).tocsr()
+    result = linprog(
+        cost[i, j] - reward, A_ub=a_ub, b_ub=np.r_[supply, demand].astype(np.float64),
+        bounds=(0, None), method='highs'
+    )
+    if result.status != 0:
+        raise RuntimeError(f"Rebalance solver failed: {result.message}")
+    # Transportation LPs are totally unimodular, so the vertex is integral
+    flow = np.rint(result.x).astype(np.int64)
+    used = flow > 0
+    return i[used], j[used], flow[used]
+
+
+def solve_costed(s_keys, s_qty, d_keys, d_qty, cost, neighbours=8):
+    """
+    Min-cost transportation with a base-to-base cost matrix. The problem
+    decomposes by asset type, so each asset is solved as its own small sparse
+    LP (HiGHS). To keep the arc set sparse, each deficit row is connected to
+    its `neighbours` cheapest suppliers and each surplus row to its
+    `neighbours` cheapest demanders, and whatever that leaves unmoved is
+    routed over the remaining arcs; neighbours=0 keeps every arc.
+    Keys carry a third column with the base's position in `cost` (see
+    base_index). Returns arrays (asset, from_base, to_base, quantity).
+    """
+    empty = np.empty(0, np.int64)
+    if not len(s_keys) or not len(d_keys):
+        return empty, empty, empty, empty
+
+    s_sorted = np.argsort(s_keys[:, 0], kind='stable')
+    d_sorted = np.argsort(d_keys[:, 0], kind='stable')
+    s_starts, s_ends = _group_bounds(s_keys[s_sorted, 0])
+    d_starts, d_ends = _group_bounds(d_keys[d_sorted, 0])
+    d_groups = {d_keys[d_sorted[a], 0]: (a, b) for a, b in zip(d_starts, d_ends)}
+
+    out_s, out_d, out_q = [], [], []
+    for a, b in zip(s_starts, s_ends):
+        asset = s_keys[s_sorted[a], 0]
+        if asset not in d_groups:
+            continue
+        sup = s_sorted[a:b]
+        dem = d_sorted[slice(*d_groups[asset])]
+        full = cost[np.ix_(s_keys[sup, 2], d_keys[dem, 2])]
+        if not (neighbours and full.shape[0] > neighbours and full.shape[1] > neighbours):
+            i, j, q = _transport_lp(s_qty[sup], d_qty[dem], full)
+        else:
+            keep = np.zeros(full.shape, bool)
+            near_s = np.argpartition(full, neighbours - 1, axis=0)[:neighbours]
+            keep[near_s, np.arange(full.shape[1])] = True
+            near_d = np.argpartition(full, neighbours - 1, axis=1)[:, :neighbours]
+            keep[np.arange(full.shape[0])[:, None], near_d] = True
+            i, j, q = _transport_lp(s_qty[sup], d_qty[dem], np.where(keep, full, np.inf))
+            # Units whose every kept arc was saturated: a second pass over
+            # the leftover rows with all their arcs, so nothing stays unmoved
+            s_left = s_qty[sup] - np.bincount(i, weights=q, minlength=len(sup)).astype(np.int64)
+            d_left = d_qty[dem] - np.bincount(j, weights=q, minlength=len(dem)).astype(np.int64)
+            rs, rd = np.flatnonzero(s_left), np.flatnonzero(d_left)
+            if len(rs) and len(rd):
+                i2, j2, q2 = _transport_lp(s_left[rs], d_left[rd], full[np.ix_(rs, rd)])
+                # Merge arcs both passes used
+                arc, inverse = np.unique(np.r_[i, rs[i2]] * len(dem) + np.r_[j, rd[j2]], return_inverse=True)
+                i, j, q = arc // len(dem), arc % len(dem), np.bincount(inverse, weights=np.r_[q, q2]).astype(np.int64)
+        out_s.append(sup[i])
+        out_d.append(dem[j])
+        out_q.append(q)
+
+    if not out_q:
+        return empty, empty, empty, empty
+    si, di = np.concatenate(out_s), np.concatenate(out_d)
+    return s_keys[si, 0], s_keys[si, 1], d_keys[di, 1], np.concatenate(out_q)
+
+
+def propose(targets, costs=None, neighbours=8):
+    """
+    Proposed TRANSFERs that move stock from bases above target to bases below
+    it. `targets` is a list of {"base", "asset_type", "target"}; `costs` an
+    optional {from_base: {to_base: cost}} mapping (missing arcs cost 1e6, so
+    they are used only when nothing else can cover a deficit).
+    """
+    if not targets:
+        return []
+    t = np.array([(int(x['asset_type']), int(x['base']), int(x['target'])) for x in targets], dtype=np.int64)
+
+    assets = np.unique(t[:, 0]).tolist()
+    # Each shard holds its own bases' stock
+    parts = gather(lambda: list(
+        Inventory.objects.filter(asset_type_id__in=assets).values_list('asset_type_id', 'base_id', 'quantity')
+    ))
+    inv = np.array([row for part in parts for row in part], dtype=np.int64).reshape(-1, 3)
+    quantity = lookup(inv[:, :2], inv[:, 2], t[:, :2])
+
+    s_keys, s_qty, d_keys, d_qty = imbalances(t[:, :2], quantity, t[:, 2])
+
+    if costs:
+        base_ids, cost = base_index(costs, np.r_[s_keys[:, 1], d_keys[:, 1]])
+        s_keys = np.c_[s_keys, np.searchsorted(base_ids, s_keys[:, 1])]
+        d_keys = np.c_[d_keys, np.searchsorted(base_ids, d_keys[:, 1])]
+        asset, src, dst, qty = solve_costed(s_keys, s_qty, d_keys, d_qty, cost, neighbours)
+        unit = cost[np.searchsorted(base_ids, src), np.searchsorted(base_ids, dst)]
+    else:
+        asset, src, dst, qty = solve_uniform(s_keys, s_qty, d_keys, d_qty)
+        unit = np.ones(len(qty))
+
+    return [
+        {'asset_type': int(a), 'from_base': int(f), 'to_base': int(d), 'quantity': int(q), 'cost': float(u) * int(q)}
+        for a, f, d, q, u in zip(asset, src, dst, qty, unit)
+    ]
+
+
+def base_index(costs, bases, missing=1e6):
+    # Dense cost matrix over the bases that take part, built from a sparse mapping
+    base_ids = np.unique(np.r_[bases, [int(b) for b in costs]]).astype(np.int64)
+    cost = np.full((len(base_ids), len(base_ids)), missing)
+    np.fill_diagonal(cost, 0)
+    for src, row in costs.items():
+        i = np.searchsorted(base_ids, int(src))
+        for dst, value in row.items():
+            j = np.searchsorted(base_ids, int(dst))
+            if j < len(base_ids) and base_ids[j] == int(dst):
+                cost[i, j] = float(value)
+    return base_ids, cost
@@ -0,0 +1,184 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connections, router, transaction as db_transaction
+from django.db.models import Q, Sum, Max, Count, OuterRef, Subquery, Exists, F, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .cache import bump_version
+from .models import Transaction, Inventory, LedgerBalance, ReconciliationRun
+from .sharding import enabled as sharding_enabled, on_shard, shard_for_base
+
+# Mirrors TransactionViewSet._update_inventory: which legs move stock
+INCOMING = (
+    Q(type=Transaction.Type.PURCHASE, to_base__isnull=False)
+    | Q(type=Transaction.Type.TRANSFER, from_base__isnull=False, to_base__isnull=False)
+)
+OUTGOING = (
+    Q(type=Transaction.Type.TRANSFER, from_base__isnull=False, to_base__isnull=False)
+    | Q(type__in=[Transaction.Type.ASSIGNMENT, Transaction.Type.EXPENDITURE], from_base__isnull=False)
+)
+
+MAX_REPORTED = 1000
+
+
+def ledger_deltas(tx_qs):
+    """
+    Net stock change per (base_id, asset_type_id) for a set of transactions,
+    computed with one grouped query per direction.
+    """
+    deltas = defaultdict(int)
+    incoming = (
+        tx_qs.filter(INCOMING).order_by()
+        .values('to_base_id', 'asset_type_id').annotate(total=Sum('quantity'))
+    )
+    for row in incoming:
+        deltas[(row['to_base_id'], row['asset_type_id'])] += row['total']
+    outgoing = (
+        tx_qs.filter(OUTGOING).order_by()
+        .values('from_base_id', 'asset_type_id').annotate(total=Sum('quantity'))
+    )
+    for row in outgoing:
+        deltas[(row['from_base_id'], row['asset_type_id'])] -= row['total']
+    return deltas
+
+
+def _apply_deltas(deltas, replace=False):
+    if not deltas:
+        return
+    bases = {b for b, _ in deltas}
+    assets = {a for _, a in deltas}
+    current = {}
+    if not replace:
+        current = {
+            (b, a): q for b, a, q in LedgerBalance.objects.filter(
+                base_id__in=bases, asset_type_id__in=assets
+            ).values_list('base_id', 'asset_type_id', 'quantity')
+        }
+    LedgerBalance.objects.bulk_create(
+        [
+            LedgerBalance(base_id=b, asset_type_id=a, quantity=current.get((b, a), 0) + d)
+            for (b, a), d in deltas.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['base', 'asset_type'],
+        update_fields=['quantity'],
+        batch_size=5000,
+    )
+
+
+def find_mismatches():
+    # Pairs where the ledger and Inventory disagree, found in SQL so the cost
+    # is one pass over the (base, asset_type) pairs, not over the ledger.
+    actual = Inventory.objects.filter(
+        base=OuterRef('base'), asset_type=OuterRef('asset_type')
+    ).values('quantity')[:1]
+    rows = list(
+        LedgerBalance.objects
+        .annotate(actual=Coalesce(Subquery(actual), Value(0)))
+        .exclude(actual=F('quantity'))
+        .values_list('base_id', 'asset_type_id', 'quantity', 'actual')
+    )
+    orphans = (
+        Inventory.objects.exclude(quantity=0)
+        .filter(~Exists(LedgerBalance.objects.filter(base=OuterRef('base'), asset_type=OuterRef('asset_type'))))
+        .values_list('base_id', 'asset_type_id', 'quantity')
+    )
+    rows += [(b, a, 0, q) for b, a, q in orphans]
+    return rows
+
+
+def local(deltas, alias):
+    # A shard's ledger also holds the far side of cross-shard transfers;
+    # only the legs of bases it owns belong to its balances
+    if not sharding_enabled():
+        return deltas
+    return {(b, a): d for (b, a), d in deltas.items() if shard_for_base(b) == alias}
+
+
+def reconcile_shards(full=False, repair=False):
+    # One reconcile() per shard (just default without sharding), in order
+    runs = []
+    for alias in settings.SHARDS:
+        with on_shard(alias):
+            runs.append(reconcile(full=full, repair=repair))
+    return runs
+
+
+def reconcile(full=False, repair=False):
+    """
+    Fold transactions above the last watermark into LedgerBalance, then
+    compare against Inventory. With repair=True, Inventory is set to the
+    ledger value for every mismatched pair. Works on the current shard,
+    which keeps its own balances and watermark (see reconcile_shards).
+
+    Incremental runs re-verify mismatched pairs against the whole ledger
+    before reporting, so a transaction that committed below the watermark
+    after the previous run cannot cause a false alarm. Edits to old ledger
+    rows (e.g. through the admin) are only picked up by a full run.
+    """
+    alias = router.db_for_write(LedgerBalance)
+    connection = connections[alias]
+    with db_transaction.atomic(using=alias):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                # Ledger and Inventory read from one snapshot; one run at a time
+                cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+                cursor.execute("SELECT pg_advisory_xact_lock(hashtext('core.reconcile'))")
+
+        last = ReconciliationRun.objects.order_by('-id').first()
+        watermark = 0 if full or last is None else last.watermark
+        if watermark == 0:
+            full = True
+            LedgerBalance.objects.all().delete()
+
+        pending = Transaction.objects.filter(id__gt=watermark)
+        stats = pending.aggregate(top=Max('id'), scanned=Count('id'))
+        new_watermark = stats['top'] or watermark
+        _apply_deltas(local(ledger_deltas(pending.filter(id__lte=new_watermark)), alias))
+
+        mismatches = find_mismatches()
+        if mismatches and not full:
+            keys = {(b, a) for b, a, _, _ in mismatches}
+            recheck = Transaction.objects.filter(
+                id__lte=new_watermark, asset_type_id__in={a for _, a in keys}
+            ).filter(
+                Q(from_base_id__in={b for b, _ in keys}) | Q(to_base_id__in={b for b, _ in keys})
+            )
+            exact = local(ledger_deltas(recheck), alias)
+            _apply_deltas({k: exact.get(k, 0) for k in keys}, replace=True)
+            mismatches = find_mismatches()
+
+        if repair and mismatches:
+            from .alerts import check_changes
+            from .categories import category_map, rebuild
+            # bulk_create skips post_save, so invalidate the matrix cache here
+            db_transaction.on_commit(lambda: bump_version('inventory_matrix'), using=alias)
+            Inventory.objects.bulk_create(
+                [Inventory(base_id=b, asset_type_id=a, quantity=expected) for b, a, expected, _ in mismatches],
+                update_conflicts=True,
+                unique_fields=['base', 'asset_type'],
+                update_fields=['quantity'],
+                batch_size=5000,
+            )
+            check_changes({(b, a): (actual, expected) for b, a, expected, actual in mismatches})
+            # Whatever put Inventory out of step bypassed the rollups too
+            categories = category_map()
+            affected = {c for _, a, _, _ in mismatches for c in categories.get(a, ())}
+            if affected:
+                rebuild(affected)
+
+        run = ReconciliationRun.objects.create(
+            watermark=new_watermark,
+            full=full,
+            repaired=repair and bool(mismatches),
+            transactions_scanned=stats['scanned'],
+            mismatch_count=len(mismatches),
+            mismatches=[
+                {'base': b, 'asset_type': a, 'expected': expected, 'actual': actual, 'diff': actual - expected}
+                for b, a, expected, actual in mismatches[:MAX_REPORTED]
+            ],
+            finished_at=timezone.now(),
+        )
+    return run
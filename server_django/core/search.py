@@ -0,0 +1,56 @@
+from django.db import connection
+from django.db.models import Q, Case, When, Value, IntegerField
+from django.db.models.functions import Greatest
+
+from .models import AssetType, Base
+
+# Searchable columns per result kind; each has a pg_trgm index (migration 0009)
+FIELDS = {
+    'transactions': ['recipient'],
+    'assets': ['name', 'description'],
+    'bases': ['name', 'location'],
+}
+MIN_LENGTH = 2
+
+
+def _rank(fields, term):
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import TrigramWordSimilarity
+        scores = [TrigramWordSimilarity(term, f) for f in fields]
+    else:
+        # Plain scan fallback: exact > prefix > substring
+        scores = [
+            Case(
+                When(**{f'{f}__iexact': term}, then=Value(3)),
+                When(**{f'{f}__istartswith': term}, then=Value(2)),
+                When(**{f'{f}__icontains': term}, then=Value(1)),
+                default=Value(0), output_field=IntegerField(),
+            )
+            for f in fields
+        ]
+    return Greatest(*scores) if len(scores) > 1 else scores[0]
+
+
+def ranked(qs, kind, term):
+    """
+    Rows of `qs` matching `term` in any searchable column, best first. On
+    PostgreSQL the icontains filter (UPPER(col) LIKE ...) is served by the
+    GIN indexes on UPPER(col) gin_trgm_ops, so only matching rows are read.
+    """
+    fields = FIELDS[kind]
+    match = Q()
+    for f in fields:
+        match |= Q(**{f'{f}__icontains': term})
+    return qs.filter(match).annotate(rank=_rank(fields, term))
+
+
+def search(term, kind, transactions, limit, offset):
+    # `transactions` is the caller's role-scoped ledger queryset
+    querysets = {
+        'transactions': (transactions, '-date'),
+        'assets': (AssetType.objects.all(), 'name'),
+        'bases': (Base.objects.all(), 'name'),
+    }
+    qs, tiebreak = querysets[kind]
+    rows = list(ranked(qs, kind, term).order_by('-rank', tiebreak, 'id')[offset:offset + limit + 1])
+    return rows[:limit], len(rows) > limit
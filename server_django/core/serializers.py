@@ -1,5 +1,6 @@
+from django.utils.functional import cached_property
 from rest_framework import serializers
-from .models import User, Base, AssetType, Inventory, Transaction
+from .models import User, Base, AssetType, AssetCategory, CategoryClosure, Inventory, Transaction, Movement, Job, StockThreshold, StockAlert, SerialItem, ExpenditureEvent
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -21,6 +22,18 @@ class BaseSerializer(serializers.ModelSerializer):
         model = Base
         fields = '__all__'
 
+class AssetCategorySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AssetCategory
+        fields = ['id', 'name', 'parent']
+
+    def validate_parent(self, parent):
+        if parent and self.instance and CategoryClosure.objects.filter(
+            ancestor=self.instance, descendant=parent
+        ).exists():
+            raise serializers.ValidationError("A category can't be moved under itself or its descendants")
+        return parent
+
 class AssetTypeSerializer(serializers.ModelSerializer):
     class Meta:
         model = AssetType
@@ -38,20 +51,164 @@ class TransactionSerializer(serializers.ModelSerializer):
     asset_type_name = serializers.CharField(source='asset_type.name', read_only=True)
     from_base_name = serializers.CharField(source='from_base.name', read_only=True)
     to_base_name = serializers.CharField(source='to_base.name', read_only=True)
+    serials = serializers.ListField(child=serializers.CharField(max_length=100), required=False, write_only=True)
 
     class Meta:
         model = Transaction
         fields = '__all__'
-        read_only_fields = ['performed_by', 'date']
+        read_only_fields = ['performed_by', 'date', 'movement', 'mirror']
+
+    def validate(self, attrs):
+        if self.instance is None:
+            from .serials import validate_serials
+            validate_serials(attrs['asset_type'], attrs['quantity'], attrs.get('serials'))
+        return attrs
 
     def create(self, validated_data):
         user = self.context['request'].user
         validated_data['performed_by'] = user
+        validated_data.pop('serials', None)
         return super().create(validated_data)
 
+class MovementLineSerializer(serializers.ModelSerializer):
+    asset_type_name = serializers.CharField(source='asset_type.name', read_only=True)
+    serials = serializers.ListField(child=serializers.CharField(max_length=100), required=False, write_only=True)
+
+    class Meta:
+        model = Transaction
+        fields = ['id', 'asset_type', 'asset_type_name', 'quantity', 'serials']
+
+    def validate_quantity(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("Quantity must be positive")
+        return value
+
+class MovementSerializer(serializers.ModelSerializer):
+    # A document with nested lines; POST creates the header and all lines at once
+    performed_by_name = serializers.CharField(source='performed_by.username', read_only=True)
+    from_base_name = serializers.CharField(source='from_base.name', read_only=True)
+    to_base_name = serializers.CharField(source='to_base.name', read_only=True)
+    lines = MovementLineSerializer(many=True)
+
+    class Meta:
+        model = Movement
+        fields = '__all__'
+        read_only_fields = ['performed_by', 'date']
+
+    def validate_lines(self, lines):
+        if not lines:
+            raise serializers.ValidationError("A movement needs at least one line")
+        asset_types = [line['asset_type'].id for line in lines]
+        if len(set(asset_types)) != len(asset_types):
+            raise serializers.ValidationError("Each asset type may appear only once per movement")
+        from .serials import validate_serials
+        for line in lines:
+            validate_serials(line['asset_type'], line['quantity'], line.get('serials'))
+        return lines
+
+    def validate(self, attrs):
+        T = Transaction.Type
+        kind, from_base, to_base = attrs['type'], attrs.get('from_base'), attrs.get('to_base')
+        if kind == T.PURCHASE and not to_base:
+            raise serializers.ValidationError("A purchase needs to_base")
+        if kind == T.TRANSFER and (not from_base or not to_base or from_base == to_base):
+            raise serializers.ValidationError("A transfer needs two different bases")
+        if kind in (T.ASSIGNMENT, T.EXPENDITURE) and not from_base:
+            raise serializers.ValidationError("Assignments and expenditures need from_base")
+        return attrs
+
+    def create(self, validated_data):
+        from .movements import post_movement
+        lines = validated_data.pop('lines')
+        movement = Movement.objects.create(performed_by=self.context['request'].user, **validated_data)
+        post_movement(
+            movement,
+            [(line['asset_type'].id, line['quantity']) for line in lines],
+            serials={line['asset_type'].id: line['serials'] for line in lines if line.get('serials')},
+        )
+        return movement
+
+class StockThresholdSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = StockThreshold
+        fields = '__all__'
+
+    def validate(self, attrs):
+        minimum = attrs.get('minimum', getattr(self.instance, 'minimum', 0))
+        reorder = attrs.get('reorder_level', getattr(self.instance, 'reorder_level', 0))
+        if reorder < minimum:
+            raise serializers.ValidationError("reorder_level must be at least minimum")
+        user = self.context['request'].user
+        base = attrs.get('base', getattr(self.instance, 'base', None))
+        if user.role != User.Role.ADMIN and base != user.base:
+            raise serializers.ValidationError("You can only set thresholds for your own base")
+        return attrs
+
+class StockAlertSerializer(serializers.ModelSerializer):
+    base_name = serializers.CharField(source='base.name', read_only=True)
+    asset_type_name = serializers.CharField(source='asset_type.name', read_only=True)
+
+    class Meta:
+        model = StockAlert
+        fields = '__all__'
+
+class SerialItemSerializer(serializers.ModelSerializer):
+    asset_type_name = serializers.CharField(source='asset_type.name', read_only=True)
+    base_name = serializers.CharField(source='base.name', read_only=True)
+
+    class Meta:
+        model = SerialItem
+        fields = '__all__'
+
+class SerialRegistrationSerializer(serializers.Serializer):
+    asset_type = serializers.PrimaryKeyRelatedField(queryset=AssetType.objects.filter(serialized=True))
+    base = serializers.PrimaryKeyRelatedField(queryset=Base.objects.all())
+    serials = serializers.ListField(child=serializers.CharField(max_length=100), allow_empty=False, max_length=100000)
+
+    def validate(self, attrs):
+        if len(set(attrs['serials'])) != len(attrs['serials']):
+            raise serializers.ValidationError("Serials must be distinct")
+        user = self.context['request'].user
+        if user.role != User.Role.ADMIN and attrs['base'] != user.base:
+            raise serializers.ValidationError("You can only register units at your own base")
+        return attrs
+
+class JobSerializer(serializers.ModelSerializer):
+    has_artifact = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = ['id', 'kind', 'payload', 'status', 'attempts', 'max_attempts', 'run_after',
+                  'started_at', 'finished_at', 'result', 'error', 'has_artifact', 'created_at']
+        read_only_fields = ['status', 'attempts', 'max_attempts', 'run_after', 'started_at',
+                            'finished_at', 'result', 'error', 'created_at']
+
+    def get_has_artifact(self, obj):
+        return bool(obj.artifact)
+
+    def validate_kind(self, value):
+        from .jobs import REGISTRY
+        user = self.context['request'].user
+        if value not in REGISTRY or user.role not in REGISTRY[value][1]:
+            raise serializers.ValidationError("Unknown job kind or not permitted for your role")
+        return value
+
+    def create(self, validated_data):
+        from .jobs import enqueue
+        return enqueue(validated_data['kind'], validated_data.get('payload'), user=self.context['request'].user)
+
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        # Role and base travel in the token so the FastAPI read API can scope
+        # queries without looking the user up (copied into refreshed tokens)
+        token = super().get_token(user)
+        token['role'] = user.role
+        token['base_id'] = user.base_id
+        return token
+
     def validate(self, attrs):
         data = super().validate(attrs)
         # Add extra responses here
@@ -59,3 +216,38 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         # Also ensure 'token' is available if frontend expects it, or just use 'access'
         # data['token'] = data['access'] 
         return data
+
+class ExpenditureEventSerializer(serializers.ModelSerializer):
+    # One staged expenditure for the bulk ingest path. Bases and asset types
+    # are checked against one lookup per batch instead of a query per event.
+    base = serializers.IntegerField(source='base_id')
+    asset_type = serializers.IntegerField(source='asset_type_id')
+    quantity = serializers.IntegerField(min_value=1)
+
+    class Meta:
+        model = ExpenditureEvent
+        fields = ['event_id', 'base', 'asset_type', 'quantity', 'recipient']
+        # Repeated event_ids are retries, dropped when staged
+        extra_kwargs = {'event_id': {'validators': []}}
+
+    @cached_property
+    def serialized_types(self):
+        return dict(AssetType.objects.values_list('id', 'serialized'))
+
+    @cached_property
+    def base_ids(self):
+        return set(Base.objects.values_list('id', flat=True))
+
+    def validate(self, attrs):
+        serialized = self.serialized_types.get(attrs['asset_type_id'])
+        if serialized is None:
+            raise serializers.ValidationError({"asset_type": "Unknown asset type"})
+        if serialized:
+            raise serializers.ValidationError("Serialized asset types must be expended through /transactions/")
+        user = self.context['request'].user
+        if user.role != User.Role.ADMIN:
+            if attrs['base_id'] != user.base_id:
+                raise serializers.ValidationError("You can only record expenditures for your own base")
+        elif attrs['base_id'] not in self.base_ids:
+            raise serializers.ValidationError({"base": "Unknown base"})
+        return attrs
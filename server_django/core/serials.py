@@ -0,0 +1,93 @@
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models import Count
+from django.utils import timezone
+from rest_framework import serializers
+
+from .models import Transaction, Inventory, SerialItem
+from .sharding import gather, on_shard, shard_for_base
+
+S = SerialItem.Status
+
+
+def validate_serials(asset_type, quantity, serials):
+    # Serialized types must name exactly `quantity` distinct units; others none
+    if not asset_type.serialized:
+        if serials:
+            raise serializers.ValidationError(f"{asset_type.name} is not tracked by serial number")
+        return
+    if not serials or len(serials) != quantity or len(set(serials)) != len(serials):
+        raise serializers.ValidationError(
+            f"{asset_type.name} is serialized: list {quantity} distinct serials"
+        )
+
+
+def register(asset_type_id, base_id, serials):
+    """
+    Tag units at a base with serial numbers in bulk. Tagged units can never
+    outnumber the base's Inventory count, so registration labels stock that
+    is already counted (existing holdings or a purchase in the same request).
+    The Inventory row is locked on the base's shard; SerialItem stays on
+    default.
+    """
+    alias = shard_for_base(base_id)
+    with on_shard(alias), db_transaction.atomic(using=alias), db_transaction.atomic():
+        inv = Inventory.objects.select_for_update().filter(base_id=base_id, asset_type_id=asset_type_id).first()
+        on_hand = inv.quantity if inv else 0
+        tagged = SerialItem.objects.filter(base_id=base_id, asset_type_id=asset_type_id, status=S.IN_STOCK).count()
+        if tagged + len(serials) > on_hand:
+            raise serializers.ValidationError(
+                {"serials": f"Only {on_hand - tagged} untagged unit(s) in stock at this base"}
+            )
+        try:
+            with db_transaction.atomic():
+                SerialItem.objects.bulk_create(
+                    [SerialItem(serial=s, asset_type_id=asset_type_id, base_id=base_id) for s in serials],
+                    batch_size=5000,
+                )
+        except IntegrityError:
+            raise serializers.ValidationError({"serials": "One or more serials are already registered"})
+    return len(serials)
+
+
+def move_serials(doc, asset_type_id, serials):
+    """
+    Apply one line's serials for a Movement or Transaction `doc` with a
+    single UPDATE: TRANSFER rebases them, ASSIGNMENT and EXPENDITURE change
+    their status. Every unit must be IN_STOCK at the source base, otherwise
+    the whole write is rejected. PURCHASE registers the new units.
+    """
+    T = Transaction.Type
+    if doc.type == T.PURCHASE:
+        return register(asset_type_id, doc.to_base_id, serials)
+    changes = {
+        T.TRANSFER: {'base_id': doc.to_base_id},
+        T.ASSIGNMENT: {'status': S.ASSIGNED, 'assigned_to': doc.recipient},
+        T.EXPENDITURE: {'status': S.EXPENDED},
+    }[doc.type]
+    moved = SerialItem.objects.filter(
+        serial__in=serials, asset_type_id=asset_type_id, base_id=doc.from_base_id, status=S.IN_STOCK
+    ).update(updated_at=timezone.now(), **changes)
+    if moved != len(serials):
+        raise serializers.ValidationError(
+            {"serials": f"{len(serials) - moved} serial(s) are not in stock at the source base"}
+        )
+    return moved
+
+
+def mismatches():
+    # Serialized (base, asset_type) pairs whose tagged units and Inventory disagree
+    tagged = {
+        (r['base_id'], r['asset_type_id']): r['n']
+        for r in SerialItem.objects.filter(status=S.IN_STOCK, asset_type__serialized=True)
+        .values('base_id', 'asset_type_id').annotate(n=Count('id')).order_by()
+    }
+    counted = dict(
+        ((b, a), q) for part in gather(lambda: list(
+            Inventory.objects.filter(asset_type__serialized=True).values_list('base_id', 'asset_type_id', 'quantity')
+        )) for b, a, q in part
+    )
+    return [
+        {'base': b, 'asset_type': a, 'inventory': counted.get((b, a), 0), 'tagged': tagged.get((b, a), 0)}
+        for b, a in sorted(set(tagged) | set(counted))
+        if counted.get((b, a), 0) != tagged.get((b, a), 0)
+    ]
@@ -0,0 +1,284 @@
+"""
+Optional base sharding. With SHARD_DATABASE_URLS set, the ledger
+(Movement, Transaction), Inventory, DailyMovement, the staged
+expenditures and the reconciliation state of base b live on SHARDS[b % n]; users, bases, asset types and
+everything else stay on default, and the reference tables are copied to
+every shard so joins and foreign keys work there (manage.py sync_shards,
+then core.signals).
+
+Code runs against one shard inside `on_shard(alias)`: BaseShardRouter sends
+the sharded models to that alias, so the existing ORM code needs no
+`using=` arguments. Without shards every helper here falls back to default.
+
+A transaction is stored on its home base's shard (from_base, or to_base for
+purchases). A TRANSFER between bases on different shards is written there
+with its debit and a ShardOutbox message in one transaction; relaying the
+message applies the credit (and a mirror ledger row) on the receiving shard
+exactly once, guarded by ShardInbox.
+"""
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections, router, transaction as db_transaction
+from django.utils import timezone
+
+SHARDED_MODELS = {
+    'movement', 'transaction', 'inventory', 'dailymovement', 'categorystock', 'categorydailymovement',
+    'shardoutbox', 'shardinbox', 'expenditureevent', 'ledgerbalance', 'reconciliationrun',
+}
+
+_current = contextvars.ContextVar('shard', default=None)
+
+
+def enabled():
+    return settings.SHARDS != ['default']
+
+
+def shard_for_base(base_id):
+    return settings.SHARDS[base_id % len(settings.SHARDS)]
+
+
+def shard_for_pk(pk):
+    # sync_shards interleaves the ledger sequences: shard k issues ids = k + 1 (mod n)
+    return settings.SHARDS[(pk - 1) % len(settings.SHARDS)]
+
+
+def home_shard(from_base_id, to_base_id):
+    return shard_for_base(from_base_id or to_base_id)
+
+
+def owns(base_id):
+    # Whether the shard in scope keeps base_id's balances (always, unsharded)
+    return not enabled() or shard_for_base(base_id) == _current.get()
+
+
+@contextmanager
+def on_shard(alias):
+    token = _current.set(alias)
+    try:
+        yield alias
+    finally:
+        _current.reset(token)
+
+
+class BaseShardRouter:
+    def _route(self, model):
+        if model._meta.app_label == 'core' and model._meta.model_name in SHARDED_MODELS:
+            return _current.get()
+        return None
+
+    def db_for_read(self, model, **hints):
+        return self._route(model)
+
+    def db_for_write(self, model, **hints):
+        return self._route(model)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Reference rows exist on every shard under the same ids
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Every database gets the full schema
+        return True
+
+
+def gather(func, *args):
+    """
+    Run func(*args) on every shard in parallel and return the results in
+    shard order. Each worker thread opens its own connections and closes
+    them when done.
+    """
+    if not enabled():
+        return [func(*args)]
+
+    def run(alias):
+        try:
+            with on_shard(alias):
+                return func(*args)
+        finally:
+            connections.close_all()
+
+    with ThreadPoolExecutor(max_workers=len(settings.SHARDS)) as pool:
+        return list(pool.map(run, settings.SHARDS))
+
+
+class Gathered:
+    """
+    The part of the QuerySet API that CursorPagination uses (order_by,
+    filter, slicing), fanned out over every shard. `queryset` builds the
+    per-shard QuerySet inside each worker; a slice fetches up to its stop
+    from every shard and merges them in the requested order.
+    """
+
+    def __init__(self, queryset, steps=()):
+        self.queryset = queryset
+        self.steps = steps
+        self.ordering = ()
+
+    def _then(self, method, *args, **kwargs):
+        clone = Gathered(self.queryset, self.steps + ((method, args, kwargs),))
+        clone.ordering = args if method == 'order_by' else self.ordering
+        return clone
+
+    def order_by(self, *fields):
+        return self._then('order_by', *fields)
+
+    def filter(self, **kwargs):
+        return self._then('filter', **kwargs)
+
+    def __getitem__(self, window):
+        def read():
+            qs = self.queryset()
+            for method, args, kwargs in self.steps:
+                qs = getattr(qs, method)(*args, **kwargs)
+            return list(qs[:window.stop])
+        rows = [row for part in gather(read) for row in part]
+        for field in reversed(self.ordering):  # Stable sorts, last key first
+            rows.sort(key=lambda row: getattr(row, field.lstrip('-')), reverse=field.startswith('-'))
+        return rows[window]
+
+
+def replicate(model, instances, aliases=None):
+    # Upsert reference rows onto the shards; bulk_create sends no signals
+    if not enabled() or not instances:
+        return
+    fields = [f.name for f in model._meta.concrete_fields if not f.primary_key]
+    # bulk_create points each instance at the database it wrote to; put them
+    # back, or the caller's next save() would go to the last shard only
+    states = [(instance._state, instance._state.db, instance._state.adding) for instance in instances]
+    try:
+        for alias in aliases or settings.SHARDS:
+            model.objects.using(alias).bulk_create(
+                instances, update_conflicts=True, unique_fields=['id'], update_fields=fields,
+            )
+    finally:
+        for state, db, adding in states:
+            state.db, state.adding = db, adding
+
+
+def _apply_leg(tx, base_id):
+    # The Inventory and DailyMovement change for one base's side of `tx`
+    from .models import Inventory, DailyMovement
+    from .movements import add_rows, INCREASES
+    from .timeseries import movement_legs, COLUMNS
+    from .categories import roll_up_transaction
+    from .alerts import check_thresholds
+
+    adapt = connections[router.db_for_write(DailyMovement)].ops.adapt_datefield_value
+    day = adapt(timezone.localdate(tx.date))
+    for leg_base, column, qty in movement_legs(tx):
+        if leg_base != base_id:
+            continue
+        delta = qty if column in INCREASES else -qty
+        [(_, _, quantity)] = add_rows(Inventory, ['base_id', 'asset_type_id'], ['quantity'],
+                                      [(base_id, tx.asset_type_id, delta)], returning=True)
+        add_rows(DailyMovement, ['base_id', 'asset_type_id', 'day'], COLUMNS,
+                 [(base_id, tx.asset_type_id, day, *(qty if c == column else 0 for c in COLUMNS))])
+        check_thresholds(base_id, tx.asset_type_id, quantity - delta, quantity)
+    roll_up_transaction(tx, base_id)
+
+
+def transfer_across(data, user):
+    # A single-line TRANSFER from TransactionViewSet; returns its ledger row
+    from .models import Movement
+
+    movement = Movement(
+        type=data['type'], from_base=data['from_base'], to_base=data['to_base'],
+        recipient=data.get('recipient'), performed_by=user,
+    )
+    return transfer_document(movement, [(data['asset_type'].id, data['quantity'])])[0]
+
+
+def transfer_document(movement, lines):
+    """
+    Write an unsaved TRANSFER `movement` whose bases live on different
+    shards, with lines [(asset_type_id, quantity), ...]: ledger rows, debits
+    and one outbox message commit together on the source shard; the credits
+    follow when the message is relayed (right after commit, or by
+    manage.py relay_outbox if that attempt fails). Returns the ledger rows.
+    """
+    from .models import Transaction, ShardOutbox
+
+    source = shard_for_base(movement.from_base_id)
+    with on_shard(source), db_transaction.atomic(using=source):
+        movement.save()
+        txs = []
+        for asset_type_id, quantity in lines:
+            tx = Transaction.objects.create(
+                type=movement.type, asset_type_id=asset_type_id, quantity=quantity,
+                from_base_id=movement.from_base_id, to_base_id=movement.to_base_id,
+                recipient=movement.recipient, performed_by_id=movement.performed_by_id, movement=movement,
+            )
+            _apply_leg(tx, tx.from_base_id)
+            txs.append(tx)
+        message = ShardOutbox.objects.create(
+            destination=shard_for_base(movement.to_base_id),
+            payload={
+                'date': txs[0].date.isoformat(), 'type': movement.type,
+                'from_base': movement.from_base_id, 'to_base': movement.to_base_id,
+                'recipient': movement.recipient, 'performed_by': movement.performed_by_id,
+                'lines': [{'transaction': tx.pk, 'asset_type': tx.asset_type_id, 'quantity': tx.quantity} for tx in txs],
+            },
+        )
+        db_transaction.on_commit(lambda: _deliver_quietly(source, message.pk), using=source)
+    return txs
+
+
+def _deliver_quietly(source, message_id):
+    from django.db import DatabaseError
+    try:
+        deliver(source, message_id)
+    except DatabaseError:
+        pass  # Left pending for relay_outbox
+
+
+def deliver(source, message_id):
+    """
+    Apply one outbox message on its destination shard. The ShardInbox row
+    commits with the credit, so a message relayed twice (a crash between
+    the two commits, or two relays racing) is applied once.
+    """
+    from datetime import datetime
+    from .models import Movement, Transaction, ShardOutbox, ShardInbox
+
+    with on_shard(source):
+        message = ShardOutbox.objects.filter(pk=message_id, delivered_at__isnull=True).first()
+    if message is None:
+        return False
+    p = message.payload
+    with on_shard(message.destination), db_transaction.atomic(using=message.destination):
+        _, created = ShardInbox.objects.get_or_create(message_id=f'{source}:{message.pk}')
+        if created:
+            date = datetime.fromisoformat(p['date'])
+            movement = Movement.objects.create(
+                type=p['type'], date=date, from_base_id=p['from_base'], to_base_id=p['to_base'],
+                recipient=p['recipient'], performed_by_id=p['performed_by'],
+            )
+            for line in p['lines']:
+                tx = Transaction.objects.create(
+                    type=p['type'], asset_type_id=line['asset_type'], quantity=line['quantity'],
+                    from_base_id=p['from_base'], to_base_id=p['to_base'], recipient=p['recipient'],
+                    performed_by_id=p['performed_by'], movement=movement, mirror=True,
+                )
+                # date is auto_now_add; keep the source row's timestamp
+                Transaction.objects.filter(pk=tx.pk).update(date=date)
+                tx.date = date
+                _apply_leg(tx, tx.to_base_id)
+    with on_shard(source):
+        ShardOutbox.objects.filter(pk=message.pk).update(delivered_at=timezone.now())
+    return True
+
+
+def relay_pending(limit=1000):
+    # Deliver undelivered outbox messages from every shard, oldest first
+    from .models import ShardOutbox
+
+    delivered = 0
+    for alias in settings.SHARDS:
+        with on_shard(alias):
+            ids = list(ShardOutbox.objects.filter(delivered_at__isnull=True).order_by('id').values_list('id', flat=True)[:limit])
+        for message_id in ids:
+            delivered += deliver(alias, message_id)
+    return delivered
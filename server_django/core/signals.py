@@ -0,0 +1,73 @@
+from django.db import transaction as db_transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .cache import bump_version
+from .models import User, Base, AssetType, AssetCategory, Inventory
+from .sharding import replicate, enabled as sharding_enabled
+
+
+@receiver([post_save, post_delete], sender=User)
+@receiver([post_save, post_delete], sender=Base)
+def invalidate_public_users(sender, update_fields=None, **kwargs):
+    # Directory shows username, role and base name; logins only touch last_login
+    if update_fields and set(update_fields) <= {'last_login', 'password'}:
+        return
+    db_transaction.on_commit(lambda: bump_version('public_users'))
+
+
+@receiver([post_save, post_delete], sender=Inventory)
+@receiver([post_save, post_delete], sender=Base)
+@receiver([post_save, post_delete], sender=AssetType)
+def invalidate_inventory(sender, **kwargs):
+    # Bases and asset types label the matrix's rows and columns. After
+    # commit, so no worker can rebuild the cache from pre-commit data
+    db_transaction.on_commit(lambda: bump_version('inventory_matrix'))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Base)
+@receiver(post_save, sender=AssetType)
+def replicate_reference(sender, instance, using, **kwargs):
+    # Shards keep copies of the reference tables their ledger rows point at
+    if using == 'default':
+        replicate(sender, [instance])
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Base)
+@receiver(post_delete, sender=AssetType)
+@receiver(post_delete, sender=AssetCategory)
+def delete_reference(sender, instance, using, **kwargs):
+    if using == 'default' and sharding_enabled():
+        from django.conf import settings
+        for alias in settings.SHARDS:
+            sender.objects.using(alias).filter(pk=instance.pk).delete()
+
+
+@receiver(post_save, sender=AssetCategory)
+def place_category(sender, instance, using, raw=False, **kwargs):
+    # Closure rows follow the parent at once; rollups once the move commits
+    from .categories import attach, regroup
+    if using != 'default' or raw:
+        return
+    affected = attach(instance)
+    db_transaction.on_commit(lambda: regroup(affected))
+
+
+@receiver(pre_save, sender=AssetType)
+def remember_category(sender, instance, using, raw=False, **kwargs):
+    instance._saved_category_id = None
+    if instance.pk and not raw:
+        instance._saved_category_id = (
+            AssetType.objects.using(using).filter(pk=instance.pk).values_list('category_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=AssetType)
+def recategorize(sender, instance, using, created, raw=False, **kwargs):
+    from .categories import ancestors, regroup
+    if using != 'default' or raw or getattr(instance, '_saved_category_id', None) == instance.category_id:
+        return
+    affected = set() if created else ancestors(instance._saved_category_id) | ancestors(instance.category_id)
+    db_transaction.on_commit(lambda: regroup(affected))
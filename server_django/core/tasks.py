@@ -0,0 +1,70 @@
+import csv
+import heapq
+
+from .jobs import register, artifact_path
+from .models import User
+
+
+@register('export_transactions', roles=User.Role.values)
+def export_transactions(job):
+    # CSV of every transaction the requesting user can see
+    from django.conf import settings
+    from .models import Transaction
+    from .sharding import enabled as sharding_enabled, shard_for_base
+    from .views import transactions_visible_to
+
+    # Jobs queued from the command line have no user and export everything
+    user = job.created_by
+    qs = transactions_visible_to(user) if user else Transaction.objects.all()
+    qs = qs.select_related(
+        'asset_type', 'from_base', 'to_base', 'performed_by'
+    ).order_by('-date', '-id')
+    if not sharding_enabled():
+        parts = [qs]
+    elif user and user.role != User.Role.ADMIN:
+        # A base's rows, inbound mirrors included, are all on its shard
+        parts = [qs.using(shard_for_base(user.base_id))] if user.base_id else []
+    else:
+        # Every shard, each cross-shard transfer once (its mirror copy skipped)
+        parts = [qs.filter(mirror=False).using(alias) for alias in settings.SHARDS]
+    stream = heapq.merge(
+        *(part.iterator(chunk_size=2000) for part in parts), key=lambda tx: (tx.date, tx.id), reverse=True
+    )
+    rows = 0
+    with open(artifact_path(job, 'transactions.csv'), 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['id', 'date', 'type', 'asset_type', 'quantity', 'from_base', 'to_base', 'recipient', 'performed_by'])
+        for tx in stream:
+            writer.writerow([
+                tx.id, tx.date.isoformat(), tx.type, tx.asset_type.name, tx.quantity,
+                tx.from_base.name if tx.from_base else '',
+                tx.to_base.name if tx.to_base else '',
+                tx.recipient or '',
+                tx.performed_by.username if tx.performed_by else '',
+            ])
+            rows += 1
+    return {'rows': rows}
+
+
+@register('reconcile_inventory')
+def reconcile_inventory(job):
+    from .reconciliation import reconcile_shards
+
+    runs = reconcile_shards(full=job.payload.get('full', False), repair=job.payload.get('repair', False))
+    return {
+        # One run per shard; a single run without sharding
+        'runs': [{'run': run.pk, 'watermark': run.watermark} for run in runs],
+        'scanned': sum(run.transactions_scanned for run in runs),
+        'mismatches': sum(run.mismatch_count for run in runs),
+        'repaired': any(run.repaired for run in runs),
+    }
+
+
+@register('rebuild_movements')
+def rebuild_movements(job):
+    from datetime import date
+    from .sharding import gather
+    from .timeseries import backfill
+
+    since = job.payload.get('since')
+    return {'buckets': sum(gather(backfill, date.fromisoformat(since) if since else None))}
@@ -1,3 +1,717 @@
-from django.test import TestCase
+import hashlib
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock, skipIf
+
+import numpy as np
+from django.core.management import call_command, CommandError
+from django.db import DatabaseError
+from django.db.models import Sum
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, check_password, make_password
+from django.db.models.query import QuerySet
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import boot
+from .hashers import HashPoolBusy, hash_pool
+from .idempotency import HEADER
+from .ingest import pending_count, stage, flush
+from .jobs import REGISTRY, enqueue, claim_next, run_job, requeue_stale
+from .models import (
+    Base, AssetType, AssetCategory, User, Inventory, Transaction, Movement, IdempotencyKey, Job, StockThreshold,
+    StockAlert, CategoryStock, CategoryDailyMovement,
+    SerialItem, ExpenditureEvent, DailyMovement, ImportCheckpoint, ShardOutbox, ShardInbox,
+)
+from .rebalance import solve_costed
+from .reconciliation import reconcile_shards
+from .sharding import (
+    enabled as sharding_enabled, on_shard, shard_for_base, gather, transfer_document, relay_pending, deliver,
+)
+from .views import TransactionViewSet
+
+TRANSACTIONS = '/api/v1/transactions/'
+
+
+class LedgerTestCase(TransactionTestCase):
+    # Runs as configured: with SHARD_DATABASE_URLS set, against every shard.
+    # Writes really commit, since gather() reads each shard from a thread.
+    databases = '__all__'
+
+    def setUp(self):
+        self.bases = [Base.objects.create(name=f'Base {i}', location='Test') for i in range(1, 4)]
+        self.asset = AssetType.objects.create(name='Rifle')
+        self.admin = User.objects.create_user('admin', password='x', role=User.Role.ADMIN)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def post(self, url, data, **headers):
+        return self.client.post(url, data, format='json', headers=headers)
+
+    def purchase(self, base, quantity, asset=None, **headers):
+        return self.post(TRANSACTIONS, {
+            'type': 'PURCHASE', 'asset_type': (asset or self.asset).id, 'quantity': quantity, 'to_base': base.id,
+        }, **headers)
+
+    def stock(self, base, asset=None):
+        with on_shard(shard_for_base(base.id)):
+            inv = Inventory.objects.filter(base=base, asset_type=asset or self.asset).first()
+        return inv.quantity if inv else 0
+
+    def corrupt(self, base, quantity):
+        # Inventory drifting from the ledger behind the API's back
+        with on_shard(shard_for_base(base.id)):
+            Inventory.objects.filter(base=base).update(quantity=quantity)
+
+    def transfer(self, quantity, relay=True):
+        # TRANSFER base 1 -> base 2 (across shards when sharded); with
+        # relay=False the delivery after commit fails, leaving the credit
+        # in the outbox
+        body = {
+            'type': 'TRANSFER', 'from_base': self.bases[0].id, 'to_base': self.bases[1].id,
+            'lines': [{'asset_type': self.asset.id, 'quantity': quantity}],
+        }
+        if relay:
+            return self.post('/api/v1/movements/', body)
+        with mock.patch('core.sharding.deliver', side_effect=DatabaseError):
+            return self.post('/api/v1/movements/', body)
+
+
+class LedgerWriteTests(LedgerTestCase):
+    def test_client_cannot_mark_a_row_as_a_mirror(self):
+        response = self.post(TRANSACTIONS, {
+            'type': 'PURCHASE', 'asset_type': self.asset.id, 'quantity': 4, 'to_base': self.bases[0].id,
+            'mirror': True,
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(response.data['mirror'])
+        rows = [row for part in gather(lambda: list(Transaction.objects.values_list('mirror', flat=True))) for row in part]
+        self.assertEqual(rows, [False])
+        self.assertEqual(self.stock(self.bases[0]), 4)
+
+    def test_reference_rows_keep_saving_to_default(self):
+        # Copying the new row to the shards must not redirect its next save
+        self.asset.description = 'Service rifle'
+        self.asset.save()
+        self.assertEqual(AssetType.objects.using('default').get(pk=self.asset.pk).description, 'Service rifle')
+        for part in gather(lambda: list(AssetType.objects.values_list('description', flat=True))):
+            self.assertEqual(part, ['Service rifle'])
+
+
+class LedgerPaginationTests(LedgerTestCase):
+    def pages(self, url):
+        # Every row, following `next` from the first page
+        rows = []
+        while url:
+            data = self.client.get(url).data
+            rows += data['results']
+            url = data['next']
+        return rows
+
+    def test_pages_cover_every_row_once_newest_first(self):
+        for i, base in enumerate(self.bases * 3):
+            self.purchase(base, i + 1)
+        self.transfer(2)
+        rows = self.pages(f'{TRANSACTIONS}?page_size=4')
+        # Each row once (ids only name a row per shard on SQLite), and the
+        # transfer's mirror copy is not listed
+        self.assertEqual(sorted(r['quantity'] for r in rows), sorted([*range(1, 10), 2]))
+        self.assertEqual([r['date'] for r in rows], sorted((r['date'] for r in rows), reverse=True))
+        self.assertEqual(len(self.pages('/api/v1/movements/?page_size=3')), 10)
+
+    def test_type_filter(self):
+        self.purchase(self.bases[0], 5)
+        self.transfer(2)
+        rows = self.pages(f'{TRANSACTIONS}?type=PURCHASE')
+        self.assertEqual([r['type'] for r in rows], ['PURCHASE'])
+        self.assertEqual(self.client.get(f'{TRANSACTIONS}?type=GIFT').status_code, 400)
+
+
+class IdempotencyTests(LedgerTestCase):
+    def body(self):
+        return {'type': 'PURCHASE', 'asset_type': self.asset.id, 'quantity': 5, 'to_base': self.bases[0].id}
+
+    def fingerprint(self):
+        body = json.dumps(self.body(), sort_keys=True, default=str)
+        return hashlib.sha256(f'POST:{TRANSACTIONS}:{body}'.encode()).hexdigest()
+
+    def pending_key(self, created_at):
+        # The claim a request still in progress (or one that died) leaves behind
+        IdempotencyKey.objects.create(
+            user=self.admin, key='k1', fingerprint=self.fingerprint(), expires_at=timezone.now() + timedelta(hours=1),
+        )
+        IdempotencyKey.objects.filter(key='k1').update(created_at=created_at)
+
+    def ledger_rows(self):
+        return sum(gather(lambda: Transaction.objects.count()))
+
+    def test_replay_returns_stored_response_without_writing_again(self):
+        first = self.post(TRANSACTIONS, self.body(), **{HEADER: 'k1'})
+        second = self.post(TRANSACTIONS, self.body(), **{HEADER: 'k1'})
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(self.stock(self.bases[0]), 5)
+
+    def test_key_reused_with_another_body_is_rejected(self):
+        self.post(TRANSACTIONS, self.body(), **{HEADER: 'k1'})
+        response = self.post(TRANSACTIONS, {**self.body(), 'quantity': 6}, **{HEADER: 'k1'})
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(self.stock(self.bases[0]), 5)
+
+    def test_duplicate_while_first_is_running_gets_409(self):
+        self.pending_key(timezone.now())
+        response = self.post(TRANSACTIONS, self.body(), **{HEADER: 'k1'})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.stock(self.bases[0]), 0)
+
+    def test_stale_claim_is_taken_over(self):
+        self.pending_key(timezone.now() - timedelta(hours=1))
+        response = self.post(TRANSACTIONS, self.body(), **{HEADER: 'k1'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.stock(self.bases[0]), 5)
+        self.assertEqual(IdempotencyKey.objects.get(key='k1').state, IdempotencyKey.State.COMPLETED)
+
+    def test_takeover_loses_to_a_claim_completed_meanwhile(self):
+        # The retry saw a stale PENDING claim, but the first request finished
+        # before the takeover's UPDATE ran
+        self.pending_key(timezone.now() - timedelta(hours=1))
+        seen = IdempotencyKey.objects.get(key='k1')
+        IdempotencyKey.objects.filter(key='k1').update(
+            state=IdempotencyKey.State.COMPLETED, status_code=201, response={'id': 1},
+        )
+        with mock.patch.object(QuerySet, 'first', return_value=seen):
+            response = self.post(TRANSACTIONS, self.body(), **{HEADER: 'k1'})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.ledger_rows(), 0)
+        self.assertEqual(IdempotencyKey.objects.get(key='k1').state, IdempotencyKey.State.COMPLETED)
+
+    def test_request_that_loses_its_claim_rolls_back(self):
+        original = TransactionViewSet._update_inventory
+
+        def taken_over(view, tx):
+            # A retry takes the key over as stale while this request is still writing
+            IdempotencyKey.objects.filter(key='k1').update(created_at=timezone.now() + timedelta(seconds=1))
+            original(view, tx)
+
+        with mock.patch.object(TransactionViewSet, '_update_inventory', taken_over):
+            response = self.post(TRANSACTIONS, self.body(), **{HEADER: 'k1'})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.stock(self.bases[0]), 0)
+        self.assertEqual(self.ledger_rows(), 0)
+
+    def test_ingest_batch_is_staged_once(self):
+        events = [{'base': self.bases[0].id, 'asset_type': self.asset.id, 'quantity': 1} for _ in range(2)]
+        first = self.post('/api/v1/expenditures/ingest/', events, **{HEADER: 'batch-1'})
+        second = self.post('/api/v1/expenditures/ingest/', events, **{HEADER: 'batch-1'})
+        self.assertEqual(first.status_code, 202)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(pending_count(), 2)
+
+
+class JobClaimTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.dict(REGISTRY, {
+            'tests.ok': (lambda job: {'done': job.pk}, {User.Role.ADMIN}),
+            'tests.fail': (mock.Mock(side_effect=RuntimeError('boom')), {User.Role.ADMIN}),
+        })
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_jobs_are_claimed_once_in_order(self):
+        first, second = enqueue('tests.ok'), enqueue('tests.ok')
+        enqueue('tests.ok', delay=3600)
+        claimed = [claim_next('w1'), claim_next('w2'), claim_next('w3')]
+        self.assertEqual([job and job.pk for job in claimed], [first.pk, second.pk, None])
+        self.assertEqual(claimed[0].status, Job.Status.RUNNING)
+        self.assertEqual(claimed[0].attempts, 1)
+        self.assertEqual(claimed[1].locked_by, 'w2')
+
+    def test_success_records_the_result(self):
+        enqueue('tests.ok')
+        job = run_job(claim_next('w1'))
+        self.assertEqual(job.status, Job.Status.SUCCEEDED)
+        self.assertEqual(job.result, {'done': job.pk})
+
+    def test_failures_back_off_then_fail(self):
+        job = enqueue('tests.fail', max_attempts=2)
+        job = run_job(claim_next('w1'))
+        self.assertEqual(job.status, Job.Status.QUEUED)
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIsNone(claim_next('w1'))
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        job = run_job(claim_next('w1'))
+        self.assertEqual(job.status, Job.Status.FAILED)
+        self.assertIn('boom', job.error)
+
+    def test_stale_running_jobs_are_requeued(self):
+        job = enqueue('tests.ok')
+        claim_next('w1')
+        Job.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(days=1))
+        self.assertEqual(requeue_stale(), 1)
+        self.assertEqual(claim_next('w2').pk, job.pk)
+
+
+class AlertTests(LedgerTestCase):
+    def expend(self, quantity):
+        return self.post(TRANSACTIONS, {
+            'type': 'EXPENDITURE', 'asset_type': self.asset.id, 'quantity': quantity, 'from_base': self.bases[0].id,
+        })
+
+    def open_levels(self):
+        return set(StockAlert.objects.filter(resolved_at__isnull=True).values_list('level', flat=True))
+
+    def test_alerts_open_and_resolve_as_stock_crosses_levels(self):
+        self.purchase(self.bases[0], 20)
+        StockThreshold.objects.create(base=self.bases[0], asset_type=self.asset, minimum=5, reorder_level=10)
+        self.expend(12)
+        self.assertEqual(self.open_levels(), {StockAlert.Level.REORDER})
+        self.expend(1)
+        self.assertEqual(StockAlert.objects.count(), 1)  # Still below, not raised again
+        self.expend(4)
+        self.assertEqual(self.open_levels(), {StockAlert.Level.REORDER, StockAlert.Level.CRITICAL})
+        self.purchase(self.bases[0], 9)
+        self.assertEqual(self.open_levels(), set())
+        self.assertEqual(StockAlert.objects.filter(resolved_at__isnull=False).count(), 2)
+
+    def test_setting_a_threshold_evaluates_current_stock(self):
+        self.purchase(self.bases[0], 3)
+        response = self.post('/api/v1/thresholds/', {
+            'base': self.bases[0].id, 'asset_type': self.asset.id, 'minimum': 5, 'reorder_level': 10,
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.open_levels(), {StockAlert.Level.REORDER, StockAlert.Level.CRITICAL})
+
+
+class ReconciliationTests(LedgerTestCase):
+    def reconcile(self, **options):
+        runs = reconcile_shards(**options)
+        return sum(run.mismatch_count for run in runs), [m for run in runs for m in run.mismatches]
+
+    def test_repair_restores_ledger_values(self):
+        self.purchase(self.bases[0], 10)
+        self.purchase(self.bases[1], 4)
+        self.transfer(3)
+        self.transfer(1, relay=False)  # Sharded: debited, credit still in the outbox
+        self.assertEqual(self.reconcile(), (0, []))
+
+        self.corrupt(self.bases[0], 2)
+        count, mismatches = self.reconcile()
+        self.assertEqual(count, 1)
+        self.assertEqual(mismatches[0]['diff'], -4)
+        self.assertEqual(self.stock(self.bases[0]), 2)  # Reported, not repaired
+
+        self.assertEqual(self.reconcile(repair=True)[0], 1)
+        self.assertEqual(self.stock(self.bases[0]), 6)
+        relay_pending()
+        self.assertEqual(self.reconcile(full=True), (0, []))
+
+    def test_repair_raises_alerts_for_stock_it_lowers(self):
+        self.purchase(self.bases[0], 3)
+        StockThreshold.objects.create(base=self.bases[0], asset_type=self.asset, minimum=5, reorder_level=8)
+        StockAlert.objects.all().delete()
+        self.corrupt(self.bases[0], 50)
+        self.reconcile(repair=True)
+        self.assertEqual(
+            set(StockAlert.objects.values_list('level', flat=True)),
+            {StockAlert.Level.REORDER, StockAlert.Level.CRITICAL},
+        )
+
+
+class RebalanceTests(LedgerTestCase):
+    def test_pruned_solve_moves_every_unit(self):
+        # Every kept arc runs through supplier 0 or demander 0, so most units
+        # only move in the second pass over the full cost matrix
+        n = 4
+        cost = np.add.outer(np.arange(n), np.arange(n) * 0.1) + 1
+        s_keys = np.c_[np.ones(n, np.int64), np.arange(n), np.arange(n)]
+        d_keys = np.c_[np.ones(n, np.int64), np.arange(n) + 10, np.arange(n)]
+        qty = np.full(n, 5, np.int64)
+        _, src, dst, moved = solve_costed(s_keys, qty, d_keys, qty, cost, neighbours=1)
+        self.assertEqual(moved.sum(), 20)
+        self.assertEqual(np.bincount(src, weights=moved, minlength=n).tolist(), [5] * n)
+        self.assertEqual(np.bincount(dst - 10, weights=moved, minlength=n).tolist(), [5] * n)
+
+    def test_proposals_commit_and_meet_targets(self):
+        self.purchase(self.bases[0], 30)
+        targets = [{'base': b.id, 'asset_type': self.asset.id, 'target': 10} for b in self.bases]
+        costs = {self.bases[0].id: {self.bases[1].id: 1, self.bases[2].id: 2}}
+        proposal = self.post('/api/v1/rebalance/', {'targets': targets, 'costs': costs})
+        self.assertEqual(proposal.data['totalQuantity'], 20)
+        response = self.post('/api/v1/rebalance/commit/', {'transfers': proposal.data['transfers']})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([self.stock(b) for b in self.bases], [10, 10, 10])
+
+    def test_commit_rejects_transfers_beyond_stock(self):
+        self.purchase(self.bases[0], 5)
+        response = self.post('/api/v1/rebalance/commit/', {'transfers': [
+            {'asset_type': self.asset.id, 'from_base': self.bases[0].id, 'to_base': self.bases[1].id, 'quantity': 6},
+        ]})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['shortfalls'][0]['available'], 5)
+        self.assertEqual(self.stock(self.bases[0]), 5)
+
+    def test_commit_rejects_unknown_bases(self):
+        self.purchase(self.bases[0], 5)
+        response = self.post('/api/v1/rebalance/commit/', {'transfers': [
+            {'asset_type': self.asset.id, 'from_base': self.bases[0].id, 'to_base': 999, 'quantity': 1},
+        ]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['bases'], [999])
+        self.assertEqual(self.stock(self.bases[0]), 5)
+
+
+class SerialTests(LedgerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.radio = AssetType.objects.create(name='Radio', serialized=True)
+
+    def move(self, kind, serials, **bases):
+        return self.post('/api/v1/movements/', {
+            'type': kind, **{k: b.id for k, b in bases.items()},
+            'lines': [{'asset_type': self.radio.id, 'quantity': len(serials), 'serials': serials}],
+        })
+
+    def units(self, **filters):
+        return dict(SerialItem.objects.filter(**filters).values_list('serial', 'status'))
+
+    def test_purchase_must_name_each_unit(self):
+        response = self.purchase(self.bases[0], 2, asset=self.radio)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.move('PURCHASE', ['R1', 'R1'], to_base=self.bases[0]).status_code, 400)
+        self.assertEqual(self.stock(self.bases[0], self.radio), 0)
+
+    def test_units_follow_transfers_and_expenditures(self):
+        self.assertEqual(self.move('PURCHASE', ['R1', 'R2', 'R3'], to_base=self.bases[0]).status_code, 201)
+        self.assertEqual(self.move('TRANSFER', ['R2'], from_base=self.bases[0], to_base=self.bases[1]).status_code, 201)
+        self.assertEqual(self.move('EXPENDITURE', ['R3'], from_base=self.bases[0]).status_code, 201)
+        self.assertEqual(self.units(base=self.bases[0]), {'R1': 'IN_STOCK', 'R3': 'EXPENDED'})
+        self.assertEqual(self.units(base=self.bases[1]), {'R2': 'IN_STOCK'})
+        self.assertEqual([self.stock(b, self.radio) for b in self.bases[:2]], [1, 1])
+
+    def test_units_not_at_the_source_are_rejected(self):
+        self.move('PURCHASE', ['R1'], to_base=self.bases[0])
+        response = self.move('TRANSFER', ['R9'], from_base=self.bases[0], to_base=self.bases[1])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.units(), {'R1': 'IN_STOCK'})
+        self.assertEqual(self.stock(self.bases[0], self.radio), 1)
+
+    def test_register_tags_counted_stock_only(self):
+        self.move('PURCHASE', ['R1'], to_base=self.bases[0])
+        self.corrupt(self.bases[0], 2)  # One more unit counted than tagged
+        url = '/api/v1/serials/register/'
+        body = {'asset_type': self.radio.id, 'base': self.bases[0].id}
+        self.assertEqual(self.client.get('/api/v1/serials/consistency/').data['consistent'], False)
+        self.assertEqual(self.post(url, {**body, 'serials': ['R2', 'R3']}).status_code, 400)
+        self.assertEqual(self.post(url, {**body, 'serials': ['R2']}).status_code, 201)
+        self.assertEqual(self.client.get('/api/v1/serials/consistency/').data, {'consistent': True, 'mismatches': []})
+
+
+class ExpenditureIngestTests(LedgerTestCase):
+    def events(self, *ids, quantity=1):
+        return [
+            {'event_id': i, 'base_id': self.bases[0].id, 'asset_type_id': self.asset.id, 'quantity': quantity}
+            for i in ids
+        ]
+
+    def test_staging_counts_only_rows_it_inserted(self):
+        self.assertEqual(stage(self.admin, self.events('e1')), 1)
+        self.assertEqual(stage(self.admin, self.events('e1', 'e2')), 1)
+        # A concurrent retry staged e3 after the duplicate check ran; the
+        # INSERT skips it, and so does the count
+        stage(self.admin, self.events('e3'))
+        with mock.patch.object(QuerySet, 'values_list', return_value=[]):
+            self.assertEqual(stage(self.admin, self.events('e3', 'e4')), 1)
+        self.assertEqual(pending_count(), 4)
+
+    def test_staging_leaves_the_flush_to_the_worker(self):
+        self.purchase(self.bases[0], 10)
+        stage(self.admin, self.events('e1', quantity=3))
+        with on_shard(shard_for_base(self.bases[0].id)):
+            ExpenditureEvent.objects.update(received_at=timezone.now() - timedelta(hours=1))
+        response = self.post('/api/v1/expenditures/ingest/', [
+            {'event_id': 'e2', 'base': self.bases[0].id, 'asset_type': self.asset.id, 'quantity': 2},
+        ])
+        self.assertEqual(response.data, {'accepted': 1, 'duplicates': 0})
+        self.assertEqual(pending_count(), 2)
+        self.assertEqual(self.stock(self.bases[0]), 10)
+
+    def test_flush_dates_the_movement_and_its_lines_alike(self):
+        self.purchase(self.bases[0], 10)
+        stage(self.admin, self.events('e1', 'e2', quantity=2))
+        with on_shard(shard_for_base(self.bases[0].id)):
+            ExpenditureEvent.objects.filter(event_id='e1').update(received_at=timezone.now() - timedelta(days=2))
+        self.assertEqual(flush(), (2, 1))
+        self.assertEqual(self.stock(self.bases[0]), 6)
+        with on_shard(shard_for_base(self.bases[0].id)):
+            movement = Movement.objects.get(type=Transaction.Type.EXPENDITURE)
+            self.assertEqual(list(movement.lines.values_list('date', 'quantity')), [(movement.date, 4)])
+        self.assertEqual(pending_count(), 0)
+
+
+class InventoryMatrixTests(LedgerTestCase):
+    def test_grid_covers_every_base_and_asset_type(self):
+        other = AssetType.objects.create(name='Mortar')
+        self.purchase(self.bases[0], 7)
+        self.purchase(self.bases[1], 2, asset=other)
+        data = self.client.get('/api/v1/inventory/matrix/').data
+        self.assertEqual([b['id'] for b in data['bases']], [b.id for b in self.bases])
+        self.assertEqual([a['id'] for a in data['assetTypes']], [self.asset.id, other.id])
+        self.assertEqual(data['quantities'], [[7, 0], [0, 2], [0, 0]])
+
+
+class BootTests(TestCase):
+    databases = '__all__'
+
+    def test_steps_run_under_the_advisory_lock(self):
+        # As on PostgreSQL: the lock is taken before the recorded steps are
+        # read and released once every step has run
+        events = []
+        lock = mock.MagicMock(vendor='postgresql')
+        lock.cursor.return_value.__enter__.return_value.execute.side_effect = (
+            lambda sql, params: events.append(sql.split()[1].split('(')[0])
+        )
+        with mock.patch.object(boot.connections, 'create_connection', return_value=lock), \
+                mock.patch.object(boot, 'recorded', side_effect=lambda: events.append('recorded') or {}), \
+                mock.patch.object(boot, 'call_command', side_effect=lambda *args, **kwargs: events.append(args[0])):
+            boot.run()
+        self.assertEqual(events, [
+            'pg_advisory_lock', 'recorded', 'migrate', 'seed_admin', 'seed_data', 'pg_advisory_unlock',
+        ])
+        lock.close.assert_called_once()
+
+
+@skipIf(sharding_enabled(), 'import_transactions refuses to run against shards')
+class ImporterTests(LedgerTestCase):
+    HEADER = 'type,asset_type,quantity,date,from_base,to_base,recipient,performed_by\n'
+
+    def write(self, lines):
+        f = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False)
+        f.write(self.HEADER + ''.join(line + '\n' for line in lines))
+        f.close()
+        self.addCleanup(os.unlink, f.name)
+        return f.name
+
+    def records(self, n):
+        return [f'PURCHASE,Rifle,2,2024-01-{1 + i % 28:02d}T10:00:00,,Base 1,,admin' for i in range(n)]
+
+    def command(self, path, **options):
+        call_command('import_transactions', path, stdout=StringIO(), stderr=StringIO(), **options)
+
+    def test_import_updates_ledger_inventory_and_buckets(self):
+        path = self.write(self.records(9) + ['EXPENDITURE,Rifle,5,2024-02-01T10:00:00,Base 1,,,admin'])
+        self.command(path, chunk=4)
+        self.assertEqual(Transaction.objects.count(), 10)
+        self.assertEqual(self.stock(self.bases[0]), 13)
+        totals = DailyMovement.objects.aggregate(p=Sum('purchases'), e=Sum('expended'))
+        self.assertEqual((totals['p'], totals['e']), (18, 5))
+        self.assertEqual(ImportCheckpoint.objects.get().offset, 10)
+
+    def test_rerun_after_a_crash_imports_nothing_twice(self):
+        path = self.write(self.records(10))
+        from .importer import merge_chunk
+        calls = []
+
+        def crash_after_second_chunk(rows, progress=None):
+            merge_chunk(rows, progress)
+            calls.append(1)
+            if len(calls) == 2:
+                raise RuntimeError('killed')
+
+        with mock.patch('core.management.commands.import_transactions.merge_chunk', crash_after_second_chunk):
+            with self.assertRaises(RuntimeError):
+                self.command(path, chunk=3)
+        self.assertEqual(self.stock(self.bases[0]), 12)
+        self.command(path, chunk=3)
+        self.command(path, chunk=3)
+        self.assertEqual(Transaction.objects.count(), 10)
+        self.assertEqual(self.stock(self.bases[0]), 20)
+        with self.assertRaises(CommandError):
+            self.command(path, offset=1)
+
+    def test_invalid_chunk_is_not_imported(self):
+        path = self.write(self.records(2) + ['PURCHASE,Unknown,1,2024-01-01T10:00:00,,Base 1,,admin'])
+        with self.assertRaises(CommandError):
+            self.command(path)
+        self.assertFalse(Transaction.objects.exists())
+        self.command(path, skip_invalid=True)
+        self.assertEqual(self.stock(self.bases[0]), 4)
+
+
+class ShardedTransferTests(LedgerTestCase):
+    # The outbox path that carries transfers between shards. Without
+    # SHARD_DATABASE_URLS both sides are default, which still exercises the
+    # relay and its exactly-once guard.
+    def send(self, quantity):
+        # As if the delivery right after commit had failed
+        movement = Movement(
+            type=Transaction.Type.TRANSFER, from_base=self.bases[0], to_base=self.bases[1], performed_by=self.admin,
+        )
+        with mock.patch('core.sharding.deliver', side_effect=DatabaseError):
+            transfer_document(movement, [(self.asset.id, quantity)])
+        return shard_for_base(self.bases[0].id)
+
+    def test_credit_follows_when_the_outbox_is_relayed(self):
+        self.purchase(self.bases[0], 10)
+        source = self.send(4)
+        self.assertEqual(self.stock(self.bases[0]), 6)
+        self.assertEqual(self.stock(self.bases[1]), 0)
+        self.assertEqual(relay_pending(), 1)
+        self.assertEqual(self.stock(self.bases[1]), 4)
+        with on_shard(shard_for_base(self.bases[1].id)):
+            self.assertTrue(Transaction.objects.filter(to_base=self.bases[1], mirror=True).exists())
+        self.assertEqual(relay_pending(), 0)
+        with on_shard(source):
+            self.assertFalse(ShardOutbox.objects.filter(delivered_at__isnull=True).exists())
+
+    def test_a_message_relayed_twice_is_applied_once(self):
+        self.purchase(self.bases[0], 10)
+        source = self.send(4)
+        with on_shard(source):
+            message = ShardOutbox.objects.get()
+        deliver(source, message.pk)
+        # A crash after the credit committed but before the outbox was marked
+        with on_shard(source):
+            ShardOutbox.objects.filter(pk=message.pk).update(delivered_at=None)
+        deliver(source, message.pk)
+        self.assertEqual(self.stock(self.bases[1]), 4)
+        with on_shard(message.destination):
+            self.assertEqual(ShardInbox.objects.count(), 1)
+
+    def test_movement_api_transfers_between_any_bases(self):
+        self.purchase(self.bases[0], 10)
+        self.assertEqual(self.transfer(3).status_code, 201)
+        self.assertEqual([self.stock(b) for b in self.bases[:2]], [7, 3])
+        response = self.client.get('/api/v1/transactions/?type=TRANSFER')
+        self.assertEqual(len(response.data['results']), 1)  # The mirror copy is not listed
+
+
+class CategoryRollupTests(LedgerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.arms = AssetCategory.objects.create(name='Arms')
+        self.rifles = AssetCategory.objects.create(name='Rifles', parent=self.arms)
+        self.asset.category = self.rifles
+        self.asset.save()
+
+    def rollup(self):
+        # {(base, category): (stock, purchases, transfer_in, transfer_out, expended)} on every shard
+        stock = dict(row for part in gather(lambda: [
+            ((b, c), q) for b, c, q in CategoryStock.objects.values_list('base_id', 'category_id', 'quantity')
+        ]) for row in part)
+        moved = {}
+        for part in gather(lambda: list(CategoryDailyMovement.objects.values_list(
+            'base_id', 'category_id', 'purchases', 'transfer_in', 'transfer_out', 'expended',
+        ))):
+            for b, c, *columns in part:
+                moved[(b, c)] = tuple(columns)
+        return {key: (stock.get(key, 0), *moved.get(key, (0, 0, 0, 0))) for key in stock.keys() | moved.keys()}
+
+    def test_writes_roll_up_to_every_ancestor(self):
+        base1, base2 = self.bases[0].id, self.bases[1].id
+        self.purchase(self.bases[0], 10)
+        self.transfer(4)
+        self.post(TRANSACTIONS, {
+            'type': 'EXPENDITURE', 'asset_type': self.asset.id, 'quantity': 1, 'from_base': base1,
+        })
+        self.purchase(self.bases[0], 5, asset=AssetType.objects.create(name='Ration'))  # Uncategorised
+        expected = {(base1, c): (5, 10, 0, 4, 1) for c in (self.arms.id, self.rifles.id)}
+        expected.update({(base2, c): (4, 0, 4, 0, 0) for c in (self.arms.id, self.rifles.id)})
+        self.assertEqual(self.rollup(), expected)
+
+    def test_moving_a_category_regroups_its_rollups(self):
+        self.purchase(self.bases[0], 6)
+        kit = AssetCategory.objects.create(name='Kit')
+        response = self.client.patch(f'/api/v1/categories/{self.rifles.id}/', {'parent': kit.id}, format='json')
+        self.assertEqual(response.status_code, 200)
+        base1 = self.bases[0].id
+        rollup = {key: value for key, value in self.rollup().items() if value[0]}
+        self.assertEqual(rollup, {(base1, self.rifles.id): (6, 6, 0, 0, 0), (base1, kit.id): (6, 6, 0, 0, 0)})
+
+    def test_recategorising_an_asset_type_moves_its_stock(self):
+        self.purchase(self.bases[0], 3)
+        optics = AssetCategory.objects.create(name='Optics')
+        self.asset.category = optics
+        self.asset.save()
+        rollup = {key: value for key, value in self.rollup().items() if value[0]}
+        self.assertEqual(rollup, {(self.bases[0].id, optics.id): (3, 3, 0, 0, 0)})
+
+
+class ShardedReadTests(LedgerTestCase):
+    # Reports read every shard and count each cross-shard transfer once
+    def setUp(self):
+        super().setUp()
+        self.purchase(self.bases[0], 10)
+        self.purchase(self.bases[1], 5)
+        self.transfer(4)
+        self.post(TRANSACTIONS, {
+            'type': 'EXPENDITURE', 'asset_type': self.asset.id, 'quantity': 2, 'from_base': self.bases[0].id,
+        })
+
+    def test_forecast_covers_every_shard(self):
+        from .analytics import forecast
+
+        data = forecast(days=7)
+        stock = dict(zip(data['base'].tolist(), data['quantity'].tolist()))
+        self.assertEqual(stock, {self.bases[0].id: 4, self.bases[1].id: 9})
+        burn = dict(zip(data['base'].tolist(), data['forecast'].tolist()))
+        self.assertGreater(burn[self.bases[0].id], 0)
+        self.assertEqual(burn[self.bases[1].id], 0)
+
+    def test_export_lists_each_transaction_once(self):
+        import csv
+
+        job = run_job(enqueue('export_transactions'))
+        self.assertEqual(job.result, {'rows': 4})
+        with open(job.artifact, newline='') as f:
+            types = [row['type'] for row in csv.DictReader(f)]
+        self.assertEqual(types, ['EXPENDITURE', 'TRANSFER', 'PURCHASE', 'PURCHASE'])
+
+    def test_backfill_rebuilds_each_shards_buckets(self):
+        from .timeseries import backfill
+
+        def totals():
+            return sorted(row for part in gather(lambda: list(
+                DailyMovement.objects.values('base_id').order_by('base_id').annotate(
+                    purchases=Sum('purchases'), transfer_in=Sum('transfer_in'),
+                    transfer_out=Sum('transfer_out'), expended=Sum('expended'),
+                ).values_list('base_id', 'purchases', 'transfer_in', 'transfer_out', 'expended')
+            )) for row in part)
+
+        live = totals()
+        self.assertEqual(live, [(self.bases[0].id, 10, 0, 4, 2), (self.bases[1].id, 5, 4, 0, 0)])
+        self.assertEqual(sum(gather(backfill)), 2)
+        self.assertEqual(totals(), live)
+
+
+@override_settings(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_QUEUE=1, PASSWORD_HASH_WAIT=0)
+class PasswordHashPoolTests(TestCase):
+    # Users are copied to the shards when sharding is configured
+    databases = '__all__'
+
+    def fill(self):
+        # Take every slot, as a burst of logins in flight would
+        _, slots = hash_pool()
+        for _ in range(2):
+            slots.acquire()
+        self.addCleanup(lambda: [slots.release() for _ in range(2)])
+
+    def test_hashes_match_djangos_pbkdf2(self):
+        encoded = make_password('s3cret-pass')
+        self.assertTrue(encoded.startswith('pbkdf2_sha256$'))
+        self.assertTrue(PBKDF2PasswordHasher().verify('s3cret-pass', encoded))
+        self.assertTrue(check_password('s3cret-pass', PBKDF2PasswordHasher().encode('s3cret-pass', 'somesalt')))
+
+    def test_full_pool_sheds_instead_of_queueing(self):
+        User.objects.create_user('pilot', password='s3cret-pass')
+        self.fill()
+        with self.assertRaises(HashPoolBusy):
+            make_password('s3cret-pass')
+        response = APIClient().post('/api/v1/auth/login/', {'username': 'pilot', 'password': 's3cret-pass'})
+        self.assertEqual(response.status_code, 503)
 
-# Create your tests here.
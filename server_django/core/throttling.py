@@ -0,0 +1,97 @@
+import random
+
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from .localstore import local_store
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Token bucket throttle backed by the host-wide local store, so a budget
+    holds across all gunicorn workers. Rates use DRF's 'N/period' syntax:
+    the bucket holds N tokens (the burst) and refills at N per period.
+    """
+    scope = None
+
+    def __init__(self):
+        self.wait_seconds = None
+
+    def get_rate(self, view):
+        return api_settings.DEFAULT_THROTTLE_RATES.get(self.get_scope(view))
+
+    def get_scope(self, view):
+        return self.scope
+
+    def get_cache_key(self, request, view):
+        raise NotImplementedError('.get_cache_key() must be overridden')
+
+    def parse_rate(self, rate):
+        num, period = rate.split('/')
+        return int(num), int(num) / PERIODS[period[0]]
+
+    def buckets(self, request, view):
+        # [(key, rate)] this request draws a token from
+        rate = self.get_rate(view)
+        key = self.get_cache_key(request, view) if rate else None
+        return [(key, rate)] if key else []
+
+    def allow_request(self, request, view):
+        buckets = [(key, *self.parse_rate(rate)) for key, rate in self.buckets(request, view)]
+        if not buckets:
+            return True
+        allowed, self.wait_seconds = local_store.take_tokens(buckets)
+        # Occasionally sweep idle buckets so the store stays small
+        if random.random() < 0.001:
+            local_store.purge()
+        return allowed
+
+    def wait(self):
+        return self.wait_seconds
+
+    def ident_key(self, request):
+        if request.user and request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        return f'ip:{self.get_ident(request)}'
+
+
+class AnonBucketThrottle(TokenBucketThrottle):
+    # Per-IP budget for unauthenticated requests
+    scope = 'anon'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return None
+        return f'throttle:anon:{self.get_ident(request)}'
+
+
+class UserBucketThrottle(TokenBucketThrottle):
+    # Per-user budget across all endpoints
+    scope = 'user'
+
+    def get_cache_key(self, request, view):
+        if not (request.user and request.user.is_authenticated):
+            return None
+        return f'throttle:user:{request.user.pk}'
+
+
+class ScopedBucketThrottle(TokenBucketThrottle):
+    # Separate budget for views that set `throttle_scope`, keyed per user or IP
+    def get_scope(self, view):
+        return getattr(view, 'throttle_scope', None)
+
+    def get_cache_key(self, request, view):
+        return f'throttle:{self.get_scope(view)}:{self.ident_key(request)}'
+
+
+class RequestBucketThrottle(TokenBucketThrottle):
+    """
+    The anon or user budget plus the view's scoped budget, drawn together
+    in one local store transaction instead of one per throttle class.
+    """
+    parts = (AnonBucketThrottle, UserBucketThrottle, ScopedBucketThrottle)
+
+    def buckets(self, request, view):
+        return [bucket for part in self.parts for bucket in part().buckets(request, view)]
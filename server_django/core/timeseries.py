@@ -0,0 +1,161 @@
+from datetime import date, timedelta
+
+from django.db import IntegrityError, router, transaction as db_transaction
+from django.db.models import Sum, Case, When, F, Q
+from django.db.models.functions import TruncDate, TruncDay, TruncWeek, TruncMonth
+from django.utils import timezone
+
+from .models import Transaction, DailyMovement
+from .reconciliation import INCOMING, OUTGOING
+from .sharding import owns
+
+COLUMNS = ['purchases', 'transfer_in', 'transfer_out', 'assigned', 'expended']
+TRUNC = {'day': TruncDay, 'week': TruncWeek, 'month': TruncMonth}
+
+
+def movement_legs(tx):
+    # (base, column, quantity) for each side of a transaction that moves stock
+    T = Transaction.Type
+    if tx.type == T.PURCHASE and tx.to_base_id:
+        return [(tx.to_base_id, 'purchases', tx.quantity)]
+    if tx.type == T.TRANSFER and tx.from_base_id and tx.to_base_id:
+        return [(tx.from_base_id, 'transfer_out', tx.quantity), (tx.to_base_id, 'transfer_in', tx.quantity)]
+    if tx.type == T.ASSIGNMENT and tx.from_base_id:
+        return [(tx.from_base_id, 'assigned', tx.quantity)]
+    if tx.type == T.EXPENDITURE and tx.from_base_id:
+        return [(tx.from_base_id, 'expended', tx.quantity)]
+    return []
+
+
+def record_movement(tx):
+    # Called inside the write transaction, next to the Inventory update
+    day = timezone.localdate(tx.date)
+    for base_id, column, qty in movement_legs(tx):
+        bucket = DailyMovement.objects.filter(base_id=base_id, asset_type_id=tx.asset_type_id, day=day)
+        if bucket.update(**{column: F(column) + qty}):
+            continue
+        try:
+            with db_transaction.atomic(using=router.db_for_write(DailyMovement)):
+                DailyMovement.objects.create(base_id=base_id, asset_type_id=tx.asset_type_id, day=day, **{column: qty})
+        except IntegrityError:
+            # Another writer created the bucket first
+            bucket.update(**{column: F(column) + qty})
+
+
+def backfill(since=None):
+    """
+    Rebuild DailyMovement from the ledger (optionally only from `since`),
+    with one grouped query per direction. Sharded, this rebuilds the shard
+    in scope; its ledger also holds the far leg of cross-shard transfers,
+    whose bucket belongs to the other shard and is skipped here.
+    """
+    tx_qs = Transaction.objects.all()
+    buckets = DailyMovement.objects.all()
+    if since:
+        tx_qs = tx_qs.filter(date__date__gte=since)
+        buckets = buckets.filter(day__gte=since)
+
+    T = Transaction.Type
+
+    def total(**cond):
+        return Sum(Case(When(Q(**cond), then='quantity'), default=0))
+
+    rows = {}
+    incoming = (
+        tx_qs.filter(INCOMING).order_by()
+        .annotate(day=TruncDate('date'))
+        .values('to_base_id', 'asset_type_id', 'day')
+        .annotate(purchases=total(type=T.PURCHASE), transfer_in=total(type=T.TRANSFER))
+    )
+    for r in incoming:
+        if not owns(r['to_base_id']):
+            continue
+        row = rows.setdefault((r['to_base_id'], r['asset_type_id'], r['day']), dict.fromkeys(COLUMNS, 0))
+        row['purchases'] += r['purchases']
+        row['transfer_in'] += r['transfer_in']
+    outgoing = (
+        tx_qs.filter(OUTGOING).order_by()
+        .annotate(day=TruncDate('date'))
+        .values('from_base_id', 'asset_type_id', 'day')
+        .annotate(
+            transfer_out=total(type=T.TRANSFER),
+            assigned=total(type=T.ASSIGNMENT),
+            expended=total(type=T.EXPENDITURE),
+        )
+    )
+    for r in outgoing:
+        if not owns(r['from_base_id']):
+            continue
+        row = rows.setdefault((r['from_base_id'], r['asset_type_id'], r['day']), dict.fromkeys(COLUMNS, 0))
+        row['transfer_out'] += r['transfer_out']
+        row['assigned'] += r['assigned']
+        row['expended'] += r['expended']
+
+    with db_transaction.atomic(using=router.db_for_write(DailyMovement)):
+        buckets.delete()
+        DailyMovement.objects.bulk_create(
+            [DailyMovement(base_id=b, asset_type_id=a, day=d, **cols) for (b, a, d), cols in rows.items()],
+            batch_size=5000,
+        )
+    return len(rows)
+
+
+def _periods(start, end, granularity):
+    if granularity == 'day':
+        step = start
+        while step <= end:
+            yield step
+            step += timedelta(days=1)
+    elif granularity == 'week':
+        step = start - timedelta(days=start.weekday())
+        while step <= end:
+            yield step
+            step += timedelta(weeks=1)
+    else:
+        step = start.replace(day=1)
+        while step <= end:
+            yield step
+            step = (step + timedelta(days=32)).replace(day=1)
+
+
+def movement_series(buckets, start, end, granularity='day'):
+    """
+    Sum DailyMovement rows into day/week/month periods and return them as
+    column arrays, with empty periods filled with zeros.
+    """
+    rows = (
+        buckets.filter(day__gte=start, day__lte=end).order_by()
+        .annotate(period=TRUNC[granularity]('day'))
+        .values('period')
+        .annotate(**{c: Sum(c) for c in COLUMNS})
+    )
+    by_period = {}
+    for r in rows:
+        period = r['period']
+        if hasattr(period, 'date'):
+            period = period.date()
+        by_period[period] = r
+
+    periods = list(_periods(start, end, granularity))
+    series = {'granularity': granularity, 'periods': [p.isoformat() for p in periods]}
+    for c in COLUMNS:
+        series[c] = [by_period[p][c] if p in by_period else 0 for p in periods]
+    return series
+
+
+# Longest range one series request may cover, in days, per granularity
+MAX_SPAN = {'day': 731, 'week': 5 * 366, 'month': 20 * 366}
+
+
+def parse_range(start, end, granularity='day', default_days=90):
+    # ValueError, with a message for the client, if malformed or too long
+    try:
+        end = date.fromisoformat(end) if end else timezone.localdate()
+        start = date.fromisoformat(start) if start else end - timedelta(days=default_days)
+    except ValueError:
+        raise ValueError("start/end must be YYYY-MM-DD")
+    if start > end:
+        raise ValueError("start must not be after end")
+    if (end - start).days > MAX_SPAN[granularity]:
+        raise ValueError(f"A {granularity} series covers at most {MAX_SPAN[granularity]} days")
+    return start, end
@@ -1,12 +1,17 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
-from .views import RegisterView, BaseViewSet, AssetTypeViewSet, TransactionViewSet, DashboardView, CustomTokenObtainPairView, PublicUserListView
+from .views import RegisterView, BaseViewSet, AssetTypeViewSet, AssetCategoryViewSet, TransactionViewSet, MovementViewSet, DashboardView, CustomTokenObtainPairView, PublicUserListView, JobViewSet, MovementSeriesView, ForecastView, RebalanceView, RebalanceCommitView, StockThresholdViewSet, SerialItemViewSet, StockAlertListView, InventoryMatrixView, BaseMetricsView, SearchView, ExpenditureIngestView
 
 router = DefaultRouter()
 router.register(r'bases', BaseViewSet)
 router.register(r'assets', AssetTypeViewSet)
+router.register(r'categories', AssetCategoryViewSet)
 router.register(r'transactions', TransactionViewSet, basename='transaction')
+router.register(r'movements', MovementViewSet, basename='movement')
+router.register(r'jobs', JobViewSet, basename='job')
+router.register(r'thresholds', StockThresholdViewSet, basename='threshold')
+router.register(r'serials', SerialItemViewSet, basename='serial')
 
 urlpatterns = [
     path('auth/register/', RegisterView.as_view(), name='register'),
@@ -14,5 +19,14 @@ urlpatterns = [
     path('auth/public-users/', PublicUserListView.as_view(), name='public_users'),
     path('auth/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('dashboard/metrics/', DashboardView.as_view(), name='dashboard_metrics'),
+    path('dashboard/bases/', BaseMetricsView.as_view(), name='dashboard_bases'),
+    path('dashboard/movements/', MovementSeriesView.as_view(), name='dashboard_movements'),
+    path('dashboard/forecast/', ForecastView.as_view(), name='dashboard_forecast'),
+    path('inventory/matrix/', InventoryMatrixView.as_view(), name='inventory_matrix'),
+    path('search/', SearchView.as_view(), name='search'),
+    path('expenditures/ingest/', ExpenditureIngestView.as_view(), name='expenditure_ingest'),
+    path('alerts/', StockAlertListView.as_view(), name='alerts'),
+    path('rebalance/', RebalanceView.as_view(), name='rebalance'),
+    path('rebalance/commit/', RebalanceCommitView.as_view(), name='rebalance_commit'),
     path('', include(router.urls)),
 ]
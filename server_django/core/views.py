@@ -1,20 +1,36 @@
-from rest_framework import viewsets, status, generics
+from rest_framework import viewsets, status, generics, mixins
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.decorators import action
-from django.db.models import Sum, F
-from .models import Base, AssetType, Transaction, Inventory, User
-from .serializers import BaseSerializer, AssetTypeSerializer, TransactionSerializer, UserSerializer, InventorySerializer, CustomTokenObtainPairSerializer
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
+from django.db.models import Sum, F, Q
+from django.db.models.functions import Coalesce
+from .models import Base, AssetType, AssetCategory, CategoryStock, CategoryDailyMovement, Transaction, Movement, Inventory, User, Job, DailyMovement, StockThreshold, StockAlert, SerialItem
+from .serializers import BaseSerializer, AssetTypeSerializer, AssetCategorySerializer, TransactionSerializer, MovementSerializer, UserSerializer, InventorySerializer, CustomTokenObtainPairSerializer, JobSerializer, StockThresholdSerializer, StockAlertSerializer, SerialItemSerializer, SerialRegistrationSerializer, ExpenditureEventSerializer
 from .permissions import IsAdmin, IsCommander, IsLogistics
+from .cache import get_or_build, single_flight
+from .hashers import HashPoolBusy
+from .idempotency import IdempotentCreateMixin
+from .alerts import check_thresholds, evaluate_threshold
+from .timeseries import record_movement, movement_series, parse_range, TRUNC, COLUMNS
+from .movements import post_movement
+from .serials import move_serials, register as register_serials, mismatches as serial_mismatches
+from .categories import roll_up_transaction, category_map, asset_types_in
+from .ingest import stage as stage_expenditures, pending_expenditures, oldest_pending_age
+from .sharding import enabled as sharding_enabled, on_shard, gather, Gathered, shard_for_base, shard_for_pk, home_shard, transfer_across, transfer_document
 from rest_framework_simplejwt.views import TokenObtainPairView
 
 class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
+    throttle_scope = 'auth'
 
     def post(self, request, *args, **kwargs):
         try:
             return super().post(request, *args, **kwargs)
+        except HashPoolBusy:
+            raise  # 503: the client should retry, not fix its request
         except Exception as e:
             import traceback
             error_details = traceback.format_exc()
@@ -25,6 +41,7 @@ class RegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [AllowAny]
+    throttle_scope = 'auth'
 
     def create(self, request, *args, **kwargs):
         # Allow creating users with minimal logic for demo
@@ -39,11 +56,26 @@ class RegisterView(generics.CreateAPIView):
         user = User.objects.create_user(username=username, password=password, role=role, base_id=base_id)
         return Response(UserSerializer(user).data, status=status.HTTP_201_CREATED)
 
-class PublicUserListView(generics.ListAPIView):
-    queryset = User.objects.filter(is_active=True).order_by('role') # Sort for consistency
+def public_users():
     from .serializers import PublicUserSerializer
-    serializer_class = PublicUserSerializer
+    qs = User.objects.filter(is_active=True).select_related('base').order_by('role') # Sort for consistency
+    return PublicUserSerializer(qs, many=True).data
+
+def flight_key(name, request):
+    # Requests with the same role, base and query string get the same response
+    user = request.user
+    base = '*' if user.role == User.Role.ADMIN else user.base_id
+    query = '&'.join(sorted(request.query_params.urlencode().split('&')))
+    return f'{name}:{user.role}:{base}:{query}'
+
+class PublicUserListView(generics.ListAPIView):
     permission_classes = [AllowAny]
+    throttle_scope = 'auth'
+
+    def list(self, request, *args, **kwargs):
+        # Versioned cache, bumped by core.signals whenever a user or base changes;
+        # warmed before workers fork (core/boot.py)
+        return Response(get_or_build('public_users', public_users))
 
 class BaseViewSet(viewsets.ModelViewSet):
     queryset = Base.objects.all()
@@ -55,57 +87,369 @@ class AssetTypeViewSet(viewsets.ModelViewSet):
     serializer_class = AssetTypeSerializer
     permission_classes = [IsAuthenticated]
 
-class TransactionViewSet(viewsets.ModelViewSet):
+class AssetCategoryViewSet(viewsets.ModelViewSet):
+    # Category tree; the parent links are all a client needs to draw it
+    queryset = AssetCategory.objects.all().order_by('id')
+    serializer_class = AssetCategorySerializer
+    permission_classes = [IsAuthenticated]
+
+def id_param(params, name):
+    # Optional ?<name>=<id> filter; ValueError if malformed
+    return int(params[name]) if params.get(name) else None
+
+def category_param(params):
+    # ?category=<id> on the dashboard, inventory and series endpoints
+    return id_param(params, 'category')
+
+def id_filters(params, *names):
+    # id_param for list views, where a malformed filter is a 400
+    values = []
+    for name in names:
+        try:
+            values.append(id_param(params, name))
+        except ValueError:
+            raise ValidationError({name: "Must be an id"})
+    return values
+
+def type_filter(params, qs):
+    # ?type=PURCHASE etc. on the ledger lists
+    kind = params.get('type')
+    if not kind:
+        return qs
+    if kind not in Transaction.Type.values:
+        raise ValidationError({"type": f"Must be one of {', '.join(Transaction.Type.values)}"})
+    return qs.filter(type=kind)
+
+def visible_to(user, qs):
+    # Role scoping shared by ledger lines and movement documents
+    if user.role == User.Role.ADMIN:
+        return qs
+    if user.role == User.Role.COMMANDER:
+        return qs.filter(from_base=user.base) | qs.filter(to_base=user.base)
+    if user.role == User.Role.LOGISTICS:
+        # Logistics: Only base-related, AND only Purchase/Transfer
+        base_qs = qs.filter(from_base=user.base) | qs.filter(to_base=user.base)
+        return base_qs.filter(type__in=[Transaction.Type.PURCHASE, Transaction.Type.TRANSFER])
+    return qs.none()
+
+def transactions_visible_to(user):
+    return visible_to(user, Transaction.objects.all().order_by('-date'))
+
+def update_inventory(tx):
+    # Update Inventory based on tx type
+    # 1. Helper to update quantity
+    def update_qty(base, asset_type, qty):
+        inv, created = Inventory.objects.get_or_create(base=base, asset_type=asset_type)
+        inv.quantity = F('quantity') + qty
+        inv.save()
+        inv.refresh_from_db()
+        check_thresholds(inv.base_id, inv.asset_type_id, inv.quantity - qty, inv.quantity)
+
+    if tx.type == Transaction.Type.PURCHASE:
+        if tx.to_base:
+            update_qty(tx.to_base, tx.asset_type, tx.quantity)
+            
+    elif tx.type in [Transaction.Type.TRANSFER]:
+        if tx.from_base and tx.to_base:
+            update_qty(tx.from_base, tx.asset_type, -tx.quantity)
+            update_qty(tx.to_base, tx.asset_type, tx.quantity)
+            
+    elif tx.type in [Transaction.Type.ASSIGNMENT, Transaction.Type.EXPENDITURE]:
+        if tx.from_base:
+            update_qty(tx.from_base, tx.asset_type, -tx.quantity)
+
+class ShardedLedgerMixin:
+    def shard(self):
+        # Sharded mode: base users read their base's shard, admins reach a
+        # single row through its id (list() gathers from every shard)
+        if not sharding_enabled():
+            return None
+        user = self.request.user
+        if user.role != User.Role.ADMIN:
+            return shard_for_base(user.base_id) if user.base_id else None
+        pk = str(self.kwargs.get('pk', ''))
+        return shard_for_pk(int(pk)) if pk.isdigit() else None
+
+    def gathered(self, queryset):
+        # Admin list across every shard, one cursor page at a time; `queryset`
+        # skips mirror copies
+        page = self.paginate_queryset(Gathered(queryset))
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+class LedgerCursorPagination(CursorPagination):
+    # Newest first; ?cursor= from next/previous, ?page_size= up to 1000
+    ordering = ('-date', '-id')
+    page_size = 100
+    max_page_size = 1000
+    page_size_query_param = 'page_size'
+
+class TransactionViewSet(ShardedLedgerMixin, IdempotentCreateMixin, viewsets.ModelViewSet):
     serializer_class = TransactionSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = LedgerCursorPagination
 
     def get_queryset(self):
-        user = self.request.user
-        qs = Transaction.objects.all().order_by('-date')
-        if user.role == User.Role.ADMIN:
-            return qs
-        if user.role == User.Role.COMMANDER:
-            return qs.filter(from_base=user.base) | qs.filter(to_base=user.base)
-        if user.role == User.Role.LOGISTICS:
-            # Logistics: Only base-related, AND only Purchase/Transfer
-            base_qs = qs.filter(from_base=user.base) | qs.filter(to_base=user.base)
-            return base_qs.filter(type__in=[Transaction.Type.PURCHASE, Transaction.Type.TRANSFER])
-        return qs.none()
+        qs = transactions_visible_to(self.request.user).select_related(
+            'asset_type', 'from_base', 'to_base', 'performed_by'
+        )
+        qs = type_filter(self.request.query_params, qs)
+        alias = self.shard()
+        return qs.using(alias) if alias else qs
+
+    def list(self, request, *args, **kwargs):
+        if not (sharding_enabled() and request.user.role == User.Role.ADMIN):
+            return super().list(request, *args, **kwargs)
+        return self.gathered(lambda: self.get_queryset().filter(mirror=False))
 
     def perform_create(self, serializer):
         from django.db import transaction as db_transaction
+        data = serializer.validated_data
+        from_base, to_base = data.get('from_base'), data.get('to_base')
+        alias = 'default'
+        if sharding_enabled() and (from_base or to_base):
+            alias = home_shard(from_base and from_base.id, to_base and to_base.id)
+            if data['type'] == Transaction.Type.TRANSFER and from_base and to_base \
+                    and shard_for_base(to_base.id) != alias:
+                serials = data.pop('serials', None)
+                serializer.instance = transfer_across(data, self.request.user)
+                if serials:
+                    move_serials(serializer.instance, serializer.instance.asset_type_id, serials)
+                return
         # Core Logic: Validate & Update Inventory
-        with db_transaction.atomic():
-            tx = serializer.save(performed_by=self.request.user)
+        with on_shard(alias), db_transaction.atomic(using=alias):
+            # Single-line document; multi-line ones go through MovementViewSet
+            movement = Movement.objects.create(
+                type=data['type'], from_base=data.get('from_base'), to_base=data.get('to_base'),
+                recipient=data.get('recipient'), performed_by=self.request.user
+            )
+            serials = serializer.validated_data.pop('serials', None)
+            tx = serializer.save(performed_by=self.request.user, movement=movement)
             self._update_inventory(tx)
+            record_movement(tx)
+            roll_up_transaction(tx)
+            if serials:
+                move_serials(tx, tx.asset_type_id, serials)
 
     def _update_inventory(self, tx):
-        # Update Inventory based on tx type
-        # 1. Helper to update quantity
-        def update_qty(base, asset_type, qty):
-            inv, created = Inventory.objects.get_or_create(base=base, asset_type=asset_type)
-            inv.quantity = F('quantity') + qty
-            inv.save()
-            inv.refresh_from_db()
-
-        if tx.type == Transaction.Type.PURCHASE:
-            if tx.to_base:
-                update_qty(tx.to_base, tx.asset_type, tx.quantity)
-                
-        elif tx.type in [Transaction.Type.TRANSFER]:
-            if tx.from_base and tx.to_base:
-                update_qty(tx.from_base, tx.asset_type, -tx.quantity)
-                update_qty(tx.to_base, tx.asset_type, tx.quantity)
-                
-        elif tx.type in [Transaction.Type.ASSIGNMENT, Transaction.Type.EXPENDITURE]:
-            if tx.from_base:
-                update_qty(tx.from_base, tx.asset_type, -tx.quantity)
+        update_inventory(tx)
+
+class MovementViewSet(ShardedLedgerMixin, IdempotentCreateMixin, mixins.CreateModelMixin, mixins.ListModelMixin,
+                      mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    # Movement documents with nested lines; inventory is applied per document
+    serializer_class = MovementSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = LedgerCursorPagination
+
+    def get_queryset(self):
+        from django.db.models import Prefetch
+        qs = Movement.objects.select_related('from_base', 'to_base', 'performed_by').prefetch_related(
+            Prefetch('lines', queryset=Transaction.objects.select_related('asset_type').order_by('id'))
+        ).order_by('-date')
+        qs = type_filter(self.request.query_params, visible_to(self.request.user, qs))
+        alias = self.shard()
+        return qs.using(alias) if alias else qs
+
+    def list(self, request, *args, **kwargs):
+        if not (sharding_enabled() and request.user.role == User.Role.ADMIN):
+            return super().list(request, *args, **kwargs)
+        return self.gathered(lambda: self.get_queryset().exclude(lines__mirror=True))
+
+    def perform_create(self, serializer):
+        from django.db import transaction as db_transaction
+        data = serializer.validated_data
+        from_base, to_base = data.get('from_base'), data.get('to_base')
+        alias = home_shard(from_base and from_base.id, to_base and to_base.id)
+        # Serials and alerts stay on default; its transaction wraps the
+        # shard's so a rejected serial undoes the whole document
+        if data['type'] == Transaction.Type.TRANSFER and shard_for_base(to_base.id) != alias:
+            lines = data.pop('lines')
+            movement = Movement(performed_by=self.request.user, **data)
+            with db_transaction.atomic():
+                for line in lines:
+                    if line.get('serials'):
+                        move_serials(movement, line['asset_type'].id, line['serials'])
+                transfer_document(movement, [(line['asset_type'].id, line['quantity']) for line in lines])
+            serializer.instance = movement
+            return
+        with db_transaction.atomic(), on_shard(alias), db_transaction.atomic(using=alias):
+            serializer.save()
+
+class SerialCursorPagination(CursorPagination):
+    ordering = 'id'
+    page_size = 100
+    max_page_size = 1000
+    page_size_query_param = 'page_size'
+
+class SerialItemViewSet(viewsets.ReadOnlyModelViewSet):
+    # Per-unit lookups: /serials/<serial>/ or ?base=&status=&asset_type=, cursor paginated
+    serializer_class = SerialItemSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = SerialCursorPagination
+    lookup_field = 'serial'
+
+    def get_queryset(self):
+        user = self.request.user
+        params = self.request.query_params
+        base, asset_type = id_filters(params, 'base', 'asset_type')
+        qs = SerialItem.objects.select_related('asset_type', 'base')
+        if user.role != User.Role.ADMIN:
+            qs = qs.filter(base=user.base)
+        elif base is not None:
+            qs = qs.filter(base_id=base)
+        if params.get('status'):
+            qs = qs.filter(status=params['status'])
+        if asset_type is not None:
+            qs = qs.filter(asset_type_id=asset_type)
+        return qs
+
+    @action(detail=False, methods=['post'])
+    def register(self, request):
+        # Bulk-tag units already counted in Inventory
+        serializer = SerialRegistrationSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        created = register_serials(data['asset_type'].id, data['base'].id, data['serials'])
+        return Response({"registered": created}, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated, IsAdmin])
+    def consistency(self, request):
+        rows = serial_mismatches()
+        return Response({"consistent": not rows, "mismatches": rows})
+
+class StockThresholdViewSet(viewsets.ModelViewSet):
+    serializer_class = StockThresholdSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        qs = StockThreshold.objects.all().order_by('base', 'asset_type')
+        user = self.request.user
+        if user.role != User.Role.ADMIN:
+            qs = qs.filter(base=user.base)
+        return qs
+
+    def perform_create(self, serializer):
+        evaluate_threshold(serializer.save())
+
+    def perform_update(self, serializer):
+        evaluate_threshold(serializer.save())
+
+class StockAlertListView(generics.ListAPIView):
+    # Open alerts (or all with ?all=true), optionally for one base
+    serializer_class = StockAlertSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        user = self.request.user
+        [base] = id_filters(self.request.query_params, 'base')
+        qs = StockAlert.objects.select_related('base', 'asset_type').order_by('base', '-created_at')
+        if self.request.query_params.get('all') != 'true':
+            qs = qs.filter(resolved_at__isnull=True)
+        if user.role != User.Role.ADMIN:
+            return qs.filter(base=user.base)
+        if base is not None:
+            qs = qs.filter(base_id=base)
+        return qs
+
+class JobViewSet(mixins.CreateModelMixin, mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    # Queue heavy work (POST {"kind": ..., "payload": {...}}) and poll its status
+    serializer_class = JobSerializer
+    permission_classes = [IsAuthenticated]
+
+    @property
+    def throttle_scope(self):
+        # Queuing an export is expensive; polling for it is not
+        return 'expensive' if self.action == 'create' else None
+
+    def get_queryset(self):
+        qs = Job.objects.all().order_by('-created_at')
+        if self.request.user.role == User.Role.ADMIN:
+            return qs
+        return qs.filter(created_by=self.request.user)
+
+    @action(detail=True, methods=['get'])
+    def artifact(self, request, pk=None):
+        from django.http import FileResponse
+        import os
+        job = self.get_object()
+        if job.status != Job.Status.SUCCEEDED or not job.artifact or not os.path.exists(job.artifact):
+            return Response({"error": "No artifact available"}, status=status.HTTP_404_NOT_FOUND)
+        return FileResponse(open(job.artifact, 'rb'), as_attachment=True, filename=os.path.basename(job.artifact))
 
 class DashboardView(APIView):
     permission_classes = [IsAuthenticated]
+    throttle_scope = 'expensive'
 
     def get(self, request):
-        user = request.user
+        try:
+            category = category_param(request.query_params)
+        except ValueError:
+            return Response({"error": "category must be an id"}, status=status.HTTP_400_BAD_REQUEST)
+        # A briefing's worth of identical dashboard loads share one computation
+        return Response(single_flight(flight_key('dashboard', request), lambda: self.metrics(request.user, category)))
+
+    def metrics(self, user, category=None):
+        # Sharded mode: a base user's numbers all live on their base's shard;
+        # admin totals are summed over every shard, queried in parallel
+        flows = self.flows if category is None else self.category_flows
+        args = (user,) if category is None else (user, category)
+        if user.role != User.Role.ADMIN and user.base_id and sharding_enabled():
+            with on_shard(shard_for_base(user.base_id)):
+                parts = [flows(*args)]
+        else:
+            parts = gather(flows, *args)
+        closing_balance, purchases, expended, transfer_in, transfer_out = (
+            sum(p[k] for p in parts) for k in ('closing', 'purchases', 'expended', 'transfer_in', 'transfer_out')
+        )
+
+        # Expenditures staged by the bulk ingest path but not yet flushed
+        if user.role == User.Role.ADMIN:
+            staged = pending_expenditures()
+        else:
+            staged = pending_expenditures([user.base_id] if user.base_id else [])
+        if category is not None:
+            categories = category_map()
+            staged = {k: qty for k, qty in staged.items() if category in categories.get(k[1], ())}
+        closing_balance -= sum(staged.values())
+        expended += sum(staged.values())
+
+        # Transfers
+        if user.role == User.Role.ADMIN:
+            # For Admin, Transfers are internal movements, so net effect on "Total System Assets" is 0?
+            # Or should we count total volume moved?
+            # Let's assume Admin sees "System Total". Transfers don't change System Total.
+            # Purchases add to System. Expenditures remove from System.
+            net_movement = purchases - expended # Admin Net Movement
+        else:
+            # Net Movement (Balance Change excl Expenditure? Frontend logic seemed to exclude Expended from Net Movement popup)
+            # Frontend Logic: Net Movement = Purchases + Transfer In - Transfer Out.
+            # So we stick to that for the "Net Movement" card.
+            net_movement = purchases + transfer_in - transfer_out
+
+        # Opening Balance Calculation
+        # Closing = Opening + (Purchases + TransferIn - TransferOut) - Expended
+        # Closing = Opening + NetMovement - Expended
+        # Opening = Closing - NetMovement + Expended
+        opening_balance = closing_balance - net_movement + expended
+
+        # Recent Transactions List
+        recent = sorted((tx for p in parts for tx in p['recent']), key=lambda tx: tx.date, reverse=True)[:5]
+        recent_data = TransactionSerializer(recent, many=True).data
+        
+        return {
+            "metrics": {
+                "openingBalance": opening_balance,
+                "netMovement": net_movement,
+                "closingBalance": closing_balance,
+                "expended": expended,
+                "purchases": purchases,
+                "transferIn": transfer_in,
+                "transferOut": transfer_out
+            },
+            "transactions": recent_data
+        }
+
+    def flows(self, user):
+        # Stock and flow totals from the database the router points at
         
         # 1. Closing Balance (Current Inventory)
         inv_qs = Inventory.objects.all()
@@ -119,7 +463,8 @@ class DashboardView(APIView):
         
         # Filter QS based on role
         if user.role == User.Role.ADMIN:
-            relevant_tx = tx_qs
+            # Mirrors are the receiving shard's copy of a cross-shard transfer
+            relevant_tx = tx_qs.filter(mirror=False)
         elif user.base:
             # For Base users, we care about transactions involving their base
             relevant_tx = tx_qs.filter(from_base=user.base) | tx_qs.filter(to_base=user.base)
@@ -137,16 +482,8 @@ class DashboardView(APIView):
             type=Transaction.Type.EXPENDITURE
         ).aggregate(total=Sum('quantity'))['total'] or 0
 
-        # Transfers
-        if user.role == User.Role.ADMIN:
-            # For Admin, Transfers are internal movements, so net effect on "Total System Assets" is 0?
-            # Or should we count total volume moved?
-            # Let's assume Admin sees "System Total". Transfers don't change System Total.
-            # Purchases add to System. Expenditures remove from System.
-            transfer_in = 0
-            transfer_out = 0
-            net_movement = purchases - expended # Admin Net Movement
-        else:
+        transfer_in = transfer_out = 0
+        if user.role != User.Role.ADMIN:
             # Base View
             # Transfer In: To this base
             transfer_in = relevant_tx.filter(
@@ -160,33 +497,378 @@ class DashboardView(APIView):
                 from_base=user.base
             ).aggregate(total=Sum('quantity'))['total'] or 0
 
-            # Net Movement (Balance Change excl Expenditure? Frontend logic seemed to exclude Expended from Net Movement popup)
-            # Frontend Logic: Net Movement = Purchases + Transfer In - Transfer Out.
-            # So we stick to that for the "Net Movement" card.
-            net_movement = purchases + transfer_in - transfer_out
+        recent = relevant_tx.select_related('asset_type', 'from_base', 'to_base', 'performed_by')
+        return {
+            'closing': closing_balance, 'purchases': purchases, 'expended': expended,
+            'transfer_in': transfer_in, 'transfer_out': transfer_out,
+            'recent': list(recent.order_by('-date')[:5]),
+        }
 
-        # Opening Balance Calculation
-        # Closing = Opening + (Purchases + TransferIn - TransferOut) - Expended
-        # Closing = Opening + NetMovement - Expended
-        # Opening = Closing - NetMovement + Expended
-        opening_balance = closing_balance - net_movement + expended
+    def category_flows(self, user, category):
+        # flows() for one category subtree, read from the precomputed rollups
+        stock = CategoryStock.objects.filter(category_id=category)
+        buckets = CategoryDailyMovement.objects.filter(category_id=category)
+        recent = Transaction.objects.filter(asset_type__category__ancestor_links__ancestor_id=category)
+        if user.role == User.Role.ADMIN:
+            recent = recent.filter(mirror=False)
+        elif user.base:
+            stock = stock.filter(base=user.base)
+            buckets = buckets.filter(base=user.base)
+            recent = recent.filter(Q(from_base=user.base) | Q(to_base=user.base))
+        else:
+            stock, buckets, recent = stock.none(), buckets.none(), recent.none()
 
-        # Recent Transactions List
-        recent_data = TransactionSerializer(relevant_tx.order_by('-date')[:5], many=True).data
-        
+        totals = buckets.aggregate(**{c: Coalesce(Sum(c), 0) for c in COLUMNS})
+        base_view = user.role != User.Role.ADMIN
+        recent = recent.select_related('asset_type', 'from_base', 'to_base', 'performed_by')
+        return {
+            'closing': stock.aggregate(total=Sum('quantity'))['total'] or 0,
+            'purchases': totals['purchases'], 'expended': totals['expended'],
+            'transfer_in': totals['transfer_in'] if base_view else 0,
+            'transfer_out': totals['transfer_out'] if base_view else 0,
+            'recent': list(recent.order_by('-date')[:5]),
+        }
+
+class SearchView(APIView):
+    """
+    GET ?q=text[&kind=transactions|assets|bases][&limit=20][&offset=0]
+    Ranked matches on recipient, asset name/description and base
+    name/location. Without `kind`, returns the first page of each.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        from .search import search, FIELDS, MIN_LENGTH
+
+        params = request.query_params
+        term = params.get('q', '').strip()
+        if len(term) < MIN_LENGTH:
+            return Response({"error": f"q must be at least {MIN_LENGTH} characters"}, status=status.HTTP_400_BAD_REQUEST)
+        kinds = [params['kind']] if params.get('kind') else list(FIELDS)
+        if any(k not in FIELDS for k in kinds):
+            return Response({"error": "kind must be transactions, assets or bases"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(max(int(params.get('limit', 20)), 1), 100)
+            offset = min(max(int(params.get('offset', 0)), 0), 10000)
+        except ValueError:
+            return Response({"error": "limit and offset must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializers = {'transactions': TransactionSerializer, 'assets': AssetTypeSerializer, 'bases': BaseSerializer}
+        ledger = transactions_visible_to(request.user).select_related('asset_type', 'from_base', 'to_base', 'performed_by')
+        data = {"query": term}
+        for kind in kinds:
+            rows, more = search(term, kind, ledger, limit, offset)
+            data[kind] = {
+                "results": serializers[kind](rows, many=True).data,
+                "nextOffset": offset + limit if more else None,
+            }
+        return Response(data)
+
+class ExpenditureIngestView(IdempotentCreateMixin, APIView):
+    """
+    POST a list of expenditure events (or {"events": [...]}) to stage them
+    for a batched flush; they are acknowledged once durably stored. Numbers
+    from the dashboard and inventory matrix include staged events. GET
+    reports the backlog. An Idempotency-Key makes a whole batch safe to
+    retry, alongside the per-event event_id.
+    """
+    permission_classes = [IsAuthenticated]
+    throttle_scope = 'expensive'
+
+    def get(self, request):
+        from .ingest import pending_count
+        return Response({"pending": pending_count(), "oldestAgeSeconds": round(oldest_pending_age(), 3)})
+
+    def post(self, request):
+        return self.idempotent(request, lambda: self.stage(request))
+
+    def stage(self, request):
+        events = request.data.get('events') if isinstance(request.data, dict) else request.data
+        if not isinstance(events, list) or not events:
+            return Response({"error": "Send a non-empty list of events"}, status=status.HTTP_400_BAD_REQUEST)
+        from django.conf import settings
+        if len(events) > settings.EXPENDITURE_FLUSH_BATCH:
+            return Response(
+                {"error": f"At most {settings.EXPENDITURE_FLUSH_BATCH} events per request"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        serializer = ExpenditureEventSerializer(data=events, many=True, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        accepted = stage_expenditures(request.user, serializer.validated_data)
+        # Events whose event_id was already staged are retries, not new stock
+        return Response(
+            {"accepted": accepted, "duplicates": len(events) - accepted}, status=status.HTTP_202_ACCEPTED
+        )
+
+class InventoryMatrixView(APIView):
+    # Bases x asset_types stock grid; ?base=1,2&asset_type=3&category=4&layout=dense|sparse
+    permission_classes = [IsAuthenticated]
+    throttle_scope = 'expensive'
+
+    def get(self, request):
+        from .matrix import inventory_matrix
+
+        user = request.user
+        params = request.query_params
+        try:
+            base_ids = {int(b) for b in params['base'].split(',')} if params.get('base') else None
+            asset_ids = {int(a) for a in params['asset_type'].split(',')} if params.get('asset_type') else None
+            category = category_param(params)
+        except ValueError:
+            return Response({"error": "base and asset_type must be comma separated ids, category an id"}, status=status.HTTP_400_BAD_REQUEST)
+        # Not ?format=, which DRF reserves for picking a renderer
+        layout = params.get('layout', 'dense')
+        if layout not in ('dense', 'sparse'):
+            return Response({"error": "layout must be dense or sparse"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if user.role != User.Role.ADMIN:
+            base_ids = {user.base_id} if user.base_id else set()
+        if category is not None:
+            # Columns for every asset type under the category, found with one closure join
+            in_category = set(asset_types_in(category).values_list('id', flat=True))
+            asset_ids = in_category if asset_ids is None else asset_ids & in_category
+        return Response(single_flight(
+            flight_key('inventory_matrix', request), lambda: inventory_matrix(base_ids, asset_ids, layout),
+        ))
+
+class BaseMetricsView(APIView):
+    # DashboardView numbers for every base in one request (admin only)
+    permission_classes = [IsAuthenticated, IsAdmin]
+    throttle_scope = 'expensive'
+
+    def get(self, request):
+        from datetime import date
+        from .metrics import base_metrics, merge_columns
+
+        params = request.query_params
+        try:
+            start = date.fromisoformat(params['start']) if params.get('start') else None
+            end = date.fromisoformat(params['end']) if params.get('end') else None
+        except ValueError:
+            return Response({"error": "start/end must be YYYY-MM-DD"}, status=status.HTTP_400_BAD_REQUEST)
+        by_asset = params.get('by_asset') == 'true'
+        # Each shard holds a disjoint set of bases; gather runs them in parallel
+        return Response(single_flight(
+            flight_key('base_metrics', request), lambda: merge_columns(gather(base_metrics, start, end, by_asset)),
+        ))
+
+class MovementSeriesView(APIView):
+    # Daily/weekly/monthly movement totals from precomputed DailyMovement buckets
+    permission_classes = [IsAuthenticated]
+    throttle_scope = 'expensive'
+
+    def get(self, request):
+        user = request.user
+        params = request.query_params
+        granularity = params.get('granularity', 'day')
+        if granularity not in TRUNC:
+            return Response({"error": "granularity must be day, week or month"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            start, end = parse_range(params.get('start'), params.get('end'), granularity)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            category = category_param(params)
+            base, asset_type = id_param(params, 'base'), id_param(params, 'asset_type')
+        except ValueError:
+            return Response({"error": "category, base and asset_type must be ids"}, status=status.HTTP_400_BAD_REQUEST)
+
+        buckets = DailyMovement.objects.all()
+        if category is not None:
+            if asset_type is not None:
+                buckets = buckets.filter(asset_type__category__ancestor_links__ancestor_id=category)
+            else:
+                # Whole category: its precomputed buckets, same columns
+                buckets = CategoryDailyMovement.objects.filter(category_id=category)
+        if user.role == User.Role.ADMIN:
+            if base is not None:
+                buckets = buckets.filter(base_id=base)
+        elif user.base:
+            buckets = buckets.filter(base=user.base)
+        else:
+            buckets = buckets.none()
+        if asset_type is not None:
+            buckets = buckets.filter(asset_type_id=asset_type)
+
+        def build():
+            # The queryset resolves its database per shard when gather evaluates it
+            parts = gather(movement_series, buckets, start, end, granularity)
+            series = {c: [sum(v) for v in zip(*(p[c] for p in parts))] for c in COLUMNS}
+            series['periods'] = parts[0]['periods']
+            return {
+                "granularity": granularity,
+                "periods": series['periods'],
+                "purchases": series['purchases'],
+                "transferIn": series['transfer_in'],
+                "transferOut": series['transfer_out'],
+                "assigned": series['assigned'],
+                "expended": series['expended'],
+            }
+
+        return Response(single_flight(flight_key('movement_series', request), build))
+
+FORECAST_PAGE = 500
+FORECAST_MAX_PAGE = 5000
+
+class ForecastView(APIView):
+    # Burn rates and days of supply per (base, asset_type), see core/analytics.py;
+    # most urgent first, ?limit=&offset= pages through the pairs
+    permission_classes = [IsAuthenticated]
+    throttle_scope = 'expensive'
+
+    def get(self, request):
+        import numpy as np
+        from .analytics import forecast, columns
+
+        user = request.user
+        params = request.query_params
+        try:
+            days = min(max(int(params.get('days', 90)), 7), 365)
+            alpha = min(max(float(params.get('alpha', 0.3)), 0.01), 1.0)
+            base_filter = int(params['base']) if params.get('base') else None
+            asset_filter = int(params['asset_type']) if params.get('asset_type') else None
+            limit = min(max(int(params.get('limit', FORECAST_PAGE)), 1), FORECAST_MAX_PAGE)
+            offset = max(int(params.get('offset', 0)), 0)
+        except ValueError:
+            return Response(
+                {"error": "days, base, asset_type, limit and offset must be integers and alpha a number"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if user.role != User.Role.ADMIN:
+            base_filter = user.base_id or -1
+
+        def build():
+            # Computed for every pair at once and shared by all users; scoping is
+            # a boolean mask over the cached arrays.
+            data = get_or_build('forecast', lambda: forecast(days, alpha), params=f'{days}:{alpha}', timeout=600)
+            keep = np.ones(len(data['base']), bool)
+            if base_filter is not None:
+                keep &= data['base'] == base_filter
+            if asset_filter is not None:
+                keep &= data['asset_type'] == asset_filter
+            rows = np.flatnonzero(keep)
+            page = columns(data, rows[offset:offset + limit])
+            return {
+                "days": days,
+                "alpha": alpha,
+                "count": len(rows),
+                "offset": offset,
+                "next": offset + limit if offset + limit < len(rows) else None,
+                "base": page['base'],
+                "assetType": page['asset_type'],
+                "quantity": page['quantity'],
+                "burn7d": page['burn_7d'],
+                "burn28d": page['burn_28d'],
+                "forecast": page['forecast'],
+                "daysOfSupply": page['days_of_supply'],
+            }
+
+        return Response(single_flight(flight_key('forecast', request), build))
+
+class RebalanceView(APIView):
+    """
+    POST {"targets": [{"base", "asset_type", "target"}], "costs": {from: {to: cost}}}
+    returns proposed TRANSFERs; nothing is written. Submit the proposals to
+    rebalance/commit/ to apply them.
+    """
+    permission_classes = [IsAuthenticated, IsAdmin]
+    throttle_scope = 'expensive'
+
+    def post(self, request):
+        from .rebalance import propose
+
+        try:
+            proposals = propose(
+                request.data.get('targets', []),
+                costs=request.data.get('costs'),
+                neighbours=int(request.data.get('neighbours', 8)),
+            )
+        except (KeyError, TypeError, ValueError) as e:
+            return Response({"error": f"Invalid targets or costs: {e}"}, status=status.HTTP_400_BAD_REQUEST)
         return Response({
-            "metrics": {
-                "openingBalance": opening_balance,
-                "netMovement": net_movement,
-                "closingBalance": closing_balance,
-                "expended": expended,
-                "purchases": purchases,
-                "transferIn": transfer_in,
-                "transferOut": transfer_out
-            },
-            "transactions": recent_data
+            "transfers": proposals,
+            "totalQuantity": sum(p['quantity'] for p in proposals),
+            "totalCost": sum(p['cost'] for p in proposals),
         })
 
+class RebalanceCommitView(APIView):
+    # Applies a list of proposed transfers in one DB transaction (one per
+    # source shard when sharded)
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    def post(self, request):
+        from django.db import transaction as db_transaction
+
+        try:
+            transfers = [
+                (int(t['asset_type']), int(t['from_base']), int(t['to_base']), int(t['quantity']))
+                for t in request.data.get('transfers', [])
+            ]
+        except (KeyError, TypeError, ValueError):
+            return Response({"error": "Each transfer needs asset_type, from_base, to_base and quantity"}, status=status.HTTP_400_BAD_REQUEST)
+        if not transfers or any(q <= 0 or f == d for _, f, d, q in transfers):
+            return Response({"error": "Transfers must move a positive quantity between two bases"}, status=status.HTTP_400_BAD_REQUEST)
+        # Unknown ids are rejected here; they would otherwise reach the shard
+        # routing and fail as a foreign key error on commit
+        base_ids = {f for _, f, _, _ in transfers} | {d for _, _, d, _ in transfers}
+        asset_ids = {a for a, _, _, _ in transfers}
+        unknown_bases = base_ids - set(Base.objects.filter(id__in=base_ids).values_list('id', flat=True))
+        unknown_assets = asset_ids - set(AssetType.objects.filter(id__in=asset_ids).values_list('id', flat=True))
+        if unknown_bases or unknown_assets:
+            return Response(
+                {"error": "Unknown bases or asset types", "bases": sorted(unknown_bases), "asset_types": sorted(unknown_assets)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if AssetType.objects.filter(id__in=asset_ids, serialized=True).exists():
+            return Response({"error": "Serialized asset types must be moved with their serials through movements/"}, status=status.HTTP_400_BAD_REQUEST)
+
+        from contextlib import ExitStack
+
+        # Without sharding the only source "shard" is default
+        needed = {}
+        for a, f, _, q in transfers:
+            needed[(f, a)] = needed.get((f, a), 0) + q
+        by_shard = {}
+        for f, a in needed:
+            by_shard.setdefault(shard_for_base(f), set()).add(f)
+        with ExitStack() as stack:
+            available = {}
+            for alias in sorted(by_shard):
+                stack.enter_context(db_transaction.atomic(using=alias))
+                # Lock source rows in a fixed order and re-check stock, since the
+                # plan may have been computed from older numbers.
+                sources = Inventory.objects.using(alias).select_for_update().filter(
+                    base_id__in=by_shard[alias], asset_type_id__in={a for _, a in needed}
+                ).order_by('base_id', 'asset_type_id')
+                available.update({(i.base_id, i.asset_type_id): i.quantity for i in sources})
+            short = [
+                {"base": f, "asset_type": a, "needed": q, "available": available.get((f, a), 0)}
+                for (f, a), q in needed.items() if available.get((f, a), 0) < q
+            ]
+            if short:
+                return Response({"error": "Insufficient stock", "shortfalls": short}, status=status.HTTP_409_CONFLICT)
+
+            # One movement document per route, each applied with grouped statements
+            routes = {}
+            for a, f, d, q in transfers:
+                route = routes.setdefault((f, d), {})
+                route[a] = route.get(a, 0) + q
+            txs = []
+            for (f, d), lines in routes.items():
+                movement = Movement(
+                    type=Transaction.Type.TRANSFER, from_base_id=f, to_base_id=d,
+                    recipient='Rebalance', performed_by=request.user
+                )
+                alias = shard_for_base(f)
+                if shard_for_base(d) != alias:
+                    txs += transfer_document(movement, list(lines.items()))
+                    continue
+                with on_shard(alias):
+                    movement.save()
+                    txs += post_movement(movement, list(lines.items()))
+
+        return Response({"created": [tx.id for tx in txs]}, status=status.HTTP_201_CREATED)
+
 from django.http import JsonResponse
 
 def api_root(request):
@@ -0,0 +1,27 @@
+# Gunicorn settings for Render: boot steps and cache warm-up run once in the
+# master, then workers fork from the preloaded, warmed app.
+import os
+import time
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+# Threaded workers: PBKDF2 runs on each worker's bounded hash pool
+# (core/hashers.py), so the other threads keep serving API requests
+threads = int(os.environ.get('WEB_THREADS', 4))
+preload_app = True
+
+_started = time.perf_counter()
+
+
+def when_ready(server):
+    from core import boot
+
+    loaded = time.perf_counter() - _started
+    try:
+        timings = boot.run()
+    except Exception:
+        server.log.exception('Boot failed')
+        raise SystemExit(1)
+    timings.append(('warm caches', boot.warm_caches(), True))
+    report = ', '.join(f"{p}={s * 1000:.0f}ms{'' if ran else ' (skipped)'}" for p, s, ran in timings)
+    server.log.info(f"Startup: import+app load={loaded * 1000:.0f}ms, {report}")
@@ -1,24 +1,72 @@
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import declarative_base
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
-DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(
-    DATABASE_URL,
-    pool_pre_ping=True
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def async_url(url):
+    # Same DATABASE_URL as the Django service, switched to an async driver
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    if url.startswith("postgresql://"):
+        return "postgresql+asyncpg://" + url[len("postgresql://"):].replace("sslmode=", "ssl=")
+    if url.startswith("sqlite:///"):
+        return "sqlite+aiosqlite:///" + url[len("sqlite:///"):]
+    return url
+
+
+# The Django database; sqlite:/// URLs (local runs, benchmarks) use aiosqlite
+DATABASE_URL = async_url(os.environ["DATABASE_URL"])
+
+engine_options = {}
+if DATABASE_URL.startswith("postgresql+asyncpg"):
+    engine_options = dict(
+        # Small, warm pool: every request is one short read, so a handful of
+        # connections serve many concurrent requests. Recycling replaces
+        # pre-ping, which would cost an extra round trip per checkout.
+        pool_size=int(os.getenv("DB_POOL_SIZE", 10)),
+        max_overflow=int(os.getenv("DB_POOL_MAX_OVERFLOW", 5)),
+        pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", 5)),
+        pool_recycle=int(os.getenv("DB_POOL_RECYCLE", 1800)),
+        pool_pre_ping=False,
+        connect_args={
+            "server_settings": {
+                # This service only reads the Django tables
+                "default_transaction_read_only": "on",
+                "statement_timeout": os.getenv("DB_STATEMENT_TIMEOUT", "10000"),
+                "application_name": "military-read-api",
+            },
+        },
+    )
+
+engine = create_async_engine(DATABASE_URL, **engine_options)
+
+# Writes (transactions router) get their own small pool without the
+# read-only session default.
+write_options = dict(engine_options)
+if "connect_args" in write_options:
+    write_options["pool_size"] = int(os.getenv("DB_WRITE_POOL_SIZE", 5))
+    write_options["connect_args"] = {"server_settings": {
+        k: v for k, v in engine_options["connect_args"]["server_settings"].items()
+        if k != "default_transaction_read_only"
+    }}
+write_engine = create_async_engine(DATABASE_URL, **write_options)
+IS_POSTGRES = DATABASE_URL.startswith("postgresql+asyncpg")
+# With SHARD_DATABASE_URLS set, Django keeps the ledger on per-base shards
+# (server_django/core/sharding.py). This service only knows DATABASE_URL,
+# so it refuses writes rather than putting rows on the wrong database.
+SHARDED = bool(os.getenv("SHARD_DATABASE_URLS", "").strip())
 
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+
+async def get_db():
+    async with engine.connect() as conn:
+        yield conn
+
+
+async def get_write_db():
+    async with write_engine.connect() as conn:
+        yield conn
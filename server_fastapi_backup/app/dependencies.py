@@ -1,41 +1,23 @@
-from datetime import datetime, timedelta
-from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from .database import get_db
+from sqlalchemy import or_, false
 from . import models, schemas
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
-SECRET_KEY = os.getenv("JWT_SECRET")
+# Tokens are issued by the Django service (djangorestframework-simplejwt),
+# signed with its SECRET_KEY and carrying role/base_id claims.
+SECRET_KEY = os.getenv("JWT_SECRET") or os.getenv("SECRET_KEY")
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login/")
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_password_hash(password):
-    return pwd_context.hash(password)
-
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
-
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> schemas.Principal:
+    # Pure CPU work: verifying the signature and reading claims never touches
+    # the database or blocks the event loop.
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -43,14 +25,20 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     )
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-        token_data = schemas.TokenData(username=username)
     except JWTError:
         raise credentials_exception
-        
-    user = db.query(models.User).filter(models.User.username == token_data.username).first()
-    if user is None:
+    if payload.get("token_type") != "access" or "user_id" not in payload or "role" not in payload:
         raise credentials_exception
-    return user
+    return schemas.Principal(user_id=payload["user_id"], role=payload["role"], base_id=payload.get("base_id"))
+
+def visible_transactions(user: schemas.Principal):
+    # WHERE clause matching Django's transactions_visible_to
+    T = models.Transaction
+    if user.role == models.Role.ADMIN:
+        return None
+    if not user.base_id:
+        return false()
+    at_base = or_(T.from_base_id == user.base_id, T.to_base_id == user.base_id)
+    if user.role == models.Role.LOGISTICS_OFFICER:
+        return at_base & T.type.in_([models.TransactionType.PURCHASE.value, models.TransactionType.TRANSFER.value])
+    return at_base
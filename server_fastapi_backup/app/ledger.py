@@ -0,0 +1,248 @@
+"""
+Stock writes against the Django tables. A transaction debits and/or
+credits Inventory, writes its ledger row (with a one-line movement header)
+and bumps the DailyMovement bucket, then adds the same deltas to the
+CategoryStock and CategoryDailyMovement rollups of every category above the
+asset type (via core_categoryclosure, as core.categories.roll_up_transaction
+does in Django), all or nothing:
+
+- PostgreSQL: one statement of data-modifying CTEs, run in autocommit, so
+  a transfer is a single round trip. The debit is a conditional UPDATE
+  (quantity >= n), so two requests can never both spend the same stock,
+  and every later CTE reads the debit's output: no debit, no writes.
+  Transfers first lock both Inventory rows in base_id order, so opposite
+  transfers queue instead of deadlocking.
+- SQLite (local runs): the same steps as separate statements in one
+  transaction; SQLite serialises writers, and the first statement is the
+  conditional UPDATE, so it takes the write lock before anything is read.
+
+Afterwards the stock alerts of the touched (base, asset type) pairs are
+raised or resolved, as core.alerts.check_thresholds does in Django.
+
+Everything here writes to DATABASE_URL only. It does not route bases to
+shards, write outbox messages for cross-shard transfers or keep
+ledger id sequences interleaved. With SHARD_DATABASE_URLS set, the
+transactions router therefore answers 503, and writes must go through
+the Django API.
+"""
+from datetime import datetime, timezone
+from sqlalchemy import text
+from .models import TransactionType as T
+
+COLUMNS = ["purchases", "transfer_in", "transfer_out", "assigned", "expended"]
+# Bucket columns that add to stock; mirrors core.movements.INCREASES
+INCREASES = {"purchases", "transfer_in"}
+# (side, bucket column) per leg; mirrors core.timeseries.movement_legs
+LEGS = {
+    T.PURCHASE: [("to_base", "purchases")],
+    T.TRANSFER: [("from_base", "transfer_out"), ("to_base", "transfer_in")],
+    T.ASSIGNMENT: [("from_base", "assigned")],
+    T.EXPENDITURE: [("from_base", "expended")],
+}
+
+
+class InsufficientStock(Exception):
+    pass
+
+
+def _bucket_rows(tx_type, cast):
+    rows = []
+    for side, column in LEGS[tx_type]:
+        values = ", ".join(cast("quantity", "integer") if c == column else "0" for c in COLUMNS)
+        rows.append(f"({cast(side, 'bigint')}, {values})")
+    return ", ".join(rows)
+
+
+def _stock_rows(tx_type, cast):
+    # (base, stock delta) per leg, for the CategoryStock rollup
+    return ", ".join(
+        f"({cast(side, 'bigint')}, {'' if column in INCREASES else '-'}{cast('quantity', 'integer')})"
+        for side, column in LEGS[tx_type]
+    )
+
+
+def _bucket_update(table="core_dailymovement"):
+    return ", ".join(f"{c} = {table}.{c} + EXCLUDED.{c}" for c in COLUMNS)
+
+
+# Categories the asset type rolls up into: its own and every ancestor
+CATEGORIES = (
+    "SELECT cl.ancestor_id AS category_id FROM core_assettype a "
+    "JOIN core_categoryclosure cl ON cl.descendant_id = a.category_id WHERE a.id = {asset_type}"
+)
+
+
+def _pg_cast(name, sql_type):
+    # asyncpg needs a type for every parameter; each name keeps one type
+    # throughout, since a reused name becomes the same $n placeholder
+    return f"CAST(:{name} AS {sql_type})"
+
+
+def _sqlite_param(name, sql_type):
+    # SQLite binds untyped; same signature as _pg_cast
+    return f":{name}"
+
+
+def postgres_statement(tx_type):
+    c = _pg_cast
+    debit = tx_type != T.PURCHASE
+    credit = tx_type in (T.PURCHASE, T.TRANSFER)
+    ctes, guard = [], ""
+    if tx_type == T.TRANSFER:
+        ctes.append(f"""locked AS MATERIALIZED (
+            SELECT id FROM core_inventory
+            WHERE asset_type_id = {c('asset_type', 'bigint')}
+              AND base_id IN ({c('from_base', 'bigint')}, {c('to_base', 'bigint')})
+            ORDER BY base_id FOR UPDATE)""")
+        # Uncorrelated subquery: runs (and takes both locks) before the debit
+        guard = " AND (SELECT count(*) FROM locked) > 0"
+    if debit:
+        ctes.append(f"""debit AS (
+            UPDATE core_inventory SET quantity = quantity - {c('quantity', 'integer')}
+            WHERE base_id = {c('from_base', 'bigint')} AND asset_type_id = {c('asset_type', 'bigint')}
+              AND quantity >= {c('quantity', 'integer')}{guard}
+            RETURNING quantity)""")
+    gate = " FROM debit" if debit else ""
+    if credit:
+        ctes.append(f"""credit AS (
+            INSERT INTO core_inventory (base_id, asset_type_id, quantity)
+            SELECT {c('to_base', 'bigint')}, {c('asset_type', 'bigint')}, {c('quantity', 'integer')}{gate}
+            ON CONFLICT (base_id, asset_type_id) DO UPDATE SET quantity = core_inventory.quantity + EXCLUDED.quantity
+            RETURNING quantity)""")
+    ctes.append(f"""mv AS (
+        INSERT INTO core_movement (type, date, from_base_id, to_base_id, recipient, performed_by_id)
+        SELECT {c('type', 'varchar')}, now(), {c('from_base', 'bigint')}, {c('to_base', 'bigint')},
+               {c('recipient', 'varchar')}, {c('user', 'bigint')}{gate}
+        RETURNING id, date)""")
+    ctes.append(f"""tx AS (
+        INSERT INTO core_transaction (type, asset_type_id, quantity, date, from_base_id, to_base_id,
+                                      recipient, performed_by_id, movement_id, mirror)
+        SELECT {c('type', 'varchar')}, {c('asset_type', 'bigint')}, {c('quantity', 'integer')}, mv.date,
+               {c('from_base', 'bigint')}, {c('to_base', 'bigint')}, {c('recipient', 'varchar')},
+               {c('user', 'bigint')}, mv.id, FALSE
+        FROM mv
+        RETURNING id, date)""")
+    ctes.append(f"""bucket AS (
+        INSERT INTO core_dailymovement (base_id, asset_type_id, day, {', '.join(COLUMNS)})
+        SELECT v.base_id, {c('asset_type', 'bigint')}, (tx.date AT TIME ZONE 'UTC')::date, {', '.join('v.' + col for col in COLUMNS)}
+        FROM tx, (VALUES {_bucket_rows(tx_type, c)}) AS v(base_id, {', '.join(COLUMNS)})
+        ON CONFLICT (base_id, asset_type_id, day) DO UPDATE SET {_bucket_update()})""")
+    ctes.append(f"""cats AS ({CATEGORIES.format(asset_type=c('asset_type', 'bigint'))})""")
+    ctes.append(f"""category_stock AS (
+        INSERT INTO core_categorystock (base_id, category_id, quantity)
+        SELECT v.base_id, cats.category_id, v.delta
+        FROM tx, cats, (VALUES {_stock_rows(tx_type, c)}) AS v(base_id, delta)
+        ON CONFLICT (base_id, category_id) DO UPDATE SET quantity = core_categorystock.quantity + EXCLUDED.quantity)""")
+    ctes.append(f"""category_bucket AS (
+        INSERT INTO core_categorydailymovement (base_id, category_id, day, {', '.join(COLUMNS)})
+        SELECT v.base_id, cats.category_id, (tx.date AT TIME ZONE 'UTC')::date, {', '.join('v.' + col for col in COLUMNS)}
+        FROM tx, cats, (VALUES {_bucket_rows(tx_type, c)}) AS v(base_id, {', '.join(COLUMNS)})
+        ON CONFLICT (base_id, category_id, day) DO UPDATE SET {_bucket_update('core_categorydailymovement')})""")
+    from_qty = "(SELECT quantity FROM debit)" if debit else "NULL"
+    to_qty = "(SELECT quantity FROM credit)" if credit else "NULL"
+    return text(
+        "WITH " + ",\n".join(ctes)
+        + f"\nSELECT tx.id, tx.date, {from_qty} AS from_quantity, {to_qty} AS to_quantity FROM tx"
+    )
+
+
+async def check_thresholds(conn, params, now, from_qty, to_qty):
+    # Sides this write moved, as (base, stock before, stock after); `now` is
+    # the alert timestamp in the driver's format
+    n = params["quantity"]
+    sides = []
+    if from_qty is not None:
+        sides.append((params["from_base"], from_qty + n, from_qty))
+    if to_qty is not None:
+        sides.append((params["to_base"], to_qty - n, to_qty))
+    for base_id, old, new in sides:
+        pair = {"base": base_id, "asset_type": params["asset_type"]}
+        threshold = (await conn.execute(text(
+            "SELECT reorder_level, minimum FROM core_stockthreshold WHERE base_id = :base AND asset_type_id = :asset_type"
+        ), pair)).first()
+        if threshold is None:
+            continue
+        for level, limit in (("REORDER", threshold.reorder_level), ("CRITICAL", threshold.minimum)):
+            if new < limit <= old:
+                # The partial unique index allows one open alert per level
+                await conn.execute(text(
+                    "INSERT INTO core_stockalert (base_id, asset_type_id, level, threshold, quantity, created_at) "
+                    "VALUES (:base, :asset_type, :level, :threshold, :quantity, :now) ON CONFLICT DO NOTHING"
+                ), dict(pair, level=level, threshold=limit, quantity=new, now=now))
+            elif old < limit <= new:
+                await conn.execute(text(
+                    "UPDATE core_stockalert SET resolved_at = :now WHERE base_id = :base AND asset_type_id = :asset_type "
+                    "AND level = :level AND resolved_at IS NULL"
+                ), dict(pair, level=level, now=now))
+
+
+STATEMENTS = {}
+
+
+async def post_postgres(conn, params):
+    tx_type = T(params["type"])
+    if tx_type not in STATEMENTS:
+        STATEMENTS[tx_type] = postgres_statement(tx_type)
+    conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+    row = (await conn.execute(STATEMENTS[tx_type], params)).mappings().first()
+    if row is None:
+        raise InsufficientStock()
+    await check_thresholds(conn, params, datetime.now(timezone.utc), row["from_quantity"], row["to_quantity"])
+    return dict(row)
+
+
+async def post_sqlite(conn, params):
+    tx_type = T(params["type"])
+    now = datetime.now(timezone.utc)
+    # Django's SQLite datetime format (naive UTC)
+    params = dict(params, date=now.strftime("%Y-%m-%d %H:%M:%S.%f"), day=now.date().isoformat())
+    from_qty = to_qty = None
+    async with conn.begin():
+        if tx_type != T.PURCHASE:
+            from_qty = (await conn.execute(text(
+                "UPDATE core_inventory SET quantity = quantity - :quantity "
+                "WHERE base_id = :from_base AND asset_type_id = :asset_type AND quantity >= :quantity "
+                "RETURNING quantity"
+            ), params)).scalar()
+            if from_qty is None:
+                raise InsufficientStock()
+        if tx_type in (T.PURCHASE, T.TRANSFER):
+            to_qty = (await conn.execute(text(
+                "INSERT INTO core_inventory (base_id, asset_type_id, quantity) VALUES (:to_base, :asset_type, :quantity) "
+                "ON CONFLICT (base_id, asset_type_id) DO UPDATE SET quantity = core_inventory.quantity + EXCLUDED.quantity "
+                "RETURNING quantity"
+            ), params)).scalar()
+        movement_id = (await conn.execute(text(
+            "INSERT INTO core_movement (type, date, from_base_id, to_base_id, recipient, performed_by_id) "
+            "VALUES (:type, :date, :from_base, :to_base, :recipient, :user) RETURNING id"
+        ), params)).scalar()
+        tx_id = (await conn.execute(text(
+            "INSERT INTO core_transaction (type, asset_type_id, quantity, date, from_base_id, to_base_id, "
+            "recipient, performed_by_id, movement_id, mirror) VALUES (:type, :asset_type, :quantity, :date, :from_base, "
+            ":to_base, :recipient, :user, :movement, FALSE) RETURNING id"
+        ), dict(params, movement=movement_id))).scalar()
+        rows = ", ".join(
+            f"(:{side}, :asset_type, :day, " + ", ".join(":quantity" if c == column else "0" for c in COLUMNS) + ")"
+            for side, column in LEGS[tx_type]
+        )
+        await conn.execute(text(
+            f"INSERT INTO core_dailymovement (base_id, asset_type_id, day, {', '.join(COLUMNS)}) VALUES {rows} "
+            f"ON CONFLICT (base_id, asset_type_id, day) DO UPDATE SET {_bucket_update()}"
+        ), params)
+        # Category rollups; `WHERE true` keeps SQLite from reading the upsert's
+        # ON as a join constraint
+        categories = CATEGORIES.format(asset_type=":asset_type")
+        await conn.execute(text(
+            f"WITH v(base_id, delta) AS (VALUES {_stock_rows(tx_type, _sqlite_param)}), cats AS ({categories}) "
+            "INSERT INTO core_categorystock (base_id, category_id, quantity) "
+            "SELECT v.base_id, cats.category_id, v.delta FROM v, cats WHERE true "
+            "ON CONFLICT (base_id, category_id) DO UPDATE SET quantity = core_categorystock.quantity + EXCLUDED.quantity"
+        ), params)
+        await conn.execute(text(
+            f"WITH v(base_id, {', '.join(COLUMNS)}) AS (VALUES {_bucket_rows(tx_type, _sqlite_param)}), cats AS ({categories}) "
+            f"INSERT INTO core_categorydailymovement (base_id, category_id, day, {', '.join(COLUMNS)}) "
+            f"SELECT v.base_id, cats.category_id, :day, {', '.join('v.' + col for col in COLUMNS)} FROM v, cats WHERE true "
+            f"ON CONFLICT (base_id, category_id, day) DO UPDATE SET {_bucket_update('core_categorydailymovement')}"
+        ), params)
+        await check_thresholds(conn, params, params["date"], from_qty, to_qty)
+    return {"id": tx_id, "date": now, "from_quantity": from_qty, "to_quantity": to_qty}
@@ -1,12 +1,22 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .routers import auth, assets, transactions, dashboard
-from .database import engine, Base
+from fastapi.responses import ORJSONResponse
+from .routers import assets, transactions, dashboard
+from .database import engine, write_engine
 
-# Create tables if they don't exist
-Base.metadata.create_all(bind=engine)
+# Query API over the Django database. Tables, users and tokens all belong to
+# server_django; this service never migrates, and only the transactions
+# router writes (see routers/transactions.py), which it refuses when the
+# Django ledger is sharded.
 
-app = FastAPI(title="Military Asset Manager")
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    await engine.dispose()
+    await write_engine.dispose()
+
+app = FastAPI(title="Military Asset Manager", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # CORS
 origins = ["*"]  # Configure appropriately for production
@@ -19,11 +29,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(assets.router, prefix="/api/assets", tags=["assets"])
 app.include_router(transactions.router, prefix="/api/transactions", tags=["transactions"])
 app.include_router(dashboard.router, prefix="/api/dashboard", tags=["dashboard"])
 
 @app.get("/health")
-def health_check():
+async def health_check():
     return {"status": "ok"}
@@ -1,6 +1,6 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime, Enum, UniqueConstraint
-from sqlalchemy.orm import relationship
-from datetime import datetime
+# Read-only mappings of the Django `core_*` tables (server_django/core/models.py).
+# Django owns the schema and migrations; nothing here creates tables.
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, BigInteger, String, DateTime, Text
 import enum
 from .database import Base
 
@@ -11,84 +11,53 @@ class Role(str, enum.Enum):
 
 class TransactionType(str, enum.Enum):
     PURCHASE = "PURCHASE"
-    TRANSFER_IN = "TRANSFER_IN"
-    TRANSFER_OUT = "TRANSFER_OUT"
+    TRANSFER = "TRANSFER"
     ASSIGNMENT = "ASSIGNMENT"
     EXPENDITURE = "EXPENDITURE"
 
 class BaseObj(Base):
-    __tablename__ = "Base"
+    __tablename__ = "core_base"
 
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String(255), unique=True, index=True)
+    id = Column(BigInteger, primary_key=True)
+    name = Column(String(255))
     location = Column(String(255))
-    createdAt = Column(DateTime, default=datetime.utcnow)
-
-    users = relationship("User", back_populates="base")
-    inventory = relationship("Inventory", back_populates="base")
-    snapshots = relationship("InventorySnapshot", back_populates="base")
-    
-    outgoing_transfers = relationship("Transaction", foreign_keys="[Transaction.fromBaseId]", back_populates="fromBase")
-    incoming_transfers = relationship("Transaction", foreign_keys="[Transaction.toBaseId]", back_populates="toBase")
+    created_at = Column(DateTime(timezone=True))
 
 class User(Base):
-    __tablename__ = "User"
-
-    id = Column(Integer, primary_key=True, index=True)
-    username = Column(String(255), unique=True, index=True)
-    password = Column(String(255))
-    role = Column(Enum(Role))
-    baseId = Column(Integer, ForeignKey("Base.id"), nullable=True)
-    createdAt = Column(DateTime, default=datetime.utcnow)
+    __tablename__ = "core_user"
 
-    base = relationship("BaseObj", back_populates="users")
+    id = Column(BigInteger, primary_key=True)
+    username = Column(String(150))
+    role = Column(String(50))
+    base_id = Column(BigInteger, ForeignKey("core_base.id"), nullable=True)
+    is_active = Column(Boolean)
 
 class AssetType(Base):
-    __tablename__ = "AssetType"
+    __tablename__ = "core_assettype"
 
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String(255), unique=True, index=True)
-    description = Column(String(255), nullable=True)
-
-    inventory = relationship("Inventory", back_populates="assetType")
-    snapshots = relationship("InventorySnapshot", back_populates="assetType")
-    transactions = relationship("Transaction", back_populates="assetType")
+    id = Column(BigInteger, primary_key=True)
+    name = Column(String(255))
+    description = Column(Text)
 
 class Inventory(Base):
-    __tablename__ = "Inventory"
-
-    baseId = Column(Integer, ForeignKey("Base.id"), primary_key=True)
-    assetTypeId = Column(Integer, ForeignKey("AssetType.id"), primary_key=True)
-    quantity = Column(Integer, default=0)
+    __tablename__ = "core_inventory"
 
-    base = relationship("BaseObj", back_populates="inventory")
-    assetType = relationship("AssetType", back_populates="inventory")
-
-class InventorySnapshot(Base):
-    __tablename__ = "InventorySnapshot"
-
-    id = Column(Integer, primary_key=True, index=True)
-    baseId = Column(Integer, ForeignKey("Base.id"))
-    assetTypeId = Column(Integer, ForeignKey("AssetType.id"))
+    id = Column(BigInteger, primary_key=True)
+    base_id = Column(BigInteger, ForeignKey("core_base.id"))
+    asset_type_id = Column(BigInteger, ForeignKey("core_assettype.id"))
     quantity = Column(Integer)
-    date = Column(DateTime, default=datetime.utcnow)
-
-    base = relationship("BaseObj", back_populates="snapshots")
-    assetType = relationship("AssetType", back_populates="snapshots")
 
 class Transaction(Base):
-    __tablename__ = "Transaction"
+    __tablename__ = "core_transaction"
 
-    id = Column(Integer, primary_key=True, index=True)
-    type = Column(Enum(TransactionType))
+    id = Column(BigInteger, primary_key=True)
+    type = Column(String(50))
     quantity = Column(Integer)
-    date = Column(DateTime, default=datetime.utcnow)
-    
-    assetTypeId = Column(Integer, ForeignKey("AssetType.id"))
-    fromBaseId = Column(Integer, ForeignKey("Base.id"), nullable=True)
-    toBaseId = Column(Integer, ForeignKey("Base.id"), nullable=True)
+    date = Column(DateTime(timezone=True))
+    asset_type_id = Column(BigInteger, ForeignKey("core_assettype.id"))
+    from_base_id = Column(BigInteger, ForeignKey("core_base.id"), nullable=True)
+    to_base_id = Column(BigInteger, ForeignKey("core_base.id"), nullable=True)
     recipient = Column(String(255), nullable=True)
-
-    assetType = relationship("AssetType", back_populates="transactions")
-    fromBase = relationship("BaseObj", foreign_keys=[fromBaseId], back_populates="outgoing_transfers")
-    toBase = relationship("BaseObj", foreign_keys=[toBaseId], back_populates="incoming_transfers")
+    performed_by_id = Column(BigInteger, ForeignKey("core_user.id"), nullable=True)
+    movement_id = Column(BigInteger, nullable=True)
+    mirror = Column(Boolean, default=False)
@@ -1,38 +1,46 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends
+from sqlalchemy import select
+from typing import Optional
 from .. import models, schemas, dependencies
 from ..database import get_db
 
 router = APIRouter()
 
-@router.get("/types", response_model=List[schemas.AssetTypeResponse])
-def get_asset_types(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(dependencies.get_current_user)
+@router.get("/types")
+async def get_asset_types(
+    db=Depends(get_db),
+    current_user: schemas.Principal = Depends(dependencies.get_current_user)
 ):
-    return db.query(models.AssetType).all()
+    A = models.AssetType
+    rows = await db.execute(select(A.id, A.name, A.description).order_by(A.id))
+    return [dict(r) for r in rows.mappings()]
 
-@router.post("/types", response_model=schemas.AssetTypeResponse)
-def create_asset_type(
-    asset_type: schemas.AssetTypeCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(dependencies.get_current_user)
+@router.get("/bases")
+async def get_bases(
+    db=Depends(get_db),
+    current_user: schemas.Principal = Depends(dependencies.get_current_user)
 ):
-    # Only Admin or Logistics can create types
-    if current_user.role not in [models.Role.ADMIN, models.Role.LOGISTICS_OFFICER]:
-         raise HTTPException(status_code=403, detail="Not authorized")
-         
-    db_asset_type = models.AssetType(name=asset_type.name, description=asset_type.description)
-    db.add(db_asset_type)
-    db.commit()
-    db.refresh(db_asset_type)
-    return db_asset_type
+    B = models.BaseObj
+    rows = await db.execute(select(B.id, B.name, B.location, B.created_at).order_by(B.id))
+    return [dict(r) for r in rows.mappings()]
 
-@router.get("/inventory/{base_id}", response_model=List[schemas.InventoryResponse])
-def get_base_inventory(
-    base_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(dependencies.get_current_user)
+@router.get("/inventory")
+async def get_inventory(
+    base_id: Optional[int] = None,
+    db=Depends(get_db),
+    current_user: schemas.Principal = Depends(dependencies.get_current_user)
 ):
-    return db.query(models.Inventory).filter(models.Inventory.baseId == base_id).all()
+    # Admins may pick a base (or get all); everyone else sees their own base
+    I = models.Inventory
+    q = (
+        select(I.base_id.label("base"), I.asset_type_id.label("asset_type"),
+               models.AssetType.name.label("asset_type_name"), I.quantity)
+        .join(models.AssetType, models.AssetType.id == I.asset_type_id)
+        .order_by(I.base_id, I.asset_type_id)
+    )
+    if current_user.role != models.Role.ADMIN:
+        base_id = current_user.base_id or -1
+    if base_id is not None:
+        q = q.where(I.base_id == base_id)
+    rows = await db.execute(q)
+    return [dict(r) for r in rows.mappings()]
@@ -1,24 +1,67 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import select, func, case, and_
 from .. import models, schemas, dependencies
 from ..database import get_db
+from .transactions import transaction_rows
 
 router = APIRouter()
 
-@router.get("/stats")
-def get_dashboard_stats(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(dependencies.get_current_user)
+
+@router.get("/metrics")
+async def get_dashboard_metrics(
+    db=Depends(get_db),
+    current_user: schemas.Principal = Depends(dependencies.get_current_user),
 ):
-    total_assets = db.query(func.sum(models.Inventory.quantity)).scalar() or 0
-    total_value = 0 # Placeholder if we had value
-    low_stock_items = db.query(models.Inventory).filter(models.Inventory.quantity < 10).count()
-    
-    recent_transactions = db.query(models.Transaction).order_by(models.Transaction.date.desc()).limit(5).all()
-    
+    """
+    Same numbers as Django's DashboardView, with the ledger flows computed
+    in one conditional-aggregation pass instead of one query per metric.
+    """
+    T = models.Transaction
+    is_admin = current_user.role == models.Role.ADMIN
+    base_id = current_user.base_id
+
+    inv = select(func.coalesce(func.sum(models.Inventory.quantity), 0))
+    if not is_admin and base_id:
+        inv = inv.where(models.Inventory.base_id == base_id)
+    closing_balance = (await db.execute(inv)).scalar_one()
+
+    def total(condition):
+        return func.coalesce(func.sum(case((condition, T.quantity), else_=0)), 0)
+
+    # Admins see the whole ledger; base users only their base; others nothing
+    scope = None if is_admin else (T.from_base_id == base_id) | (T.to_base_id == base_id)
+    purchases = expended = transfer_in = transfer_out = 0
+    recent = []
+    if is_admin or base_id:
+        flows = select(
+            total(T.type == models.TransactionType.PURCHASE.value),
+            total(T.type == models.TransactionType.EXPENDITURE.value),
+            total(and_(T.type == models.TransactionType.TRANSFER.value, T.to_base_id == base_id)),
+            total(and_(T.type == models.TransactionType.TRANSFER.value, T.from_base_id == base_id)),
+        )
+        recent_q = transaction_rows().order_by(T.date.desc()).limit(5)
+        if scope is not None:
+            flows = flows.where(scope)
+            recent_q = recent_q.where(scope)
+        purchases, expended, transfer_in, transfer_out = (await db.execute(flows)).one()
+        recent = [dict(r) for r in (await db.execute(recent_q)).mappings().all()]
+
+    if is_admin:
+        # Transfers don't change the system total
+        transfer_in = transfer_out = 0
+        net_movement = purchases - expended
+    else:
+        net_movement = purchases + transfer_in - transfer_out
+
     return {
-        "totalAssets": total_assets,
-        "lowStockItems": low_stock_items,
-        "recentTransactions": recent_transactions
+        "metrics": {
+            "openingBalance": closing_balance - net_movement + expended,
+            "netMovement": net_movement,
+            "closingBalance": closing_balance,
+            "expended": expended,
+            "purchases": purchases,
+            "transferIn": transfer_in,
+            "transferOut": transfer_out,
+        },
+        "transactions": recent,
     }
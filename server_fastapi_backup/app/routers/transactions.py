@@ -1,70 +1,96 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from .. import models, schemas, dependencies
-from ..database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+from typing import Optional
+from .. import models, schemas, dependencies, ledger
+from ..database import get_db, get_write_db, IS_POSTGRES, SHARDED
 
 router = APIRouter()
 
-@router.post("/", response_model=schemas.TransactionResponse)
-def create_transaction(
-    tx: schemas.TransactionCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(dependencies.get_current_user)
-):
-    # Logic to update inventory based on transaction type
-    
-    # helper to get or create inventory
-    def get_or_create_inventory(base_id, asset_type_id):
-        inv = db.query(models.Inventory).filter(
-            models.Inventory.baseId == base_id,
-            models.Inventory.assetTypeId == asset_type_id
-        ).first()
-        if not inv:
-            inv = models.Inventory(baseId=base_id, assetTypeId=asset_type_id, quantity=0)
-            db.add(inv)
-        return inv
+FromBase = aliased(models.BaseObj)
+ToBase = aliased(models.BaseObj)
 
-    if tx.type == models.TransactionType.PURCHASE:
-        if not tx.toBaseId:
-             raise HTTPException(status_code=400, detail="toBaseId required for PURCHASE")
-        inv = get_or_create_inventory(tx.toBaseId, tx.assetTypeId)
-        inv.quantity += tx.quantity
 
-    elif tx.type == models.TransactionType.TRANSFER_IN or tx.type == models.TransactionType.TRANSFER_OUT:
-        # Note: Front end should probably just send one "TRANSFER" type, but based on schema
-        # We will assume TRANSFER represents moving from A to B
-        if not tx.fromBaseId or not tx.toBaseId:
-            raise HTTPException(status_code=400, detail="fromBaseId and toBaseId required for TRANSFER")
-        
-        src_inv = get_or_create_inventory(tx.fromBaseId, tx.assetTypeId)
-        if src_inv.quantity < tx.quantity:
-            raise HTTPException(status_code=400, detail="Insufficient inventory at source base")
-        
-        dst_inv = get_or_create_inventory(tx.toBaseId, tx.assetTypeId)
-        
-        src_inv.quantity -= tx.quantity
-        dst_inv.quantity += tx.quantity
+def transaction_rows():
+    # Same fields as Django's TransactionSerializer, names joined in one query
+    T = models.Transaction
+    return (
+        select(
+            T.id, T.type, T.asset_type_id.label("asset_type"), T.quantity, T.date,
+            T.from_base_id.label("from_base"), T.to_base_id.label("to_base"), T.recipient,
+            T.performed_by_id.label("performed_by"), T.movement_id.label("movement"),
+            models.User.username.label("performed_by_name"),
+            models.AssetType.name.label("asset_type_name"),
+            FromBase.name.label("from_base_name"),
+            ToBase.name.label("to_base_name"),
+        )
+        .join(models.AssetType, models.AssetType.id == T.asset_type_id)
+        .outerjoin(FromBase, FromBase.id == T.from_base_id)
+        .outerjoin(ToBase, ToBase.id == T.to_base_id)
+        .outerjoin(models.User, models.User.id == T.performed_by_id)
+    )
 
-    elif tx.type in [models.TransactionType.ASSIGNMENT, models.TransactionType.EXPENDITURE]:
-        if not tx.fromBaseId:
-            raise HTTPException(status_code=400, detail="fromBaseId required for this transaction")
-        
-        src_inv = get_or_create_inventory(tx.fromBaseId, tx.assetTypeId)
-        if src_inv.quantity < tx.quantity:
-             raise HTTPException(status_code=400, detail="Insufficient inventory")
-        
-        src_inv.quantity -= tx.quantity
 
-    # Create Transaction Record
-    new_tx = models.Transaction(
-        type=tx.type,
-        quantity=tx.quantity,
-        assetTypeId=tx.assetTypeId,
-        fromBaseId=tx.fromBaseId,
-        toBaseId=tx.toBaseId,
-        recipient=tx.recipient
-    )
-    db.add(new_tx)
-    db.commit()
-    db.refresh(new_tx)
-    return new_tx
+@router.get("/")
+async def list_transactions(
+    limit: int = Query(50, ge=1, le=1000),
+    before: Optional[int] = Query(None, description="Return rows with id below this (keyset pagination)"),
+    db=Depends(get_db),
+    current_user: schemas.Principal = Depends(dependencies.get_current_user),
+):
+    T = models.Transaction
+    q = transaction_rows().order_by(T.id.desc()).limit(limit)
+    scope = dependencies.visible_transactions(current_user)
+    if scope is not None:
+        q = q.where(scope)
+    if before is not None:
+        q = q.where(T.id < before)
+    rows = (await db.execute(q)).mappings().all()
+    return {
+        "results": [dict(r) for r in rows],
+        "next": rows[-1]["id"] if len(rows) == limit else None,
+    }
+
+
+@router.post("/", status_code=201)
+async def create_transaction(
+    tx: schemas.TransactionCreate,
+    db=Depends(get_write_db),
+    current_user: schemas.Principal = Depends(dependencies.get_current_user),
+):
+    # Stock checks happen inside the write itself (see app/ledger.py), never
+    # as a read followed by a separate update.
+    if SHARDED:
+        raise HTTPException(
+            status_code=503,
+            detail="Sharding is enabled (SHARD_DATABASE_URLS); post transactions to the Django API",
+        )
+    T = models.TransactionType
+    if tx.type == T.PURCHASE and not tx.to_base:
+        raise HTTPException(status_code=400, detail="to_base required for PURCHASE")
+    if tx.type == T.TRANSFER and (not tx.from_base or not tx.to_base or tx.from_base == tx.to_base):
+        raise HTTPException(status_code=400, detail="TRANSFER needs two different bases")
+    if tx.type in (T.ASSIGNMENT, T.EXPENDITURE) and not tx.from_base:
+        raise HTTPException(status_code=400, detail="from_base required for this transaction")
+    own_base = tx.to_base if tx.type == T.PURCHASE else tx.from_base
+    if current_user.role != models.Role.ADMIN and own_base != current_user.base_id:
+        raise HTTPException(status_code=403, detail="You can only move stock at your own base")
+
+    params = {
+        "type": tx.type.value, "asset_type": tx.asset_type, "quantity": tx.quantity,
+        "from_base": tx.from_base if tx.type != T.PURCHASE else None,
+        "to_base": tx.to_base if tx.type in (T.PURCHASE, T.TRANSFER) else None,
+        "recipient": tx.recipient, "user": current_user.user_id,
+    }
+    post = ledger.post_postgres if IS_POSTGRES else ledger.post_sqlite
+    try:
+        result = await post(db, params)
+    except ledger.InsufficientStock:
+        raise HTTPException(status_code=409, detail="Insufficient inventory at source base")
+    return {
+        "id": result["id"], "date": result["date"], "type": tx.type.value, "asset_type": tx.asset_type,
+        "quantity": tx.quantity, "from_base": params["from_base"], "to_base": params["to_base"],
+        "recipient": tx.recipient, "performed_by": current_user.user_id,
+        # Stock left at each side after this write
+        "from_quantity": result["from_quantity"], "to_quantity": result["to_quantity"],
+    }
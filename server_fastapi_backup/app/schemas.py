@@ -1,81 +1,17 @@
-from pydantic import BaseModel
-from typing import List, Optional
-from datetime import datetime
+from pydantic import BaseModel, Field
+from typing import Optional
 from .models import Role, TransactionType
 
-class Token(BaseModel):
-    access_token: str
-    token_type: str
-
-class TokenData(BaseModel):
-    username: Optional[str] = None
-    role: Optional[Role] = None
-
-class UserBase(BaseModel):
-    username: str
+class Principal(BaseModel):
+    # Who is calling, taken from the JWT claims (no database lookup)
+    user_id: int
     role: Role
-    baseId: Optional[int] = None
-
-class UserCreate(UserBase):
-    password: str
-
-class UserResponse(UserBase):
-    id: int
-    createdAt: datetime
-    
-    class Config:
-        orm_mode = True
-
-class BaseBase(BaseModel):
-    name: str
-    location: str
-
-class BaseCreate(BaseBase):
-    pass
-
-class BaseResponse(BaseBase):
-    id: int
-    createdAt: datetime
-    
-    class Config:
-        orm_mode = True
+    base_id: Optional[int] = None
 
-class AssetTypeBase(BaseModel):
-    name: str
-    description: Optional[str] = None
-
-class AssetTypeCreate(AssetTypeBase):
-    pass
-
-class AssetTypeResponse(AssetTypeBase):
-    id: int
-    
-    class Config:
-        orm_mode = True
-
-class InventoryBase(BaseModel):
-    baseId: int
-    assetTypeId: int
-    quantity: int
-
-class InventoryResponse(InventoryBase):
-    class Config:
-        orm_mode = True
-
-class TransactionBase(BaseModel):
+class TransactionCreate(BaseModel):
     type: TransactionType
-    quantity: int
-    assetTypeId: int
-    fromBaseId: Optional[int] = None
-    toBaseId: Optional[int] = None
-    recipient: Optional[str] = None
-
-class TransactionCreate(TransactionBase):
-    pass
-
-class TransactionResponse(TransactionBase):
-    id: int
-    date: datetime
-    
-    class Config:
-        orm_mode = True
+    quantity: int = Field(gt=0)
+    asset_type: int
+    from_base: Optional[int] = None
+    to_base: Optional[int] = None
+    recipient: Optional[str] = Field(None, max_length=255)
@@ -0,0 +1,83 @@
+"""
+Load test the read endpoints of this service against the Django API on the
+same database.
+
+    python bench.py --django http://localhost:8000 --fastapi http://localhost:8001 \
+        --username adm --password ... --requests 500 --concurrency 50
+
+The token comes from Django's login, so both services see the same user.
+Reports requests/s and latency percentiles per endpoint pair.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+# (name, Django path, FastAPI path). Django's transaction list is
+# unpaginated, so the FastAPI side asks for a large page to compare
+# like with like.
+ENDPOINTS = [
+    ("dashboard", "/api/v1/dashboard/metrics/", "/api/dashboard/metrics"),
+    ("transactions", "/api/v1/transactions/", "/api/transactions/?limit=1000"),
+    ("asset types", "/api/v1/assets/", "/api/assets/types"),
+]
+
+
+async def hammer(client, url, total, concurrency):
+    latencies, errors = [], 0
+    queue = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for _ in queue:
+            start = time.perf_counter()
+            r = await client.get(url)
+            latencies.append(time.perf_counter() - start)
+            if r.status_code != 200:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+
+    return {
+        "rps": total / elapsed,
+        "p50": statistics.median(latencies) * 1000,
+        "p95": pct(0.95),
+        "p99": pct(0.99),
+        "errors": errors,
+    }
+
+
+async def main(args):
+    async with httpx.AsyncClient(base_url=args.django, timeout=60) as c:
+        r = await c.post("/api/v1/auth/login/", json={"username": args.username, "password": args.password})
+        r.raise_for_status()
+        token = r.json()["access"]
+
+    headers = {"Authorization": f"Bearer {token}"}
+    limits = httpx.Limits(max_connections=args.concurrency)
+    print(f"{'endpoint':<14} {'service':<8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for name, django_path, fastapi_path in ENDPOINTS:
+        for service, base_url, path in (("django", args.django, django_path), ("fastapi", args.fastapi, fastapi_path)):
+            async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=60) as client:
+                await hammer(client, path, args.concurrency, args.concurrency)  # warm up
+                s = await hammer(client, path, args.requests, args.concurrency)
+            print(f"{name:<14} {service:<8} {s['rps']:8.1f} {s['p50']:8.1f} {s['p95']:8.1f} {s['p99']:8.1f} {s['errors']:>7}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--django", default="http://localhost:8000")
+    parser.add_argument("--fastapi", default="http://localhost:8001")
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,100 @@
+"""
+Concurrency stress test for POST /api/transactions/.
+
+    python stress.py --fastapi http://localhost:8001 --django http://localhost:8000 \
+        --username adm --password ... --asset-type 1 --bases 1,2,3 \
+        --requests 5000 --concurrency 200
+
+Fires random transfers between the given bases (in both directions, to
+provoke lock-order deadlocks) and expenditures, with quantities large
+enough that many requests must be refused. Afterwards it checks that no
+stock went negative, that every base's stock equals its starting stock plus
+the accepted moves, and that nothing failed with a server error.
+Exits non-zero on any violation.
+"""
+import argparse
+import asyncio
+import collections
+import random
+import sys
+import time
+
+import httpx
+
+
+async def stock(client, asset_type, bases):
+    r = await client.get("/api/assets/inventory")
+    r.raise_for_status()
+    found = {row["base"]: row["quantity"] for row in r.json() if row["asset_type"] == asset_type}
+    return {b: found.get(b, 0) for b in bases}
+
+
+async def main(args):
+    async with httpx.AsyncClient(base_url=args.django, timeout=60) as c:
+        r = await c.post("/api/v1/auth/login/", json={"username": args.username, "password": args.password})
+        r.raise_for_status()
+        token = r.json()["access"]
+
+    bases = [int(b) for b in args.bases.split(",")]
+    rng = random.Random(args.seed)
+    headers = {"Authorization": f"Bearer {token}"}
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.fastapi, headers=headers, limits=limits, timeout=60) as client:
+        before = await stock(client, args.asset_type, bases)
+        average = max(1, sum(before.values()) // max(1, len(bases)))
+
+        expected = dict(before)
+        statuses = collections.Counter()
+        queue = iter(range(args.requests))
+
+        async def worker():
+            for _ in queue:
+                src, dst = rng.sample(bases, 2)
+                # Up to half a base's average stock per request, so refusals are common
+                quantity = rng.randint(1, max(1, average // 2))
+                if rng.random() < args.expend_ratio:
+                    body = {"type": "EXPENDITURE", "asset_type": args.asset_type, "from_base": src,
+                            "quantity": quantity, "recipient": "stress"}
+                else:
+                    body = {"type": "TRANSFER", "asset_type": args.asset_type, "from_base": src,
+                            "to_base": dst, "quantity": quantity, "recipient": "stress"}
+                r = await client.post("/api/transactions/", json=body)
+                statuses[r.status_code] += 1
+                if r.status_code == 201:
+                    expected[src] -= quantity
+                    if body["type"] == "TRANSFER":
+                        expected[dst] += quantity
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+        after = await stock(client, args.asset_type, bases)
+
+    print(f"{args.requests} requests in {elapsed:.1f}s ({args.requests / elapsed:.0f} req/s), status codes: {dict(statuses)}")
+    problems = []
+    if any(code >= 500 for code in statuses):
+        problems.append("server errors (deadlocks or timeouts)")
+    if any(q < 0 for q in after.values()):
+        problems.append(f"negative stock: {after}")
+    if after != expected:
+        problems.append(f"stock does not match accepted writes: expected {expected}, found {after}")
+    for p in problems:
+        print("FAIL:", p)
+    if not problems:
+        print("OK: no overdraft, no lost updates, no server errors")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--django", default="http://localhost:8000")
+    parser.add_argument("--fastapi", default="http://localhost:8001")
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--asset-type", type=int, required=True)
+    parser.add_argument("--bases", required=True, help="Comma separated base ids (at least two)")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--expend-ratio", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))